@@ -4,7 +4,7 @@ from .datasets import AbstractDataset, BaseDataset, DownloadableDataset
 from .hooks import AbstractHook
 from .main_loop import MainLoop
 from .models import AbstractModel
-from .types import Batch, Stream, EpochData, TimeProfile
+from .types import Batch, Stream, EpochData, TimeProfile, ColumnarBatch
 
 from .api import *
 from . import cli
@@ -16,6 +16,6 @@ from . import utils
 
 __all__ = ['MainLoop', 'create_output_dir', 'create_dataset', 'create_model', 'create_hooks', 'create_emloop_training',
            'load_yaml', 'AbstractDataset', 'BaseDataset', 'DownloadableDataset', 'AbstractHook', 'MainLoop',
-           'AbstractModel', 'Batch', 'Stream', 'EpochData', 'TimeProfile']
+           'AbstractModel', 'Batch', 'Stream', 'EpochData', 'TimeProfile', 'ColumnarBatch']
 
 __version__ = '0.2.2'
@@ -4,6 +4,8 @@ import logging
 import shutil
 from datetime import datetime
 import copy
+import hashlib
+from glob import glob
 from typing import Optional, Iterable
 from collections import namedtuple
 
@@ -11,9 +13,10 @@ from .datasets import AbstractDataset
 from .models import AbstractModel
 from .hooks import AbstractHook
 from .hooks.training_trace import TrainingTrace
-from .constants import EL_LOG_FILE, EL_HOOKS_MODULE, EL_CONFIG_FILE, EL_LOG_DATE_FORMAT, EL_LOG_FORMAT
+from .constants import EL_LOG_FILE, EL_HOOKS_MODULE, EL_CONFIG_FILE, EL_LOG_DATE_FORMAT, EL_LOG_FORMAT, \
+    EL_STREAM_CACHE_DIR, EL_STREAM_POSITION_FILE
 from .utils.reflection import get_class_module, parse_fully_qualified_name, create_object
-from .utils.yaml import yaml_to_str, yaml_to_file
+from .utils.yaml import yaml_to_str, yaml_to_file, load_yaml
 from .utils import get_random_name
 from .main_loop import MainLoop
 
@@ -228,6 +231,28 @@ def delete_output_dir(output_dir: str) -> None:
         shutil.rmtree(output_dir)
 
 
+def load_stream_position(restore_from: str) -> Optional[dict]:
+    """
+    Load the training stream position saved along with the given checkpoint.
+
+    The position files (see :py:class:`emloop.hooks.SaveEvery`) in the directory of the checkpoint are searched for
+    the one saved with the very same checkpoint; the checkpoint may be referred to with or without its extensions.
+
+    :param restore_from: path to the checkpoint to be restored
+    :return: the training stream position or ``None`` if it was not saved with the checkpoint
+    """
+    restore_from = path.normpath(restore_from)
+    checkpoint = path.basename(restore_from)
+    for position_file in sorted(glob(path.join(path.dirname(restore_from), EL_STREAM_POSITION_FILE.format('*')))):
+        stream_position = load_yaml(position_file)
+        saved = stream_position.get('checkpoint')
+        if saved is not None and (saved == checkpoint or saved.startswith(checkpoint + '.')
+                                  or checkpoint.startswith(saved + '.')):
+            logging.info('Resuming the training stream position from `%s`', position_file)
+            return stream_position
+    return None
+
+
 def create_emloop_training(config: dict, output_root: str, restore_from: str=None,
                            output_dir_name: Optional[str]=None) -> EmloopTraining:
     """
@@ -248,7 +273,16 @@ def create_emloop_training(config: dict, output_root: str, restore_from: str=Non
     hooks = create_hooks(config=config, model=model, dataset=dataset, output_dir=output_dir)
     logging.info('Creating main loop')
     main_loop_kwargs = copy.deepcopy(config.get('main_loop', {}))
+    if main_loop_kwargs.get('cache_streams') and main_loop_kwargs.get('cache', 'disk') == 'disk':
+        # the caches are valid only for the very same dataset configuration
+        cache_root = main_loop_kwargs.get('cache_dir') or path.join(output_root, EL_STREAM_CACHE_DIR)
+        dataset_digest = hashlib.sha1(yaml_to_str(config['dataset']).encode()).hexdigest()
+        main_loop_kwargs['cache_dir'] = path.join(cache_root, dataset_digest)
     main_loop = MainLoop(model=model, dataset=dataset, hooks=hooks, **main_loop_kwargs)
+    if restore_from is not None:
+        stream_position = load_stream_position(restore_from)
+        if stream_position is not None:
+            main_loop.resume_stream_position(stream_position)
 
     return EmloopTraining(output_dir=output_dir, dataset=dataset,
                           model=model, hooks=hooks, main_loop=main_loop)
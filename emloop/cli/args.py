@@ -58,6 +58,8 @@ def get_emloop_arg_parser(add_common_arguments: bool=False) -> ArgumentParser:
     dataset_parser.set_defaults(subcommand='dataset')
     dataset_parser.add_argument('method', help='name of the method to be invoked')
     dataset_parser.add_argument('config_file', help='path to the config file')
+    dataset_parser.add_argument('--arg', '-a', action='append', default=[], dest='method_args',
+                                help='keyword argument of the method in format name=value (may be repeated)')
 
     # create grid-search sub-parser
     gridsearch_parser = subparsers.add_parser(
@@ -0,0 +1,81 @@
+import json
+import logging
+import itertools
+from typing import Iterable, Optional
+
+import tabulate
+
+from ..api import create_dataset
+from ..constants import EL_DEFAULT_TRAIN_STREAM
+from ..datasets import AbstractDataset
+from ..datasets.stream_profiler import benchmark_stream
+
+
+def benchmark_dataset(config: dict, dataset: AbstractDataset, streams: Optional[Iterable[str]]=None,
+                      buffers: Iterable[int]=(0,), workers: Iterable[int]=(0,),
+                      batch_sizes: Optional[Iterable[int]]=None, warmup: int=5, max_batches: int=-1,
+                      step_time: float=0., report_path: Optional[str]=None) -> None:
+    """
+    Benchmark the throughput of the dataset streams without a model.
+
+    Each stream is read through :py:class:`emloop.datasets.StreamWrapper` with all the combinations of the given
+    buffer sizes, numbers of the producer processes and batch sizes
+    (see :py:func:`emloop.datasets.stream_profiler.benchmark_stream`). For each of the batch sizes, the dataset is
+    re-created with the ``dataset.batch_size`` configuration overridden.
+
+    :param config: configuration
+    :param dataset: dataset created from the configuration
+    :param streams: names of the benchmarked streams; the train stream and the ``main_loop.extra_streams`` by default
+    :param buffers: benchmarked buffer sizes
+    :param workers: benchmarked numbers of the producer processes
+    :param batch_sizes: benchmarked batch sizes; the configured batch size only if not specified
+    :param warmup: number of the batches excluded from the measurement
+    :param max_batches: if positive, maximum number of the measured batches
+    :param step_time: target model step time in seconds; the stream is checked to keep up with it
+    :param report_path: if specified, path of the JSON report
+    """
+    if streams is None:
+        main_loop_config = config.get('main_loop', {})
+        streams = [main_loop_config.get('train_stream_name', EL_DEFAULT_TRAIN_STREAM)] + \
+            list(main_loop_config.get('extra_streams', []))
+
+    report = []
+    for batch_size in batch_sizes if batch_sizes is not None else [None]:
+        if batch_size is not None:
+            config['dataset']['batch_size'] = batch_size
+            dataset = create_dataset(config)
+        for stream_name, buffer_size, num_workers in itertools.product(streams, buffers, workers):
+            result = benchmark_stream(getattr(dataset, stream_name + '_stream'), buffer_size=buffer_size,
+                                      workers=num_workers, warmup=warmup, max_batches=max_batches,
+                                      step_time=step_time, name=stream_name)
+            report.append({'stream': stream_name, 'batch_size': batch_size, **result})
+            logging.debug('Benchmarked %s', report[-1])
+
+    def format_value(value: Optional[float]) -> str:
+        return '' if value is None else '{:.1f}'.format(value)
+
+    rows = [[result['stream'], result['batch_size'] or '', result['buffer'], result['workers'],
+             format_value(result['batches_per_second']), format_value(result['examples_per_second']),
+             format_value(result['megabytes_per_second']),
+             format_value(None if result['read_time_per_batch'] is None else 1000 * result['read_time_per_batch']),
+             '' if result['keeps_up'] is None else 'yes' if result['keeps_up'] else 'no']
+            for result in report]
+    for line in tabulate.tabulate(rows, headers=['stream', 'batch size', 'buffer', 'workers', 'batches/s',
+                                                 'examples/s', 'MB/s', 'read ms/batch', 'keeps up'],
+                                  tablefmt='grid').split('\n'):
+        logging.info(line)
+
+    if step_time > 0:
+        for stream_name in streams:
+            keeping_up = [result for result in report if result['stream'] == stream_name and result['keeps_up']]
+            if keeping_up:
+                logging.info('Stream `%s` keeps up with the step time of %.3fs, e.g. with buffer %d and workers %d',
+                             stream_name, step_time, keeping_up[0]['buffer'], keeping_up[0]['workers'])
+            else:
+                logging.warning('Stream `%s` does not keep up with the step time of %.3fs with any of '
+                                'the benchmarked settings', stream_name, step_time)
+
+    if report_path is not None:
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        logging.info('Benchmark report saved to `%s`', report_path)
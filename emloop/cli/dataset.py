@@ -1,21 +1,28 @@
 import logging
 import os.path as path
 
+from functools import partial
 from typing import Iterable
 
 from .util import fallback, validate_config, find_config
+from .benchmark import benchmark_dataset
 from ..api import create_dataset, create_output_dir
-from ..utils.config import load_config
+from ..utils.config import load_config, parse_arg
 
 
-def invoke_dataset_method(config_path: str, method_name: str, output_root: str, cl_arguments: Iterable[str]) -> None:
+def invoke_dataset_method(config_path: str, method_name: str, output_root: str, cl_arguments: Iterable[str],
+                          method_args: Iterable[str]=()) -> None:
     """
     Create the specified dataset and invoke its specified method.
 
+    Unless the dataset implements its own ``benchmark`` method, ``benchmark`` runs
+    :py:func:`emloop.cli.benchmark.benchmark_dataset`.
+
     :param config_path: path to the config file or the directory in which it is stored
     :param method_name: name of the method to be invoked on the specified dataset
     :param cl_arguments: additional command line arguments which will update the configuration
     :param output_root: output root in which the training directory will be created
+    :param method_args: keyword arguments of the method in format ``name=value``
     """
 
     config = dataset = method = output_dir = None
@@ -34,11 +41,14 @@ def invoke_dataset_method(config_path: str, method_name: str, output_root: str,
         fallback('Creating dataset failed', ex)
 
     try:
-        method = getattr(dataset, method_name)
+        if method_name == 'benchmark' and not hasattr(dataset, method_name):
+            method = partial(benchmark_dataset, config, dataset)
+        else:
+            method = getattr(dataset, method_name)
     except AttributeError as ex:
         fallback('Method `{}` not found in the dataset'.format(method_name), ex)
 
     try:
-        method()
+        method(**dict(parse_arg(arg) for arg in method_args))
     except Exception as ex:  # pylint: disable=broad-except
         fallback('Exception occurred during method `{}` invocation'.format(method_name), ex)
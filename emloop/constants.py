@@ -31,11 +31,25 @@ EL_NA_STR = 'N/A'
 """N/A string for pretty printing."""
 
 EL_BUFFER_SLEEP = 0.02
-"""The duration for which the buffer sleeps before it starts to process the next batch."""
+"""The default duration for which the buffer sleeps after it was allowed to process the next batch."""
+
+EL_BUFFER_MAX_BATCHES = 128
+"""The maximum number of buffered batches when the buffer is limited only by its size in bytes."""
+
+EL_STREAM_CACHE_DIR = 'stream_cache'
+"""The default directory (in the output root) of the stream caches."""
+
+EL_STREAM_POSITION_FILE = 'stream_position_{}.yaml'
+"""Name template of the file (in the output directory) with the position of the training stream at the checkpoint
+with the given name suffix."""
 
 EL_DEFAULT_TRAIN_STREAM = 'train'
 """The stream to be used for training."""
 
+EL_WORKER_POLL_TIMEOUT = 2
+"""The timeout (in seconds) after which the liveness of a stream worker process is checked when waiting for a batch."""
+
 __all__ = ['EL_LOG_FORMAT', 'EL_LOG_DATE_FORMAT', 'EL_FULL_DATE_FORMAT', 'EL_HOOKS_MODULE', 'EL_CONFIG_FILE',
            'EL_LOG_FILE', 'EL_TRACE_FILE', 'EL_DEFAULT_TRAIN_STREAM', 'EL_PREDICT_STREAM', 'EL_DEFAULT_LOG_DIR',
-           'EL_NA_STR', 'EL_BUFFER_SLEEP']
+           'EL_NA_STR', 'EL_BUFFER_SLEEP', 'EL_WORKER_POLL_TIMEOUT', 'EL_BUFFER_MAX_BATCHES',
+           'EL_STREAM_CACHE_DIR', 'EL_STREAM_POSITION_FILE']
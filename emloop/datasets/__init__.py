@@ -4,10 +4,28 @@ from .abstract_dataset import AbstractDataset
 from .base_dataset import BaseDataset
 from .downloadable_dataset import DownloadableDataset
 from .stream_wrapper import StreamWrapper
+from .async_stream import AsyncStream
+from .bucketing import BucketByLength
+from .shuffle_buffer import ShuffleBuffer
+from .stream_tuner import StreamTuner
+from .interleaved_stream import InterleavedStream
+from .stream_cache import StreamCache, DiskCache, MemoryCache, MemoryCachePool
 
 AbstractDataset.__module__ = '.datasets'
 BaseDataset.__module__ = '.datasets'
 DownloadableDataset.__module__ = '.datasets'
 StreamWrapper.__module__ = '.datasets'
+StreamCache.__module__ = '.datasets'
+AsyncStream.__module__ = '.datasets'
+BucketByLength.__module__ = '.datasets'
+ShuffleBuffer.__module__ = '.datasets'
+StreamTuner.__module__ = '.datasets'
+InterleavedStream.__module__ = '.datasets'
+DiskCache.__module__ = '.datasets'
+MemoryCache.__module__ = '.datasets'
+MemoryCachePool.__module__ = '.datasets'
 
-__all__ = ['AbstractDataset', 'BaseDataset', 'DownloadableDataset', 'StreamWrapper']
+__all__ = ['AbstractDataset', 'BaseDataset', 'DownloadableDataset', 'StreamWrapper', 'StreamCache', 'DiskCache',
+           'MemoryCache', 'MemoryCachePool', 'AsyncStream',
+           'BucketByLength', 'ShuffleBuffer', 'StreamTuner',
+           'InterleavedStream']
@@ -11,6 +11,8 @@ class AbstractDataset:
     in order to make ``stream_name`` stream available in the **emloop** :py:class:`emloop.MainLoop`.
 
     All the defined stream methods should return a :py:attr:`Stream`.
+    Alternatively, they may return an asynchronous iterable of the batches (or of awaitables of the batches),
+    see :py:class:`emloop.datasets.AsyncStream`.
     """
 
     def __init__(self, config_str: str):
@@ -0,0 +1,135 @@
+"""
+Module with a synchronous adapter of the asynchronous dataset streams.
+"""
+import asyncio
+import inspect
+from threading import Thread
+from typing import AsyncIterable, Iterator
+
+from ..types import Batch
+
+
+class _End:
+    """Mark of the end of the asynchronous stream."""
+
+
+class AsyncStream:
+    """
+    Synchronous iterator of an asynchronous stream driven by an event loop in a dedicated thread.
+
+    The asynchronous iterator may yield either the batches or awaitables of them (e.g. coroutines fetching the
+    batch data). The awaitables are scheduled as soon as they are yielded so that up to ``in_flight`` of them run
+    concurrently. Regardless of their completion order, the batches are returned in the order of the stream.
+
+    .. code-block:: python
+        :caption: asynchronous stream with concurrent fetches
+
+        async def fetch_batch(self, i):
+            async with self.session.get(self.url(i)) as response:
+                return decode(await response.read())
+
+        async def train_stream(self):
+            for i in range(self.batch_count):
+                yield self.fetch_batch(i)  # not awaited; AsyncStream schedules the coroutine
+
+    The event loop thread is stopped when the stream is exhausted or closed (see :py:meth:`close`).
+    """
+
+    def __init__(self, stream: AsyncIterable, in_flight: int=1):
+        """
+        Create new AsyncStream and start iterating the given asynchronous stream.
+
+        :param stream: asynchronous iterable of batches or awaitables of them
+        :param in_flight: maximum number of the awaitables being awaited concurrently
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._queue = None
+        self._slots = None
+        self._producer = asyncio.run_coroutine_threadsafe(self._start(stream, max(1, in_flight)), self._loop).result()
+
+    async def _start(self, stream: AsyncIterable, in_flight: int) -> asyncio.Task:
+        """Create the loop-bound primitives and start the producer task."""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(in_flight)
+        return asyncio.ensure_future(self._produce(stream))
+
+    async def _produce(self, stream: AsyncIterable) -> None:
+        """Schedule the stream items and put them (in the stream order) to the queue followed by the end mark."""
+        try:
+            async for item in stream:
+                await self._slots.acquire()
+                if inspect.isawaitable(item):
+                    future = asyncio.ensure_future(item)
+                else:
+                    future = self._loop.create_future()
+                    future.set_result(item)
+                await self._queue.put(future)
+        except Exception as ex:  # pylint: disable=broad-except
+            future = self._loop.create_future()
+            future.set_exception(ex)
+            await self._queue.put(future)
+        await self._queue.put(_End)
+
+    async def _next(self):
+        """Return the next stream batch or the end mark."""
+        future = await self._queue.get()
+        if future is _End:
+            return _End
+        try:
+            return await future
+        finally:
+            self._slots.release()
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Get stream iterator."""
+        return self
+
+    def __next__(self) -> Batch:
+        """
+        Return the next batch.
+
+        :raise StopIteration: at the end of the stream
+        """
+        if self._loop.is_closed():
+            raise StopIteration
+        try:
+            batch = asyncio.run_coroutine_threadsafe(self._next(), self._loop).result()
+        except BaseException:
+            self.close()
+            raise
+        if batch is _End:
+            self.close()
+            raise StopIteration
+        return batch
+
+    def close(self) -> None:
+        """Cancel the pending fetches and stop the event loop thread."""
+        if self._loop.is_closed():
+            return
+
+        async def cancel():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(cancel(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def iterate_stream(stream, in_flight: int=1) -> Iterator[Batch]:
+    """
+    Return a synchronous iterator of the given (possibly asynchronous) stream.
+
+    :param stream: iterable or asynchronous iterable of batches
+    :param in_flight: maximum number of the concurrently awaited items of the asynchronous stream
+    :return: stream iterator
+    """
+    if hasattr(stream, '__aiter__'):
+        return AsyncStream(stream, in_flight)
+    return iter(stream)
@@ -2,9 +2,10 @@
 This module contains :py:class:`emloop.datasets.BaseDataset` which might be used as a base class for your
 dataset implemented in Python.
 """
+import json
 import logging
 from abc import abstractmethod, ABCMeta
-from typing import Optional
+from typing import Optional, List
 from collections import namedtuple
 import traceback
 
@@ -13,6 +14,7 @@ import tabulate
 import numpy as np
 
 from .abstract_dataset import AbstractDataset
+from .stream_profiler import profile_stream
 
 
 class BaseDataset(AbstractDataset, metaclass=ABCMeta):
@@ -49,11 +51,24 @@ class BaseDataset(AbstractDataset, metaclass=ABCMeta):
         :raise NotImplementedError: if not overridden
         """
 
-    def stream_info(self) -> None:
-        """Check and report source names, dtypes and shapes of all the streams available."""
+    def stream_info(self, full_pass: bool=False, workers: int=0, report_path: Optional[str]=None) -> None:
+        """
+        Check and report source names, dtypes and shapes of all the streams available.
+
+        By default, only the first batch of each stream is checked. With ``full_pass``, the whole streams are
+        iterated (in the given number of the producer processes) and their throughput is reported as well
+        (see :py:func:`emloop.datasets.stream_profiler.profile_stream`).
+
+        :param full_pass: iterate the whole streams
+        :param workers: number of the producer processes used in the full pass
+        :param report_path: if specified, path of the JSON report of the full pass
+        """
         stream_names = [stream_name for stream_name in dir(self)
                         if 'stream' in stream_name and stream_name != 'stream_info']
         logging.info('Found %s stream candidates: %s', len(stream_names), stream_names)
+        if full_pass:
+            self._full_pass(stream_names, workers, report_path)
+            return
         for stream_name in stream_names:
             try:
                 stream_fn = getattr(self, stream_name)
@@ -85,3 +100,43 @@ class BaseDataset(AbstractDataset, metaclass=ABCMeta):
                 logging.warning('Exception was raised during checking stream `%s`, '
                                 '(stack trace is displayed only with --verbose flag)', stream_name)
                 logging.debug(traceback.format_exc())
+
+    def _full_pass(self, stream_names: List[str], workers: int, report_path: Optional[str]) -> None:
+        """
+        Iterate the whole given streams and report their sources and throughput.
+
+        :param stream_names: names of the stream methods
+        :param workers: number of the producer processes
+        :param report_path: if specified, path of the JSON report
+        """
+        report = {}
+        for stream_name in stream_names:
+            try:
+                report[stream_name] = stream_report = profile_stream(getattr(self, stream_name), workers=workers,
+                                                                     name=stream_name)
+            except Exception:
+                logging.warning('Exception was raised during profiling stream `%s`, '
+                                '(stack trace is displayed only with --verbose flag)', stream_name)
+                logging.debug(traceback.format_exc())
+                continue
+            logging.info('%s: %d batches, %d examples, first batch after %.3fs, %.1f batches/s, %.1f examples/s, '
+                         '%.0f bytes per batch', stream_name, stream_report['batches'], stream_report['examples'],
+                         stream_report['time_to_first_batch'] or 0, stream_report['batches_per_second'] or 0,
+                         stream_report['examples_per_second'] or 0, stream_report['bytes_per_batch']['mean'])
+            rows = []
+            for source, source_report in stream_report['sources'].items():
+                if source_report['ragged_batches'] > 0:
+                    logging.warning('*** stream source `%s` appears to be ragged (non-rectangular) in %d batches ***',
+                                    source, source_report['ragged_batches'])
+                value_range = '' if source_report['min'] is None \
+                    else '{} - {}'.format(source_report['min'], source_report['max'])
+                rows.append([source, ', '.join(source_report['dtypes']), ', '.join(source_report['shapes']),
+                             value_range])
+            for line in tabulate.tabulate(rows, headers=['name', 'dtypes', 'shapes', 'range'],
+                                          tablefmt='grid').split('\n'):
+                logging.info(line)
+
+        if report_path is not None:
+            with open(report_path, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+            logging.info('Stream report saved to `%s`', report_path)
@@ -0,0 +1,121 @@
+"""
+Module with a stream stage batching variable-length examples by their length.
+"""
+import bisect
+import logging
+from typing import Iterable, Iterator, Mapping, Any, Callable, Union, Optional, Sequence, List
+
+import numpy as np
+
+from ..types import Batch
+
+Example = Mapping[str, Any]
+"""Example type: :py:class:`typing.Mapping` of ``variable_name`` to the value of a single example."""
+
+
+class BucketByLength:
+    """
+    Stream of batches of the given examples grouped by their length so that little compute is wasted on padding.
+
+    The examples are distributed into buckets according to their length and the ``bucket_boundaries``.
+    A bucket is emitted as a batch once another example would exceed the ``max_tokens`` budget,
+    i.e., the batch size times the length of the longest example in the batch.
+    The remaining examples are emitted at the end of the stream unless ``drop_remainder`` is set.
+
+    The ``pad_sources`` are padded to the length of the longest example in the batch and stacked to numpy arrays
+    of shape ``[batch_size, max_length, ...]``. The boolean padding mask of shape ``[batch_size, max_length]``
+    (``True`` for the valid items) is added as the ``mask_source``, e.g., to be used as the ``pad_mask_variable``
+    of :py:class:`emloop.hooks.SequenceToCsv`. Other sources are passed as lists.
+
+    .. code-block:: python
+        :caption: bucketed train stream
+
+        def _train_examples(self):
+            for tokens, label in self._data:
+                yield {'tokens': tokens, 'labels': label}
+
+        def train_stream(self):
+            return BucketByLength(self._train_examples(), length='tokens', max_tokens=4096,
+                                  bucket_boundaries=[16, 32, 64, 128])
+
+    Being a plain iterable, the stage may be buffered by the :py:class:`emloop.datasets.StreamWrapper` and cut
+    to epochs of ``main_loop.fixed_epoch_size`` batches just like any other stream.
+    """
+
+    def __init__(self, examples: Iterable[Example], length: Union[str, Callable[[Example], int]], max_tokens: int,
+                 bucket_boundaries: Optional[Sequence[int]]=None, max_batch_size: Optional[int]=None,
+                 pad_sources: Optional[Sequence[str]]=None, pad_value: Any=0, mask_source: Optional[str]='mask',
+                 drop_remainder: bool=False):
+        """
+        Create new BucketByLength stage.
+
+        :param examples: iterable of the examples
+        :param length: name of the source whose length is the example length or a function computing the length
+        :param max_tokens: maximum number of the (padded) items in a batch
+        :param bucket_boundaries: sorted upper boundaries (exclusive) of the length buckets;
+                                  a single bucket is used if not specified
+        :param max_batch_size: if specified, maximum number of the examples in a batch
+        :param pad_sources: names of the sources to be padded; defaults to the ``length`` source
+        :param pad_value: value used for padding
+        :param mask_source: name of the padding mask source; no mask is produced if ``None``
+        :param drop_remainder: drop the incomplete batches at the end of the stream
+        :raise ValueError: if ``max_tokens`` is not positive or the ``bucket_boundaries`` are not sorted
+        """
+        if max_tokens <= 0:
+            raise ValueError('`max_tokens` must be positive, {} given.'.format(max_tokens))
+        bucket_boundaries = list(bucket_boundaries or [])
+        if bucket_boundaries != sorted(set(bucket_boundaries)):
+            raise ValueError('`bucket_boundaries` must be strictly increasing, {} given.'.format(bucket_boundaries))
+        if pad_sources is None:
+            pad_sources = [length] if isinstance(length, str) else []
+
+        self._examples = examples
+        self._length = (lambda example: len(example[length])) if isinstance(length, str) else length
+        self._max_tokens = max_tokens
+        self._bucket_boundaries = bucket_boundaries
+        self._max_batch_size = max_batch_size
+        self._pad_sources = list(pad_sources)
+        self._pad_value = pad_value
+        self._mask_source = mask_source
+        self._drop_remainder = drop_remainder
+
+    def _make_batch(self, examples: List[Example], lengths: List[int]) -> Batch:
+        """Pad and stack the given examples to a batch."""
+        max_length = max(lengths)
+        batch = {}
+        for source in examples[0].keys():
+            if source in self._pad_sources:
+                values = [np.asarray(example[source]) for example in examples]
+                padded = np.full((len(values), max_length) + values[0].shape[1:], self._pad_value,
+                                 dtype=np.result_type(*values))
+                for i, value in enumerate(values):
+                    padded[i, :len(value)] = value
+                batch[source] = padded
+            else:
+                batch[source] = [example[source] for example in examples]
+        if self._mask_source is not None:
+            batch[self._mask_source] = np.arange(max_length)[np.newaxis, :] < np.array(lengths)[:, np.newaxis]
+        return batch
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Yield the bucketed batches of the examples."""
+        buckets = [([], []) for _ in range(len(self._bucket_boundaries) + 1)]
+        for example in self._examples:
+            length = self._length(example)
+            examples, lengths = buckets[bisect.bisect_right(self._bucket_boundaries, length)]
+            if examples and (len(examples) + 1) * max(length, *lengths) > self._max_tokens:
+                yield self._make_batch(examples, lengths)
+                examples.clear()
+                lengths.clear()
+            if length > self._max_tokens:
+                logging.warning('Example of length %d exceeds the token budget of %d', length, self._max_tokens)
+            examples.append(example)
+            lengths.append(length)
+            if len(examples) == self._max_batch_size:
+                yield self._make_batch(examples, lengths)
+                examples.clear()
+                lengths.clear()
+        if not self._drop_remainder:
+            for examples, lengths in buckets:
+                if examples:
+                    yield self._make_batch(examples, lengths)
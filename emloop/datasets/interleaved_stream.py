@@ -0,0 +1,206 @@
+"""
+Module with a stream interleaving the batches of multiple source streams.
+"""
+from contextlib import contextmanager, ExitStack
+from typing import Mapping, Optional, Iterator, ContextManager, Generator
+
+import numpy as np
+
+from .stream_wrapper import StreamWrapper
+from ..types import Batch, TimeProfile
+from ..utils.profile import Timer
+
+
+class InterleavedStream:
+    """
+    Stream drawing the batches from multiple source :py:class:`StreamWrapper` s within a single epoch.
+
+    The source of each batch is sampled with the probability proportional to ``weight ** (1 / temperature)``.
+    Hence, with the weights set to the sizes of the source corpora, ``temperature`` of 1 samples the batches
+    proportionally to the corpora and higher temperatures sample them more uniformly.
+
+    Each source keeps its own buffer and producers and records its own ``read_batch_<source>`` timings.
+    If ``profile`` is given, the stream records its ``read_batch_<name>`` timings too; they include the timings of
+    its sources.
+    The epoch ends when all the sources reach their epoch end (the exhausted ones are skipped in the meantime) or,
+    if ``stop_on_first`` is set, when any of them does. With ``epoch_size`` specified, the epoch ends after the given
+    number of batches instead and the exhausted sources are simply restarted.
+
+    .. code-block:: python
+        :caption: interleave two corpora
+
+        sources = {'news': StreamWrapper(dataset.news_stream, buffer_size=8, name='news'),
+                   'books': StreamWrapper(dataset.books_stream, buffer_size=8, name='books')}
+        stream = InterleavedStream(sources, weights={'news': 3, 'books': 1}, name='train')
+        with stream:
+            for batch in stream:
+                # do stuff
+        stream.close()
+
+    The interface of :py:class:`StreamWrapper` used by the :py:class:`emloop.MainLoop` and the models
+    (with-resource environment, :py:attr:`allow_buffering`, :py:meth:`release_batch` and :py:meth:`close`)
+    is forwarded to all the sources.
+    """
+
+    def __init__(self, sources: Mapping[str, StreamWrapper], weights: Optional[Mapping[str, float]]=None,
+                 temperature: float=1., name: Optional[str]=None, epoch_size: int=-1, stop_on_first: bool=False,
+                 seed: Optional[int]=None, profile: Optional[TimeProfile]=None):
+        """
+        Create new InterleavedStream.
+
+        :param sources: source streams by their names
+        :param weights: sampling weights of the sources, the sources are sampled uniformly if not specified
+        :param temperature: sampling temperature
+        :param name: stream name
+        :param epoch_size: if positive, the number of batches in each epoch
+        :param stop_on_first: end the epoch when any source reaches its epoch end
+        :param seed: seed of the source sampling
+        :param profile: profile to record the ``read_batch_<name>`` timings to
+        :raise ValueError: if there are no sources, the weights do not match the sources or the weights or
+                           the temperature are not positive
+        """
+        weights = dict(weights) if weights is not None else {source: 1. for source in sources}
+        if not sources:
+            raise ValueError('Interleaved stream `{}` has no sources.'.format(name))
+        if set(weights.keys()) != set(sources.keys()):
+            raise ValueError('Weights of interleaved stream `{}` ({}) do not match its sources ({}).'
+                             .format(name, list(weights.keys()), list(sources.keys())))
+        if temperature <= 0 or any(weight <= 0 for weight in weights.values()):
+            raise ValueError('Weights and temperature of interleaved stream `{}` must be positive.'.format(name))
+
+        self._sources = dict(sources)
+        self._names = list(self._sources.keys())
+        probabilities = np.array([weights[source] for source in self._names], dtype=np.float64) ** (1 / temperature)
+        self._probabilities = probabilities / probabilities.sum()
+        self._name = name
+        self._epoch_size = epoch_size
+        self._stop_on_first = stop_on_first
+        self._random = np.random.RandomState(seed)
+        self._last_source = None
+        self._epoch = None
+        self._profile = profile
+
+    @property
+    def name(self) -> Optional[str]:
+        """Stream name."""
+        return self._name
+
+    @property
+    def epoch_size(self) -> int:
+        """Fixed number of the batches in each epoch, non-positive values mean until the sources end."""
+        return self._epoch_size
+
+    @property
+    def sources(self) -> Mapping[str, StreamWrapper]:
+        """Source streams by their names."""
+        return self._sources
+
+    @property
+    def probabilities(self) -> Mapping[str, float]:
+        """Sampling probabilities of the sources."""
+        return dict(zip(self._names, self._probabilities))
+
+    def _sample_sources(self) -> Generator[str, bool, None]:
+        """
+        Yield the source of each batch of the epoch.
+
+        Whether the yielded source reached its epoch end is to be sent back.
+        """
+        active = np.ones(len(self._names), dtype=bool)
+        restarted = set()
+        batch_count = 0
+        while active.any() and (self._epoch_size <= 0 or batch_count < self._epoch_size):
+            probabilities = self._probabilities * active
+            index = self._random.choice(len(self._names), p=probabilities / probabilities.sum())
+            exhausted = yield self._names[index]
+            if exhausted:
+                if self._stop_on_first:
+                    return
+                if self._epoch_size <= 0 or index in restarted:  # the restarted source is empty
+                    active[index] = False
+                restarted.add(index)
+            else:
+                restarted.discard(index)
+                batch_count += 1
+
+    def __enter__(self) -> Iterator[Batch]:
+        """Enter the with-resource environment of all the sources."""
+        for source in self._sources.values():
+            source.__enter__()
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit the with-resource environment of all the sources."""
+        for source in self._sources.values():
+            source.__exit__(*args)
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Get stream iterator."""
+        return self
+
+    def __next__(self) -> Batch:
+        """
+        Return the next batch of a sampled source or end the epoch with ``StopIteration``.
+
+        :return: next batch
+        :raises StopIteration: at the end of the epoch
+        """
+        if self._profile is None:
+            return self._next_batch()
+        event_name = 'read_batch_{}'.format(self._name)
+        try:
+            with Timer(event_name, self._profile):
+                return self._next_batch()
+        except StopIteration:
+            self._profile[event_name].pop()
+            raise
+
+    def _next_batch(self) -> Batch:
+        """Return the next batch of a sampled source or end the epoch with ``StopIteration``."""
+        self.release_batch()
+        if self._epoch is None:
+            self._epoch = self._sample_sources()
+            source = next(self._epoch, None)
+        else:
+            source = self._send(False)
+        while source is not None:
+            try:
+                batch = next(self._sources[source])
+                self._last_source = source
+                return batch
+            except StopIteration:
+                source = self._send(True)
+        self._epoch = None
+        raise StopIteration
+
+    def _send(self, exhausted: bool) -> Optional[str]:
+        """Report whether the last source reached its epoch end and return the next one or ``None`` at the end."""
+        try:
+            return self._epoch.send(exhausted)
+        except StopIteration:
+            return None
+
+    def release_batch(self) -> None:
+        """Release the shared memory slot of the last returned batch (if any)."""
+        if self._last_source is not None:
+            self._sources[self._last_source].release_batch()
+            self._last_source = None
+
+    def close(self) -> None:
+        """Close all the sources."""
+        self._epoch = None
+        for source in self._sources.values():
+            source.close()
+
+    @contextmanager
+    def _allow_buffering(self) -> Iterator[None]:
+        """Allow buffering of all the sources."""
+        with ExitStack() as stack:
+            for source in self._sources.values():
+                stack.enter_context(source.allow_buffering)
+            yield
+
+    @property
+    def allow_buffering(self) -> ContextManager[None]:
+        """A resource that allows all the source streams to prepare batches in advance."""
+        return self._allow_buffering()
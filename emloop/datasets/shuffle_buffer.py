@@ -0,0 +1,148 @@
+"""
+Module with a stream stage shuffling the examples in a bounded buffer.
+"""
+from typing import Iterable, Iterator, Optional, Union, List, Tuple
+
+import numpy as np
+
+from .bucketing import Example
+from .stream_wrapper import _batch_nbytes
+from ..types import Batch
+
+
+class ShuffleBuffer:
+    """
+    Stream of the given examples shuffled in a buffer of a bounded size.
+
+    The buffer is filled with the examples read sequentially from the given iterable until it holds ``buffer_size``
+    examples or (if specified) ``buffer_bytes`` bytes of their numpy sources. Then the examples are sampled from
+    the buffer at random and each of them is replaced by the next example read. Hence, the reads stay sequential
+    (and page-cache friendly) while the examples get mixed within the windows of ``buffer_size`` examples.
+
+    With ``batch_size`` specified, the sampled examples are grouped to batches (the sources are passed as lists).
+    Otherwise, the shuffled examples are yielded one by one so that they may be passed to another stage
+    such as :py:class:`emloop.datasets.BucketByLength`.
+
+    .. code-block:: python
+        :caption: shuffled train stream
+
+        def train_stream(self):
+            return ShuffleBuffer(self._read_examples_sequentially(), buffer_size=10000, batch_size=32,
+                                 seed=self._epoch_seed())
+
+    The shuffling is seeded and resumable. The :py:meth:`state` after any yielded item may be stored
+    (it refers to the examples only by their positions in the iterable) and passed to :py:meth:`restore` of
+    a new stage with the same examples and settings in order to continue with the very same items.
+    The examples preceding the restored position are re-read (but not shuffled) in order to refill the buffer.
+    """
+
+    def __init__(self, examples: Iterable[Example], buffer_size: int, batch_size: Optional[int]=None,
+                 buffer_bytes: int=0, seed: Optional[int]=None, drop_remainder: bool=False):
+        """
+        Create new ShuffleBuffer stage.
+
+        :param examples: iterable of the examples
+        :param buffer_size: maximum number of the buffered examples
+        :param batch_size: number of the examples in a batch; the examples are yielded one by one if not specified
+        :param buffer_bytes: if positive, maximum total size (in bytes) of the numpy sources of the buffered examples
+        :param seed: seed of the shuffling
+        :param drop_remainder: drop the incomplete batch at the end of the stream
+        :raise ValueError: if ``buffer_size`` or ``batch_size`` is not positive
+        """
+        if buffer_size <= 0:
+            raise ValueError('`buffer_size` must be positive, {} given.'.format(buffer_size))
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('`batch_size` must be positive, {} given.'.format(batch_size))
+        self._examples = examples
+        self._buffer_size = buffer_size
+        self._batch_size = batch_size
+        self._buffer_bytes = buffer_bytes
+        self._drop_remainder = drop_remainder
+        self._random = np.random.RandomState(seed)
+        self._buffer = []  # type: List[Tuple[int, Example]]
+        self._buffered_bytes = 0
+        self._position = 0
+        self._restored_buffer = None
+
+    def state(self) -> dict:
+        """
+        Return the state of the shuffling after the last yielded item.
+
+        :return: YAML/JSON serializable state to be passed to :py:meth:`restore`
+        """
+        name, keys, pos, has_gauss, cached_gaussian = self._random.get_state()
+        return {'random': [name, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)],
+                'position': self._position, 'buffer': [position for position, _ in self._buffer]}
+
+    def restore(self, state: dict) -> 'ShuffleBuffer':
+        """
+        Restore the given state of the shuffling so that the iteration continues after the stored item.
+
+        :param state: state returned from :py:meth:`state`
+        :return: self
+        """
+        name, keys, pos, has_gauss, cached_gaussian = state['random']
+        self._random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+        self._restored_buffer = (state['position'], list(state['buffer']))
+        return self
+
+    def _full(self) -> bool:
+        """Return whether the buffer is full."""
+        return len(self._buffer) >= self._buffer_size or 0 < self._buffer_bytes <= self._buffered_bytes
+
+    def _append(self, position: int, example: Example) -> None:
+        """Add the given example to the buffer."""
+        self._buffer.append((position, example))
+        self._buffered_bytes += _batch_nbytes(example)
+
+    def _iterate_examples(self) -> Iterator[Example]:
+        """Return an iterator of the examples following the current position; rebuild the restored buffer first."""
+        examples = iter(self._examples)
+        self._buffer, self._buffered_bytes, self._position = [], 0, 0
+        if self._restored_buffer is not None:
+            position, buffered_positions = self._restored_buffer
+            self._restored_buffer = None
+            wanted = set(buffered_positions)
+            restored = {}
+            while self._position < position:
+                example = next(examples)
+                if self._position in wanted:
+                    restored[self._position] = example
+                self._position += 1
+            for buffered_position in buffered_positions:
+                self._append(buffered_position, restored[buffered_position])
+        return examples
+
+    def _sample(self, examples: Iterator[Example]) -> Optional[Example]:
+        """Fill the buffer, remove a random example from it and return it; return ``None`` if it is empty."""
+        while not self._full():
+            example = next(examples, None)
+            if example is None:
+                break
+            self._append(self._position, example)
+            self._position += 1
+        if not self._buffer:
+            return None
+        index = self._random.randint(len(self._buffer))
+        self._buffer[index], self._buffer[-1] = self._buffer[-1], self._buffer[index]
+        _, example = self._buffer.pop()
+        self._buffered_bytes -= _batch_nbytes(example)
+        return example
+
+    def __iter__(self) -> Iterator[Union[Example, Batch]]:
+        """Yield the shuffled examples or their batches."""
+        examples = self._iterate_examples()
+        batch = []
+        while True:
+            example = self._sample(examples)
+            if example is None:
+                break
+            if self._batch_size is None:
+                yield example
+                continue
+            batch.append(example)
+            if len(batch) == self._batch_size:
+                yield {source: [example[source] for example in batch] for source in batch[0].keys()}
+                batch = []
+        if batch and not self._drop_remainder:
+            yield {source: [example[source] for example in batch] for source in batch[0].keys()}
@@ -0,0 +1,368 @@
+"""
+Module with batch caches allowing to replay the recorded epochs of deterministic streams.
+"""
+import os
+import zlib
+import shutil
+import pickle
+import logging
+import os.path as path
+from collections import namedtuple, OrderedDict
+from typing import Callable, Iterator, Optional, List, Union
+
+import numpy as np
+
+from ..types import Batch, ColumnarBatch
+
+try:
+    import lz4.frame
+except ImportError:
+    logging.info('LZ4 compression of the memory cache requires lz4.')
+
+
+_CachedArray = namedtuple('_CachedArray', 'chunk dtype shape offset')
+"""Location of a cached numpy source in the chunk files."""
+
+_CompressedArray = namedtuple('_CompressedArray', 'dtype shape data')
+"""Compressed numpy source of a batch in the memory cache."""
+
+
+_ColumnarEntry = namedtuple('_ColumnarEntry', 'sources schema batch_size')
+"""Cached :py:class:`emloop.ColumnarBatch`; the other batches are cached as plain dicts of their sources."""
+
+
+def _is_cacheable(value) -> bool:
+    """Return whether the given source is a numpy array which may be stored as raw bytes."""
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def _cache_entry(batch: Batch, sources: dict) -> Union[dict, _ColumnarEntry]:
+    """Return the cache entry of the given batch with the given cached sources."""
+    if isinstance(batch, ColumnarBatch):
+        return _ColumnarEntry(sources, batch.schema, batch.batch_size)
+    return sources
+
+
+def _entry_sources(entry: Union[dict, _ColumnarEntry]) -> dict:
+    """Return the cached sources of the given cache entry."""
+    return entry.sources if isinstance(entry, _ColumnarEntry) else entry
+
+
+def _restore_batch(entry: Union[dict, _ColumnarEntry], restore_source: Callable) -> Batch:
+    """Restore the batch of the given cache entry; the columnar batches are restored with their cached schema."""
+    sources = {name: restore_source(value) for name, value in _entry_sources(entry).items()}
+    if isinstance(entry, _ColumnarEntry):
+        return ColumnarBatch.from_schema(sources, entry.schema, entry.batch_size)
+    return sources
+
+
+class StreamCache:
+    """
+    Base class of the caches of the stream batches.
+
+    The cache records the batches of a single epoch (see :py:meth:`record`) and once the epoch is finished
+    (see :py:meth:`finish`), it is :py:attr:`complete` and the epoch may be replayed (see :py:meth:`replay`).
+    Naturally, this is valid only for the streams which produce the very same batches every epoch.
+    """
+
+    @property
+    def complete(self) -> bool:
+        """Whether the cache contains a whole epoch."""
+        raise NotImplementedError()
+
+    def record(self, batch: Batch) -> None:
+        """
+        Record the given batch of the current epoch.
+
+        :param batch: batch to be recorded
+        """
+        raise NotImplementedError()
+
+    def finish(self) -> None:
+        """Finish the recording of the current epoch and make it available for replaying."""
+        raise NotImplementedError()
+
+    def abort(self) -> None:
+        """Discard the incomplete recording of the current epoch (if any)."""
+        raise NotImplementedError()
+
+    def replay(self) -> Iterator[Batch]:
+        """Return an iterator of the recorded epoch batches."""
+        raise NotImplementedError()
+
+
+class DiskCache(StreamCache):
+    """
+    Stream cache persisted in a directory so that it may be reused by the later runs.
+
+    The numpy sources are stored in memory-mappable chunk files and replayed as copy-on-write views of them;
+    i.e., the replayed batches are read from the disk lazily and they may be modified without affecting the cache.
+    The other sources are pickled along with the index of the batches.
+
+    The epoch is recorded to a temporary directory which is renamed once the epoch is finished so that an interrupted
+    recording or a concurrent run can never leave an inconsistent cache behind.
+    """
+
+    INDEX_FILE = 'index.pkl'
+    """Name of the file with the index of the cached batches."""
+
+    ALIGNMENT = 64
+    """Alignment (in bytes) of the arrays in the chunk files."""
+
+    def __init__(self, cache_dir: str, chunk_size: int=2**30):
+        """
+        Create new DiskCache.
+
+        :param cache_dir: directory of the cache
+        :param chunk_size: size (in bytes) after which a new chunk file is started
+        """
+        self._cache_dir = cache_dir
+        self._chunk_size = chunk_size
+        self._index = None
+        self._chunks = None
+        self._recording_dir = None
+        self._recording = None
+        self._chunk_file = None
+        self._chunk_count = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether the cache directory contains a whole epoch."""
+        return path.exists(path.join(self._cache_dir, DiskCache.INDEX_FILE))
+
+    def _chunk_path(self, directory: str, chunk: int) -> str:
+        """Return the path to the given chunk file in the given directory."""
+        return path.join(directory, 'chunk_{}.bin'.format(chunk))
+
+    def _write_array(self, value: np.ndarray) -> _CachedArray:
+        """Append the given array to the current chunk file (possibly starting a new one) and return its location."""
+        offset = self._chunk_file.tell() if self._chunk_file is not None else 0
+        offset = -(-offset // DiskCache.ALIGNMENT) * DiskCache.ALIGNMENT
+        if self._chunk_file is None or (offset > 0 and offset + value.nbytes > self._chunk_size):
+            if self._chunk_file is not None:
+                self._chunk_file.close()
+            self._chunk_file = open(self._chunk_path(self._recording_dir, self._chunk_count), 'wb')
+            self._chunk_count += 1
+            offset = 0
+        self._chunk_file.seek(offset)
+        self._chunk_file.write(np.ascontiguousarray(value).tobytes())
+        return _CachedArray(self._chunk_count - 1, value.dtype, value.shape, offset)
+
+    def _start_recording(self) -> None:
+        """Create an empty temporary directory for the recording."""
+        self._recording_dir = '{}.{}.tmp'.format(self._cache_dir.rstrip(os.sep), os.getpid())
+        shutil.rmtree(self._recording_dir, ignore_errors=True)
+        os.makedirs(self._recording_dir)
+        self._recording = []
+        self._chunk_count = 0
+
+    def record(self, batch: Batch) -> None:
+        """Write the numpy sources of the given batch to the chunk files and add the batch to the index."""
+        if self._recording is None:
+            self._start_recording()
+        sources = {}
+        for name, value in batch.items():
+            if _is_cacheable(value) and value.nbytes > 0:
+                value = self._write_array(value)
+            sources[name] = value
+        self._recording.append(_cache_entry(batch, sources))
+
+    def _close_recording(self) -> None:
+        """Close the current chunk file and forget the recording."""
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+        self._recording = None
+
+    def finish(self) -> None:
+        """Write the index and move the recorded epoch to the cache directory unless another run already did so."""
+        if self._recording is None:  # empty epoch
+            self._start_recording()
+        with open(path.join(self._recording_dir, DiskCache.INDEX_FILE), 'wb') as index_file:
+            pickle.dump(self._recording, index_file)
+        self._close_recording()
+        os.makedirs(path.dirname(path.abspath(self._cache_dir)), exist_ok=True)
+        try:
+            os.rename(self._recording_dir, self._cache_dir)
+        except OSError:  # the cache has been completed by another run in the meantime
+            shutil.rmtree(self._recording_dir, ignore_errors=True)
+
+    def abort(self) -> None:
+        """Discard the incomplete recording."""
+        if self._recording is not None:
+            self._close_recording()
+            shutil.rmtree(self._recording_dir, ignore_errors=True)
+
+    def _load(self) -> None:
+        """Load the index and memory-map the chunk files."""
+        with open(path.join(self._cache_dir, DiskCache.INDEX_FILE), 'rb') as index_file:
+            self._index = pickle.load(index_file)
+        self._chunks = {}
+        for entry in self._index:
+            for value in _entry_sources(entry).values():
+                if isinstance(value, _CachedArray) and value.chunk not in self._chunks:
+                    self._chunks[value.chunk] = np.memmap(self._chunk_path(self._cache_dir, value.chunk), mode='c')
+
+    def replay(self) -> Iterator[Batch]:
+        """Yield the recorded batches as views of the memory-mapped chunk files."""
+        if self._index is None:
+            self._load()
+
+        def restore_source(value):
+            if isinstance(value, _CachedArray):
+                return np.ndarray(value.shape, value.dtype, buffer=self._chunks[value.chunk], offset=value.offset)
+            return value
+
+        for entry in self._index:
+            yield _restore_batch(entry, restore_source)
+
+
+
+class MemoryCachePool:
+    """
+    Memory shared by the :py:class:`MemoryCache` instances of multiple streams.
+
+    The pool keeps the recorded epochs within the given size limit. When a newly recorded epoch does not fit,
+    the least recently replayed epochs of the other streams are evicted. The epochs which would not fit even in
+    the empty pool are not stored at all.
+    """
+
+    COMPRESSIONS = ['zlib', 'lz4']
+    """Supported compressions of the numpy sources."""
+
+    def __init__(self, limit: int, compression: Optional[str]=None):
+        """
+        Create new MemoryCachePool.
+
+        :param limit: maximum total size (in bytes) of the stored epochs
+        :param compression: compression of the numpy sources (one of :py:attr:`COMPRESSIONS`), ``None`` means raw
+        :raise ValueError: if the compression is not supported
+        :raise ImportError: if the compression requires a missing package
+        """
+        if compression is not None and compression not in MemoryCachePool.COMPRESSIONS:
+            raise ValueError('Unsupported memory cache compression `{}`; use one of {}.'
+                             .format(compression, MemoryCachePool.COMPRESSIONS))
+        if compression == 'lz4' and 'lz4' not in globals():
+            raise ImportError('LZ4 compression of the memory cache requires lz4.')
+        self._limit = limit
+        self._compression = compression
+        self._epochs = OrderedDict()  # stream key -> (entries, nbytes) in the order of use
+
+    @property
+    def limit(self) -> int:
+        """Maximum total size (in bytes) of the stored epochs."""
+        return self._limit
+
+    @property
+    def nbytes(self) -> int:
+        """Total size (in bytes) of the stored epochs."""
+        return sum(nbytes for _, nbytes in self._epochs.values())
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether an epoch of the given stream is stored."""
+        return key in self._epochs
+
+    def compress(self, value: np.ndarray):
+        """Return the representation of the given numpy source to be stored in the pool."""
+        if self._compression is None:
+            value = value.copy()  # the batch may be a view of a reused buffer
+            value.flags.writeable = False
+            return value
+        data = np.ascontiguousarray(value).tobytes()
+        data = zlib.compress(data, 1) if self._compression == 'zlib' else lz4.frame.compress(data)
+        return _CompressedArray(value.dtype, value.shape, data)
+
+    def decompress(self, value) -> np.ndarray:
+        """Return the numpy source represented by the given value returned from :py:meth:`compress`."""
+        if not isinstance(value, _CompressedArray):
+            return value
+        data = zlib.decompress(value.data) if self._compression == 'zlib' else lz4.frame.decompress(value.data)
+        return np.frombuffer(bytearray(data), dtype=value.dtype).reshape(value.shape)
+
+    def store(self, key: str, entries: List[dict], nbytes: int) -> bool:
+        """
+        Store the given epoch of the given stream, evicting the least recently used epochs if necessary.
+
+        :param key: stream key
+        :param entries: the epoch batches with the numpy sources returned from :py:meth:`compress`
+        :param nbytes: size of the epoch in the pool
+        :return: whether the epoch was stored
+        """
+        self._epochs.pop(key, None)
+        if nbytes > self._limit:
+            logging.warning('Epoch of stream `%s` (%d bytes) does not fit in the memory cache of %d bytes.',
+                            key, nbytes, self._limit)
+            return False
+        while self.nbytes + nbytes > self._limit:
+            evicted, _ = self._epochs.popitem(last=False)
+            logging.debug('Evicting stream `%s` from the memory cache', evicted)
+        self._epochs[key] = (entries, nbytes)
+        return True
+
+    def load(self, key: str) -> List[dict]:
+        """Return the stored epoch of the given stream and mark it as the most recently used."""
+        self._epochs.move_to_end(key)
+        return self._epochs[key][0]
+
+
+class MemoryCache(StreamCache):
+    """
+    Stream cache keeping the recorded epoch in a (possibly shared) :py:class:`MemoryCachePool`.
+
+    The replayed numpy sources are read-only unless they are compressed.
+    Other sources are stored by reference, so they must not be modified.
+
+    Once an epoch of the stream overflows the pool limit, the stream is no longer recorded.
+    """
+
+    def __init__(self, pool: MemoryCachePool, key: str):
+        """
+        Create new MemoryCache.
+
+        :param pool: memory pool storing the epochs
+        :param key: unique key of the stream in the pool
+        """
+        self._pool = pool
+        self._key = key
+        self._recording = None
+        self._recording_nbytes = 0
+        self._uncacheable = False
+
+    @property
+    def complete(self) -> bool:
+        """Whether the pool contains the epoch of this stream."""
+        return self._key in self._pool
+
+    def record(self, batch: Batch) -> None:
+        """Store the (possibly compressed) copy of the numpy sources of the given batch."""
+        if self._uncacheable:
+            return
+        if self._recording is None:
+            self._recording, self._recording_nbytes = [], 0
+        sources = {}
+        for name, value in batch.items():
+            if _is_cacheable(value):
+                value = self._pool.compress(value)
+                self._recording_nbytes += value.nbytes if isinstance(value, np.ndarray) else len(value.data)
+            sources[name] = value
+        self._recording.append(_cache_entry(batch, sources))
+        if self._recording_nbytes > self._pool.limit:
+            logging.warning('Epoch of stream `%s` exceeds the memory cache of %d bytes; the stream will not be '
+                            'cached.', self._key, self._pool.limit)
+            self._uncacheable = True
+            self.abort()
+
+    def finish(self) -> None:
+        """Store the recorded epoch in the pool."""
+        if not self._uncacheable:
+            self._uncacheable = not self._pool.store(self._key, self._recording or [], self._recording_nbytes)
+        self.abort()
+
+    def abort(self) -> None:
+        """Forget the recorded batches."""
+        self._recording, self._recording_nbytes = None, 0
+
+    def replay(self) -> Iterator[Batch]:
+        """Yield the recorded batches."""
+        for entry in self._pool.load(self._key):
+            yield _restore_batch(entry, self._pool.decompress)
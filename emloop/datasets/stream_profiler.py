@@ -0,0 +1,172 @@
+"""
+Module with a full-pass profiler and a throughput benchmark of the dataset streams.
+"""
+import itertools
+import time
+from collections import Counter
+from typing import Callable, Optional, Any, Tuple
+
+import numpy as np
+
+from .stream_wrapper import StreamWrapper
+from ..types import Stream, Batch
+
+
+def _batch_size(batch: Batch) -> int:
+    """Return the number of the examples in the given batch (the length of its longest source)."""
+    return max((len(value) if np.ndim(value) > 0 else 1 for value in batch.values()), default=0)
+
+
+def _source_array(value: Any) -> Optional[np.ndarray]:
+    """Return the given stream source as a numpy array or ``None`` if it is ragged (non-rectangular)."""
+    try:
+        array = np.asarray(value)
+    except ValueError:  # np broadcasting failed
+        return None
+    if array.ndim > 0 and len(array) > 0 and array.shape[1:] != np.shape(array[0]):
+        return None
+    return array
+
+
+class _SourceProfile:
+    """Dtypes, shapes and value range of a single stream source accumulated over the batches."""
+
+    def __init__(self):
+        self.dtypes = Counter()
+        self.shapes = Counter()
+        self.ragged_batches = 0
+        self.min = self.max = None
+
+    def update(self, value: Any) -> Tuple[int, int]:
+        """
+        Account the given value of the source.
+
+        :param value: the source of a single batch
+        :return: size of the source in bytes and its number of examples
+        """
+        array = _source_array(value)
+        if array is None:
+            self.ragged_batches += 1
+            self.dtypes[type(value[0]).__name__] += 1
+            self.shapes[str((len(value),))] += 1
+            return 0, len(value)
+        self.dtypes[str(array.dtype)] += 1
+        self.shapes[str(array.shape)] += 1
+        if array.size > 0 and array.dtype.kind in 'buif':  # boolean, unsigned, integer, float
+            low, high = array.min().item(), array.max().item()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        return array.nbytes, len(array) if array.ndim > 0 else 1
+
+    def report(self) -> dict:
+        """Return JSON serializable report of the source."""
+        return {'dtypes': dict(self.dtypes), 'shapes': dict(self.shapes), 'ragged_batches': self.ragged_batches,
+                'min': self.min, 'max': self.max}
+
+
+def profile_stream(stream_fn: Callable[[], Stream], workers: int=0, name: Optional[str]=None,
+                   start_method: Optional[str]=None) -> dict:
+    """
+    Iterate the whole stream and report its sources and throughput.
+
+    The report contains:
+        - the number of batches and examples
+        - the time to the first batch, the total time and the batches and examples per second
+        - the mean, minimum and maximum number of bytes per batch
+        - histograms of the dtypes and shapes of each source, the number of its ragged batches and its value range
+
+    :param stream_fn: function creating the stream
+    :param workers: number of the producer processes (see :py:class:`emloop.datasets.StreamWrapper`)
+    :param name: stream name
+    :param start_method: start method of the producer processes
+    :return: JSON serializable report of the stream
+    """
+    sources = {}
+    batch_bytes = []
+    examples = 0
+    time_to_first_batch = None
+    stream = StreamWrapper(stream_fn, workers=workers, name=name, start_method=start_method)
+    start = time.perf_counter()
+    try:
+        with stream:
+            for batch in stream:
+                if time_to_first_batch is None:
+                    time_to_first_batch = time.perf_counter() - start
+                sizes = [sources.setdefault(source, _SourceProfile()).update(value)
+                         for source, value in batch.items()]
+                batch_bytes.append(sum(nbytes for nbytes, _ in sizes))
+                examples += max((length for _, length in sizes), default=0)
+                stream.release_batch()
+    finally:
+        stream.close()
+    seconds = time.perf_counter() - start
+
+    return {'batches': len(batch_bytes), 'examples': examples, 'time_to_first_batch': time_to_first_batch,
+            'seconds': seconds, 'batches_per_second': len(batch_bytes) / seconds if seconds > 0 else None,
+            'examples_per_second': examples / seconds if seconds > 0 else None,
+            'bytes_per_batch': {'mean': float(np.mean(batch_bytes)) if batch_bytes else 0,
+                                'min': min(batch_bytes, default=0), 'max': max(batch_bytes, default=0)},
+            'sources': {source: profile.report() for source, profile in sources.items()}}
+
+
+def benchmark_stream(stream_fn: Callable[[], Stream], buffer_size: int=0, workers: int=0, warmup: int=5,
+                     max_batches: int=-1, step_time: float=0., stall_ratio: float=0.05, name: Optional[str]=None,
+                     start_method: Optional[str]=None) -> dict:
+    """
+    Read (an epoch of) the stream through :py:class:`emloop.datasets.StreamWrapper` without a model and measure
+    its throughput.
+
+    The first ``warmup`` batches (e.g. spent starting the producers and filling the buffer) are not measured.
+    With ``step_time`` > 0, each batch is followed by a simulated model step of the given duration
+    during which the buffering is allowed; hence, the throughput can not exceed one batch per ``step_time``.
+    The pipeline keeps up with the step if the mean time spent waiting for a batch does not exceed
+    ``stall_ratio`` of the step.
+
+    :param stream_fn: function creating the stream
+    :param buffer_size: buffer size of the stream
+    :param workers: number of the producer processes
+    :param warmup: number of the batches which are not measured
+    :param max_batches: if positive, maximum number of the measured batches
+    :param step_time: duration of the simulated model step in seconds
+    :param stall_ratio: maximum acceptable ratio of the read time to the step time
+    :param name: stream name
+    :param start_method: start method of the producer processes
+    :return: JSON serializable report with the measured batches, batches/examples/MB per second,
+             mean read time per batch and whether the stream keeps up with the step (``None`` without a step)
+    """
+    batches = examples = nbytes = 0
+    read_time = 0.
+    start = None
+    stream = StreamWrapper(stream_fn, buffer_size=buffer_size, workers=workers, name=name, start_method=start_method)
+    try:
+        with stream:
+            for count in itertools.count():
+                if count == warmup:
+                    start = time.perf_counter()
+                    batches = examples = nbytes = 0
+                    read_time = 0.
+                if start is not None and 0 < max_batches <= batches:
+                    break
+                read_start = time.perf_counter()
+                batch = next(stream, None)
+                if batch is None:
+                    break
+                read_time += time.perf_counter() - read_start
+                batches += 1
+                examples += _batch_size(batch)
+                nbytes += sum(array.nbytes for array in map(_source_array, batch.values()) if array is not None)
+                stream.release_batch()
+                if step_time > 0:
+                    with stream.allow_buffering:
+                        time.sleep(step_time)
+    finally:
+        stream.close()
+    seconds = time.perf_counter() - start if start is not None else 0.
+    measured = batches > 0 and seconds > 0
+
+    return {'buffer': buffer_size, 'workers': workers, 'batches': batches if start is not None else 0,
+            'batches_per_second': batches / seconds if measured else None,
+            'examples_per_second': examples / seconds if measured else None,
+            'megabytes_per_second': nbytes / seconds / 2**20 if measured else None,
+            'read_time_per_batch': read_time / batches if measured else None,
+            'keeps_up': read_time / batches <= stall_ratio * step_time if measured and step_time > 0 else None}
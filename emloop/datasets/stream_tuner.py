@@ -0,0 +1,132 @@
+"""
+Module with automatic tuning of the stream buffers and producer processes.
+"""
+import logging
+from typing import Optional, Dict, Union
+
+from .stream_wrapper import StreamWrapper
+from .interleaved_stream import InterleavedStream
+from ..types import TimeProfile
+
+
+class StreamTuner:
+    """
+    Tune the buffer size and/or the number of producer processes of the streams according to the epoch profile.
+
+    After each epoch of a stream, the total time of reading its batches (``read_batch_<stream>``) is compared to
+    the total time of evaluating them (``eval_batch_<stream>``). If the ratio exceeds ``stall_ratio``, the model
+    waited for the data and the stream gets a larger buffer or, once the buffer is in place, another producer
+    process. If the reading is negligible (less than a tenth of ``stall_ratio``), the buffer is halved, but never
+    back to a size which stalled. The tuning of each stream ends after the given number of its epochs and
+    every decision is logged.
+
+    The sources of an :py:class:`InterleavedStream` are tuned separately; each of them is compared to the eval time
+    of its share of the batches.
+
+    The streams are resized between their epochs. Some of the changes (e.g. of the number of the producer processes)
+    restart the stream from its beginning (see :py:meth:`StreamWrapper.resize`). As the epochs of a stream with
+    a fixed epoch size do not start at the beginning of the stream, such changes are not applied to these streams
+    lest they change the batches of the following epochs; only their buffer may be tuned.
+    """
+
+    def __init__(self, tune_buffer: bool, tune_workers: bool, max_buffer: int, max_workers: int,
+                 epochs: int=3, stall_ratio: float=0.05):
+        """
+        Create new StreamTuner.
+
+        :param tune_buffer: tune the buffer size
+        :param tune_workers: tune the number of the producer processes
+        :param max_buffer: maximum buffer size (the memory cap)
+        :param max_workers: maximum number of the producer processes (the CPU cap)
+        :param epochs: number of the epochs of each stream in which it is tuned
+        :param stall_ratio: maximum acceptable ratio of the read time to the eval time
+        """
+        self._tune_buffer = tune_buffer
+        self._tune_workers = tune_workers
+        self._max_buffer = max_buffer
+        self._max_workers = max_workers
+        self._epochs = epochs
+        self._stall_ratio = stall_ratio
+        self._epochs_done = {}  # type: Dict[str, int]
+        self._stalled_buffer = {}  # type: Dict[str, int]
+
+    @staticmethod
+    def _resize(stream: StreamWrapper, fixed_epoch: bool, buffer_size: Optional[int]=None,
+                workers: Optional[int]=None) -> bool:
+        """Resize the given stream unless it would restart the stream with a fixed epoch size; return whether done."""
+        if fixed_epoch and stream.resize_restarts(buffer_size, workers):
+            return False
+        stream.resize(buffer_size=buffer_size, workers=workers)
+        return True
+
+    def _propose(self, stream: StreamWrapper, ratio: float, fixed_epoch: bool) -> Optional[str]:
+        """Apply a change of the given stream according to the given read/eval ratio and return its description."""
+        buffer_size, workers = stream.buffer_size, stream.workers
+        if ratio > self._stall_ratio:
+            self._stalled_buffer[stream.name] = max(buffer_size, self._stalled_buffer.get(stream.name, 0))
+            if self._tune_workers and workers < self._max_workers and (buffer_size > 0 or not self._tune_buffer) \
+                    and StreamTuner._resize(stream, fixed_epoch, workers=workers + 1):
+                return 'workers {} -> {}'.format(workers, workers + 1)
+            if self._tune_buffer and buffer_size < self._max_buffer:
+                new_size = min(max(1, 2 * buffer_size), self._max_buffer)
+                if StreamTuner._resize(stream, fixed_epoch, buffer_size=new_size):
+                    return 'buffer {} -> {}'.format(buffer_size, new_size)
+            if fixed_epoch:
+                logging.info('Stream `%s` still stalls (read/eval ratio %.3f) but it has a fixed epoch size and '
+                             'resizing it would restart it', stream.name, ratio)
+            else:
+                logging.info('Stream `%s` still stalls (read/eval ratio %.3f) but the tuning caps of %d buffered '
+                             'batches and %d workers were reached', stream.name, ratio, self._max_buffer,
+                             self._max_workers)
+        elif ratio < self._stall_ratio / 10 and self._tune_buffer:
+            new_size = max(buffer_size // 2, self._stalled_buffer.get(stream.name, 0) + 1)
+            if new_size < buffer_size and StreamTuner._resize(stream, fixed_epoch, buffer_size=new_size):
+                return 'buffer {} -> {}'.format(buffer_size, new_size)
+        return None
+
+    def tune(self, stream: Union[StreamWrapper, InterleavedStream], profile: TimeProfile) -> None:
+        """
+        Tune the given stream according to its timings in the given epoch profile.
+
+        :param stream: stream whose epoch has just finished
+        :param profile: epoch profile with the ``read_batch_<stream>`` and ``eval_batch_<stream>`` timings
+                        (``read_batch_<source>`` for the sources of an :py:class:`InterleavedStream`)
+        """
+        eval_times = profile.get('eval_batch_{}'.format(stream.name), [])
+        fixed_epoch = stream.epoch_size > 0
+        if not isinstance(stream, InterleavedStream):
+            self._tune_stream(stream, sum(profile.get('read_batch_{}'.format(stream.name), [])), sum(eval_times),
+                              fixed_epoch)
+            return
+        for source in stream.sources.values():
+            read_times = profile.get('read_batch_{}'.format(source.name), [])
+            # the eval time of the batches read from the source
+            eval_time = sum(eval_times) * len(read_times) / len(eval_times) if eval_times else 0.
+            self._tune_stream(source, sum(read_times), eval_time, fixed_epoch)
+
+    def _tune_stream(self, stream: StreamWrapper, read_time: float, eval_time: float, fixed_epoch: bool) -> None:
+        """
+        Tune the given stream according to the given total read and eval times of its epoch.
+
+        :param stream: stream whose epoch has just finished
+        :param read_time: total time of reading the batches
+        :param eval_time: total time of evaluating the batches
+        :param fixed_epoch: whether the epochs of the stream have a fixed size
+        """
+        epochs_done = self._epochs_done.get(stream.name, 0)
+        if epochs_done >= self._epochs:
+            return
+        self._epochs_done[stream.name] = epochs_done + 1
+
+        if eval_time <= 0:
+            return
+        ratio = read_time / eval_time
+        change = self._propose(stream, ratio, fixed_epoch)
+        if change is not None:
+            logging.info('Stream `%s` read/eval ratio %.3f; auto-tuning %s', stream.name, ratio, change)
+        else:
+            logging.info('Stream `%s` read/eval ratio %.3f; keeping buffer %d and workers %d',
+                         stream.name, ratio, stream.buffer_size, stream.workers)
+        if epochs_done + 1 == self._epochs:
+            logging.info('Auto-tuning of stream `%s` finished with buffer %d and workers %d',
+                         stream.name, stream.buffer_size, stream.workers)
@@ -1,15 +1,271 @@
 import time
-
-from typing import Callable, Optional, Iterator
-from threading import Thread, Event, Semaphore
-from queue import Queue, Empty
-
-from ..constants import EL_BUFFER_SLEEP
-from ..types import Batch, Stream, TimeProfile
+import signal
+import inspect
+import logging
+import itertools
+import traceback
+import multiprocessing
+
+from collections import deque
+from typing import Callable, Optional, Iterator, Union, Mapping, Tuple, List
+from threading import Thread, Semaphore, Condition
+from queue import Empty
+
+import numpy as np
+
+try:
+    import multiprocessing.shared_memory
+except ImportError:
+    logging.info('Shared memory transport of the stream batches requires Python 3.8 or newer.')
+
+from ..constants import EL_BUFFER_SLEEP, EL_WORKER_POLL_TIMEOUT, EL_BUFFER_MAX_BATCHES
+from .stream_cache import StreamCache
+from .async_stream import AsyncStream, iterate_stream
+from ..types import Batch, Stream, TimeProfile, ColumnarBatch
 from ..utils.misc import ReleasedSemaphore
 from ..utils.profile import Timer
 
 
+class _WorkerFailure:
+    """Message sent by a producer process which failed; carries the formatted traceback."""
+
+    def __init__(self, formatted_traceback: str):
+        self.traceback = formatted_traceback
+
+
+class _SharedBatch:
+    """Message sent by a producer process which wrote the batch numpy sources to a shared memory slot."""
+
+    def __init__(self, slot: int, sources: list, columnar: Optional[tuple]=None):
+        """
+        :param slot: index of the shared memory slot
+        :param sources: list of (``source_name``, ``(dtype, shape, offset)``) tuples for the sources stored in the slot
+                        and (``source_name``, ``value``) tuples for the other sources
+        :param columnar: schema and batch size of a :py:class:`emloop.ColumnarBatch`; ``None`` for the other batches
+        """
+        self.slot = slot
+        self.sources = sources
+        self.columnar = columnar
+
+
+class _SharedMemoryRing:
+    """
+    Ring of preallocated shared memory slots to which the producer processes write the batch numpy sources.
+
+    The slot indices circulate between the consumer and the producers through a queue of free slots; a producer takes
+    a free slot, writes the batch to it and sends a :py:class:`_SharedBatch` message to the consumer. The consumer
+    creates numpy views of the slot and returns the slot once the batch is processed.
+    """
+
+    _ALIGNMENT = 64
+    """Alignment (in bytes) of the arrays stored in the slots."""
+
+    def __init__(self, context, slot_count: int, slot_size: int):
+        """
+        Allocate the shared memory.
+
+        :param context: multiprocessing context used to create the free slots queue
+        :param slot_count: number of the slots
+        :param slot_size: size of a single slot in bytes
+        """
+        self._slot_size = slot_size
+        self._memory = multiprocessing.shared_memory.SharedMemory(create=True, size=slot_count * slot_size)
+        self._free_slots = context.Queue()
+        for slot in range(slot_count):
+            self._free_slots.put(slot)
+
+    @staticmethod
+    def _is_shareable(value) -> bool:
+        """Return whether the given source may be stored in the shared memory."""
+        return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+    def write(self, batch: Batch) -> Union[Batch, _SharedBatch]:
+        """
+        Write the numpy sources of the given batch to a free slot; block until some slot is free.
+
+        The batch is returned intact if it does not fit in a single slot.
+
+        :param batch: batch to be written
+        :return: message describing the written batch or the original batch
+        """
+        arrays_size = sum(-(-value.nbytes // self._ALIGNMENT) * self._ALIGNMENT
+                          for value in batch.values() if self._is_shareable(value))
+        if arrays_size == 0 or arrays_size > self._slot_size:
+            return batch
+        slot = self._free_slots.get()
+        offset = slot * self._slot_size
+        sources = []
+        for name, value in batch.items():
+            if self._is_shareable(value):
+                np.ndarray(value.shape, value.dtype, buffer=self._memory.buf, offset=offset)[...] = value
+                sources.append((name, (value.dtype, value.shape, offset)))
+                offset += -(-value.nbytes // self._ALIGNMENT) * self._ALIGNMENT
+            else:
+                sources.append((name, value))
+        columnar = (batch.schema, batch.batch_size) if isinstance(batch, ColumnarBatch) else None
+        return _SharedBatch(slot, sources, columnar)
+
+    def read(self, message: _SharedBatch) -> Batch:
+        """
+        Create a batch of numpy views of the slot described by the given message.
+
+        :param message: message sent by :py:meth:`write`
+        :return: batch which is valid until the slot is released; columnar if the written batch was columnar
+        """
+        batch = {}
+        for name, value in message.sources:
+            if isinstance(value, tuple):
+                dtype, shape, offset = value
+                value = np.ndarray(shape, dtype, buffer=self._memory.buf, offset=offset)
+            batch[name] = value
+        if message.columnar is not None:
+            return ColumnarBatch.from_schema(batch, *message.columnar)
+        return batch
+
+    def release(self, slot: int) -> None:
+        """Return the given slot to the producers."""
+        self._free_slots.put(slot)
+
+    def close(self) -> None:
+        """Free the shared memory."""
+        self._free_slots.cancel_join_thread()
+        self._free_slots.close()
+        try:
+            self._memory.close()
+        except BufferError:  # some batch views are still referenced; the memory is freed once they are collected
+            pass
+        self._memory.unlink()
+
+
+def _batch_nbytes(batch: Optional[Batch]) -> int:
+    """Return the total size (in bytes) of the numpy sources of the given batch; 0 for the buffer marks."""
+    if not isinstance(batch, Mapping):
+        return 0
+    return sum(value.nbytes for value in batch.values() if isinstance(value, np.ndarray))
+
+
+class _SharedByteBudget:
+    """Limit of the total size of the batches queued by a single producer process."""
+
+    def __init__(self, context, limit: int):
+        """
+        :param context: multiprocessing context used to create the shared counter
+        :param limit: maximum total size (in bytes) of the queued batches
+        """
+        self._limit = limit
+        self._condition = context.Condition()
+        self._queued = context.Value('q', 0, lock=False)  # guarded by the condition
+
+    @property
+    def queued(self) -> int:
+        """Total size (in bytes) of the queued batches."""
+        return self._queued.value
+
+    def acquire(self, nbytes: int) -> None:
+        """
+        Block until the given number of bytes fits in the limit and add them to the queued bytes.
+
+        A single batch is always allowed in order to avoid a deadlock with the batches bigger than the limit.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._queued.value == 0 or self._queued.value + nbytes <= self._limit)
+            self._queued.value += nbytes
+
+    def release(self, nbytes: int) -> None:
+        """Subtract the given number of bytes from the queued bytes."""
+        if nbytes > 0:
+            with self._condition:
+                self._queued.value -= nbytes
+                self._condition.notify_all()
+
+
+def _create_stream(stream_fn: Callable[[], Stream], shard_index: int=0, num_shards: int=1,
+                   worker_index: Optional[int]=None, num_workers: Optional[int]=None,
+                   async_in_flight: int=1) -> Iterator:
+    """Create the raw stream iterator of the given shard and producer process (see :py:func:`_open_stream`)."""
+    return _open_stream(stream_fn, shard_index, num_shards, worker_index, num_workers, async_in_flight)[1]
+
+
+def _open_stream(stream_fn: Callable[[], Stream], shard_index: int=0, num_shards: int=1,
+                 worker_index: Optional[int]=None, num_workers: Optional[int]=None,
+                 async_in_flight: int=1) -> Tuple[Stream, Iterator]:
+    """
+    Create the raw stream iterator of the given shard and (optionally) of the given producer process.
+
+    If the stream function accepts ``shard_index`` and ``num_shards`` (or ``worker_index`` and ``num_workers``)
+    arguments, it is expected to produce only its own part of the stream. Otherwise, the stream is split
+    round-robin, i.e. the shard (or the worker) keeps every ``num_shards``-th (or ``num_workers``-th) batch only.
+
+    :param stream_fn: callable which returns raw dataset stream
+    :param shard_index: index of the stream shard
+    :param num_shards: total number of the stream shards
+    :param worker_index: index of the producer process, ``None`` if the stream is not iterated in a producer process
+    :param num_workers: total number of the producer processes
+    :param async_in_flight: maximum number of the concurrently awaited items of an asynchronous stream
+    :return: tuple of the stream returned by the stream function and the iterator of the given shard and
+             producer process
+    """
+    kwargs = {}
+    shard_aware = _accepts_args(stream_fn, 'shard_index', 'num_shards')
+    worker_aware = worker_index is not None and _accepts_args(stream_fn, 'worker_index', 'num_workers')
+    if shard_aware:
+        kwargs.update(shard_index=shard_index, num_shards=num_shards)
+    if worker_aware:
+        kwargs.update(worker_index=worker_index, num_workers=num_workers)
+    raw_stream = stream_fn(**kwargs)
+    stream = iterate_stream(raw_stream, async_in_flight)
+    if not shard_aware and num_shards > 1:
+        stream = itertools.islice(stream, shard_index, None, num_shards)
+    if worker_index is not None and not worker_aware:
+        stream = itertools.islice(stream, worker_index, None, num_workers)
+    return raw_stream, stream
+
+
+def _accepts_args(stream_fn: Callable[[], Stream], *names: str) -> bool:
+    """Return whether the given stream function accepts all the arguments of the given names."""
+    try:
+        parameters = inspect.signature(stream_fn).parameters
+    except (TypeError, ValueError):  # builtins such as `list` may have no signature
+        return False
+    return all(name in parameters for name in names)
+
+
+def _produce_batches(stream_fn: Callable[[], Stream], worker_index: int, num_workers: int,
+                     queue: multiprocessing.Queue, ring: Optional[_SharedMemoryRing]=None,
+                     budget: Optional[_SharedByteBudget]=None, async_in_flight: int=1,
+                     shard_index: int=0, num_shards: int=1) -> None:
+    """
+    Producer process main function. Enqueue the stream batches forever.
+
+    .. note::
+        Signal the end of each pass through the stream with ``None``.
+
+    :param stream_fn: callable which returns raw dataset stream
+    :param worker_index: index of this producer process
+    :param num_workers: total number of the producer processes
+    :param queue: queue to put the batches to
+    :param ring: if specified, the shared memory to write the batch numpy sources to
+    :param budget: if specified, the limit of the total size of the queued batches
+    :param async_in_flight: maximum number of the concurrently awaited items of an asynchronous stream
+    :param shard_index: index of the stream shard
+    :param num_shards: total number of the stream shards
+    """
+    # a forked process inherits the handlers of :py:class:`emloop.utils.CaughtInterrupts`; the interrupts are
+    # handled by the main process which terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        while True:
+            for batch in _create_stream(stream_fn, shard_index, num_shards, worker_index, num_workers,
+                                        async_in_flight):
+                if budget is not None:
+                    budget.acquire(_batch_nbytes(batch))
+                queue.put(batch if ring is None else ring.write(batch))
+            queue.put(None)
+    except Exception:  # pylint: disable=broad-except
+        queue.put(_WorkerFailure(traceback.format_exc()))
+
+
 class StreamWrapper:
     """
     Dataset stream wrapper which manages buffering, epoch cutting etc.
@@ -17,6 +273,7 @@ class StreamWrapper:
     The main features are:
         - resets underlying dataset stream after the iteration reaches its end
         - if specified, uses consumer-producer buffer for batches allowing simultaneous batch producing and training
+        - if specified, produces the batches in multiple worker processes
         - if specified, produces epochs of fixed size
         - logs the timings to the given profile
 
@@ -41,6 +298,55 @@ class StreamWrapper:
         with stream:  # we would get error without with-resource directive
             for batch in stream:  # 1st batch
                 # do stuff
+
+    .. code-block:: python
+        :caption: StreamWrapper with batches produced by 4 worker processes
+
+        stream = StreamWrapper(dataset.train_stream, 'train', buffer=16, workers=4)
+        with stream:
+            for batch in stream:
+                # do stuff
+        stream.close()  # terminate the worker processes
+
+    With ``workers`` > 0, the dataset stream is iterated in separate processes so that the pure-Python
+    preprocessing does not compete with the model for the GIL. The processes are started with the given
+    ``start_method`` (see :py:mod:`multiprocessing`), the platform default by default. Except for ``fork``, the
+    stream function (usually a bound method of the dataset) must be picklable. On the other hand, ``fork`` is not
+    available on Windows and forking a process which already runs other threads (e.g. those of the model backend)
+    may deadlock the workers. If the stream function accepts ``worker_index``
+    and ``num_workers`` arguments, each worker is expected to yield its own disjoint part of the stream. Otherwise,
+    every worker iterates the whole stream and keeps only every ``workers``-th batch, which preserves the order of
+    the batches but wastes the work spent on the skipped ones.
+
+    With ``num_shards`` > 1, only the ``shard_index``-th of the ``num_shards`` disjoint parts of the stream is
+    produced, e.g. by each of the processes of a multi-node training. If the stream function accepts ``shard_index``
+    and ``num_shards`` arguments, it is expected to yield its own shard. Otherwise, the whole stream is iterated and
+    only every ``num_shards``-th batch is kept. The shards are further split among the workers (if any).
+
+    The worker processes are long-lived; they keep producing (up to the buffer size) even between the epochs
+    and they are terminated only by :py:meth:`close`.
+
+    Similarly, the enqueueing thread of a ``persistent`` buffered stream is not stopped at the end of the
+    with-resource environment. Instead, it is allowed to buffer the first batches of the next epoch while the other
+    streams and the ``after_epoch`` hooks run (at the cost of competing with them for the GIL). The epochs are
+    separated with an end-of-epoch mark in the buffer. The thread is stopped only by :py:meth:`close`.
+
+    The stream function may also return an asynchronous iterable (e.g. an ``async`` generator). Such a stream is
+    driven by an event loop in a dedicated thread and the awaitables it yields are awaited concurrently,
+    up to ``async_in_flight`` at a time (see :py:class:`emloop.datasets.AsyncStream`).
+
+    With ``cache`` specified, the first epoch is recorded to the given :py:class:`emloop.datasets.StreamCache` and
+    the following epochs (or even runs, in case of :py:class:`emloop.datasets.DiskCache`) are replayed from it
+    without iterating the dataset stream at all. Hence, it is meant only for deterministic streams such as
+    the evaluation streams. The numbers of the replayed (``cache_hits_<name>``) and read
+    (``cache_misses_<name>``) batches and the size of the replayed numpy sources (``cache_bytes_saved_<name>``)
+    are recorded to the profile once per epoch.
+
+    With ``shared_memory`` > 0, the workers write the numpy sources of the batches directly to a ring of preallocated
+    shared memory slots (of the given size in bytes) instead of pickling them through the queues. The returned batch
+    sources are then numpy views of a slot which is reused once the batch is released, either by
+    :py:meth:`release_batch` or by requesting the next batch. Hence, whoever needs the data for longer must copy it.
+    The batches which do not fit in a single slot are transported through the queues as usual.
     """
 
     def __init__(self,
@@ -48,7 +354,17 @@ class StreamWrapper:
                  buffer_size: int=0,
                  epoch_size: int=-1,
                  name: Optional[str]=None,
-                 profile: Optional[TimeProfile]=None):
+                 profile: Optional[TimeProfile]=None,
+                 workers: int=0,
+                 shared_memory: int=0,
+                 buffer_sleep: float=EL_BUFFER_SLEEP,
+                 persistent: bool=False,
+                 buffer_bytes: int=0,
+                 start_method: Optional[str]=None,
+                 cache: Optional[StreamCache]=None,
+                 async_in_flight: int=1,
+                 shard_index: int=0,
+                 num_shards: int=1):
         """
         Create new StreamWrapper.
 
@@ -57,28 +373,213 @@ class StreamWrapper:
         :param epoch_size: if > 0, stop iteration after the specified number of batches
         :param name: optional stream name
         :param profile: profile to record times
+        :param workers: number of worker processes producing the batches, < 1 means no worker processes
+        :param shared_memory: size (in bytes) of a shared memory slot for the batches produced by the worker processes,
+                              < 1 means no shared memory
+        :param buffer_sleep: duration (in seconds) for which the enqueueing thread sleeps after it was allowed to
+                             buffer (see :py:attr:`allow_buffering`) so that the GIL may be released by the native call
+        :param persistent: if ``True``, keep the enqueueing thread alive across the epochs and let it buffer the
+                           next epoch outside of the with-resource environment
+        :param buffer_bytes: limit of the total size (in bytes) of the numpy sources of the buffered batches,
+                             < 1 means no limit; with ``buffer_size`` < 1, the buffer is limited by this size
+                             and by :py:data:`emloop.constants.EL_BUFFER_MAX_BATCHES` batches
+        :param start_method: start method of the worker processes (``fork``, ``spawn`` or ``forkserver``),
+                             ``None`` means the platform default
+        :param cache: if specified, record the first epoch to this cache and replay it in the following epochs
+        :param async_in_flight: maximum number of the concurrently awaited items of an asynchronous stream
+        :param shard_index: index of the shard of the stream to be produced
+        :param num_shards: total number of the stream shards, 1 means the whole stream is produced
+        :raise ValueError: if ``cache`` is specified together with ``epoch_size``
+        :raise ValueError: if ``shard_index`` is not in the range of ``num_shards``
         """
         self._get_stream_fn = stream_fn
         self._name = name
-        self._buffer_size = buffer_size
+        self._buffer_size = buffer_size if buffer_size > 0 or buffer_bytes <= 0 else EL_BUFFER_MAX_BATCHES
         self._epoch_size = epoch_size
         self._profile = profile
         self._batch_count = 0
         self._stream = None
-        self._queue = Queue(buffer_size) if buffer_size > 0 else None
-        self._stopping_event = None
+        self._buffer_sleep = buffer_sleep
+        self._buffer = deque()
+        self._buffer_bytes = buffer_bytes
+        self._buffered_bytes = 0
+        self._buffered_bytes_samples = []
+        self._epoch_buffered_bytes = []
+        self._budgets = []
+        self._condition = Condition()
+        self._stopping = False
+        self._producing = False
         self._enqueueing_thread = None
+        self._persistent = persistent
+        self._buffering_between_epochs = False
         self._semaphore = Semaphore(0)
+        self._workers = workers
+        self._start_method = start_method
+        self._worker_processes = []
+        self._worker_queues = []
+        self._next_worker = 0
+        self._finished_workers = set()
+        self._shared_memory = shared_memory
+        self._ring = None
+        self._held_slot = None
+        self._cache = cache
+        self._replay = None
+        self._replaying = False
+        self._cache_stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0}
+        self._async_in_flight = async_in_flight
+        self._shard_index = shard_index
+        self._num_shards = num_shards
+        self._cursor_stream = None
+        self._consumed = 0
+        self._seek_position = None
+        self._restore_state = None
+        self._skip = 0
+
+        if cache is not None and epoch_size > 0:
+            raise ValueError('Stream `{}` with fixed epoch size can not be cached.'.format(name))
+        if not 0 <= shard_index < num_shards:
+            raise ValueError('Shard index {} of stream `{}` is out of the range of {} shards.'
+                             .format(shard_index, name, num_shards))
+        if num_shards > 1 and not _accepts_args(stream_fn, 'shard_index', 'num_shards'):
+            logging.warning('Stream `%s` does not accept `shard_index` and `num_shards` arguments; the whole stream '
+                            'will be iterated and only every %s-th batch will be kept.', name, num_shards)
+        if shared_memory > 0 and workers <= 0:
+            logging.warning('Stream `%s` has no worker processes; the shared memory transport is not used.', name)
+        if shared_memory > 0 and workers > 0 and not hasattr(multiprocessing, 'shared_memory'):
+            raise ImportError('Shared memory transport of the stream batches requires Python 3.8 or newer.')
+        if workers > 1 and not _accepts_args(stream_fn, 'worker_index', 'num_workers'):
+            logging.warning('Stream `%s` does not accept `worker_index` and `num_workers` arguments; each of the %s '
+                            'workers will iterate the whole stream and keep only every %s-th batch.',
+                            name, workers, workers)
+
+    @property
+    def buffered_bytes(self) -> int:
+        """Total size (in bytes) of the numpy sources of the currently buffered batches."""
+        if self._budgets:
+            return sum(budget.queued for budget in self._budgets)
+        return self._buffered_bytes
+
+    @property
+    def epoch_buffered_bytes(self) -> List[int]:
+        """Sizes (in bytes) of the buffered batches sampled at each batch of the last finished epoch."""
+        return self._epoch_buffered_bytes
 
     @property
     def name(self) -> Optional[str]:
         """Stream name."""
         return self._name
 
+    @property
+    def buffer_size(self) -> int:
+        """Maximum number of the buffered batches, 0 means no buffer."""
+        return self._buffer_size
+
+    @property
+    def workers(self) -> int:
+        """Number of the producer processes, 0 means no producer processes."""
+        return self._workers
+
+    @property
+    def epoch_size(self) -> int:
+        """Fixed number of the batches in each epoch, non-positive values mean the whole stream."""
+        return self._epoch_size
+
+    @property
+    def position(self) -> dict:
+        """
+        Position of the stream within the current epoch to be stored and passed to :py:meth:`seek` later.
+
+        The position consists of the number of the ``batches`` consumed in the current epoch and, if the stream
+        provides it, of its ``state`` (see :py:meth:`seek`).
+        """
+        position = {'batches': self._consumed}
+        if self._cursor_stream is not None:
+            position['state'] = self._cursor_stream.state()
+        return position
+
+    def seek(self, position: dict) -> None:
+        """
+        Continue the next epoch from the given position returned from :py:attr:`position`.
+
+        If the position contains a ``state`` and the (unbuffered) stream function returns an object with
+        ``state()`` and ``restore(state)`` methods (e.g. :py:class:`emloop.datasets.ShuffleBuffer`), the stream
+        is restored directly (before its first batch is requested). Otherwise, the consumed batches are read
+        and skipped.
+
+        .. note::
+            With ``epoch_size`` specified, the position is relative to the beginning of the epoch rather than of
+            the underlying stream, so the skipped batches are read from the beginning of the underlying stream.
+
+        :param position: position of the stream
+        """
+        self._seek_position = position
+
+    def _apply_seek(self) -> None:
+        """Schedule the consumed batches to be skipped or, if possible, the stream state to be restored."""
+        position, self._seek_position = self._seek_position, None
+        self._skip = position.get('batches', 0)
+        if 'state' in position and self._workers <= 0 and self._buffer_size <= 0:
+            # the unbuffered stream is iterated and hence restored by the consumer (see _next_batch)
+            self._restore_state = position['state']
+        else:
+            logging.info('Skipping %d batches of stream `%s` in order to resume its position', self._skip, self._name)
+
+    def _restore_stream(self) -> None:
+        """Restore the stream state scheduled by :py:meth:`seek` or skip the consumed batches if not restorable."""
+        state, self._restore_state = self._restore_state, None
+        self._get_stream()
+        if self._cursor_stream is None:
+            logging.info('Skipping %d batches of stream `%s` in order to resume its position', self._skip, self._name)
+            return
+        logging.info('Restoring stream `%s` at batch %d', self._name, self._skip)
+        self._cursor_stream.restore(state)
+        self._batch_count = self._consumed = self._skip
+        self._skip = 0
+
+    def resize_restarts(self, buffer_size: Optional[int]=None, workers: Optional[int]=None) -> bool:
+        """
+        Return whether :py:meth:`resize` to the given buffer size and number of the producer processes would restart
+        the stream from its beginning.
+
+        :param buffer_size: new buffer size, ``None`` means no change
+        :param workers: new number of the producer processes, ``None`` means no change
+        """
+        buffer_size = self._buffer_size if buffer_size is None else buffer_size
+        workers = self._workers if workers is None else workers
+        if (buffer_size, workers) == (self._buffer_size, self._workers):
+            return False
+        return bool(self._worker_processes) or workers != self._workers or (buffer_size <= 0 and self._producing)
+
+    def resize(self, buffer_size: Optional[int]=None, workers: Optional[int]=None) -> None:
+        """
+        Change the buffer size and/or the number of the producer processes between the epochs.
+
+        If the producer processes are running or the buffer is to be disabled while buffering between the epochs,
+        the stream is closed (see :py:meth:`close`) and it restarts from its beginning.
+
+        :param buffer_size: new buffer size, ``None`` means no change
+        :param workers: new number of the producer processes, ``None`` means no change
+        """
+        buffer_size = self._buffer_size if buffer_size is None else buffer_size
+        workers = self._workers if workers is None else workers
+        if (buffer_size, workers) == (self._buffer_size, self._workers):
+            return
+        if self.resize_restarts(buffer_size, workers):
+            self.close()
+        with self._condition:
+            self._buffer_size = buffer_size
+            self._workers = workers
+            self._condition.notify_all()
+
     def _get_stream(self) -> Iterator:
         """Possibly create and return raw dataset stream iterator."""
         if self._stream is None:
-            self._stream = iter(self._get_stream_fn())
+            raw_stream, self._stream = _open_stream(self._get_stream_fn, self._shard_index, self._num_shards,
+                                                    async_in_flight=self._async_in_flight)
+            # the raw stream state corresponds to the consumed batches only if it is iterated directly
+            if hasattr(raw_stream, 'state') and hasattr(raw_stream, 'restore') and self._workers <= 0 \
+                    and self._buffer_size <= 0 and not isinstance(self._stream, (AsyncStream, itertools.islice)):
+                self._cursor_stream = raw_stream
         return self._stream
 
     def _epoch_limit_reached(self) -> bool:
@@ -89,81 +590,85 @@ class StreamWrapper:
         """
         return 0 < self._epoch_size <= self._batch_count
 
-    def _enqueue_batches(self, stop_event: Event) -> None:
+    def _enqueue_batches(self) -> None:
         """
-        Enqueue all the stream batches. If specified, stop after ``epoch_size`` batches.
+        Enqueue the stream batches until the epoch ends (unless persistent), the stream fails or the thread is asked
+        to stop.
 
         .. note::
-            Signal the epoch end with ``None``.
-
-        Stop when:
-        - ``stop_event`` is risen
-        - stream ends and epoch size is not set
-        - specified number of batches is enqueued
+            Signal the epoch end with ``None`` and the stream failure with :py:class:`_WorkerFailure`.
 
         .. note::
             This is used only with ``buffer`` > 0.
-
-        :param stop_event: event signaling stop instruction
         """
-        while True:
-            self._stream = self._get_stream()
+        try:
             while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._stopping or not self._buffer_full())
+                    if self._stopping:
+                        return
                 # Acquire the semaphore before processing the next batch
                 # but immediately release it so that other threads
                 # are not blocked when they decide to acquire it again.
-                with self._semaphore:
-                    pass
+                waited = not self._semaphore.acquire(blocking=False)
+                if waited:
+                    self._semaphore.acquire()
+                self._semaphore.release()
+                if self._stopping:
+                    return
                 # It always takes a short moment before the native call actually
                 # releases the GIL and we are free to compute. The following sleep
-                # is here to compensate for this short moment - we don't want to 
+                # is here to compensate for this short moment - we don't want to
                 # slow down the native call before the GIL is released.
-                time.sleep(EL_BUFFER_SLEEP)
-                try:
-                    batch = next(self._stream)
-                except StopIteration:
-                    break
-                self._queue.put(batch)
-                self._batch_count += 1
-                if stop_event.is_set():
-                    return
-                if self._epoch_limit_reached():
-                    self._queue.put(None)
-                    self._batch_count = 0
-                    return
-            self._stream = None  # yield a new iterator next time
-            if self._epoch_size <= 0:  # for non-fixed size epochs
-                self._queue.put(None)
-                self._batch_count = 0
-                return
+                # There is nothing to compensate when the consumer waits for us.
+                if waited and self._buffer and self._buffer_sleep > 0:
+                    time.sleep(self._buffer_sleep)
+                batch = self._next_batch()
+                nbytes = _batch_nbytes(batch)
+                with self._condition:
+                    # the batch is kept even if we are asked to stop
+                    self._condition.wait_for(lambda: self._stopping or self._fits_budget(nbytes))
+                    self._buffer.append((batch, nbytes))
+                    self._buffered_bytes += nbytes
+                    self._condition.notify_all()
+                    if batch is None and not self._persistent:
+                        self._producing = False
+                        return
+        except BaseException:  # pylint: disable=broad-except
+            with self._condition:
+                self._buffer.append((_WorkerFailure(traceback.format_exc()), 0))
+                self._producing = False
+                self._condition.notify_all()
+
+    def _buffer_full(self) -> bool:
+        """Return whether the buffer reached its size or byte budget."""
+        return 0 < self._buffer_size <= len(self._buffer) or 0 < self._buffer_bytes <= self._buffered_bytes
+
+    def _fits_budget(self, nbytes: int) -> bool:
+        """Return whether the given number of bytes fits in the byte budget. A single batch always fits."""
+        return self._buffer_bytes <= 0 or self._buffered_bytes == 0 or \
+            self._buffered_bytes + nbytes <= self._buffer_bytes
 
     def _dequeue_batch(self) -> Optional[Batch]:
         """
-        Return a single batch from queue or ``None`` signaling epoch end.
+        Return a single batch from the buffer or ``None`` signaling epoch end.
 
-        :raise ChildProcessError: if the enqueueing thread ended unexpectedly
+        Start a new enqueueing thread if the buffer is empty and the previous thread has finished its epoch.
+
+        :raise ChildProcessError: if the enqueueing thread failed
         """
         if self._enqueueing_thread is None:
-            raise ValueError('StreamWrapper `{}` with buffer of size `{}` was used outside with-resource environment.'
-                             .format(self._name, self._buffer_size))
-        if not self._enqueueing_thread.is_alive() and self._queue.empty():
-            self._start_thread()
-        while True:
-            try:
-                batch = self._queue.get(timeout=2)
-                self._queue.task_done()
-                break
-            except Empty:
-                if not self._enqueueing_thread.is_alive():
-                    try:
-                        # the enqueueing thread may just finished properly so lets check the queue eagerly
-                        batch = self._queue.get_nowait()
-                        self._queue.task_done()
-                        break
-                    except Empty:
-                        # so we failed to retrieve a batch and the enqueueing thread is dead
-                        # there is no hope, something must went wrong
-                        raise ChildProcessError('Enqueueing thread ended unexpectedly.')
+            raise ValueError('Buffered StreamWrapper `{}` was used outside with-resource environment.'
+                             .format(self._name))
+        with self._condition:
+            if not self._buffer and not self._producing:
+                self._start_thread()
+            self._condition.wait_for(lambda: self._buffer)
+            batch, nbytes = self._buffer.popleft()
+            self._buffered_bytes -= nbytes
+            self._condition.notify_all()
+        if isinstance(batch, _WorkerFailure):
+            raise ChildProcessError('Enqueueing thread of stream `{}` failed:\n{}'.format(self._name, batch.traceback))
         return batch
 
     def _next_batch(self) -> Optional[Batch]:
@@ -179,6 +684,8 @@ class StreamWrapper:
 
         :return: a single batch or ``None`` signaling epoch end
         """
+        if self._restore_state is not None:
+            self._restore_stream()
         if self._epoch_limit_reached():
             self._batch_count = 0
             return None
@@ -188,6 +695,7 @@ class StreamWrapper:
             return batch
         except StopIteration:
             self._stream = None  # yield a new iterator next time
+            self._cursor_stream = None
             if self._epoch_size > 0:  # underlying stream ended but our fixed size epoch did not
                 batch = next(self._get_stream())  # get another stream and return its 1st batch
                 self._batch_count += 1
@@ -196,41 +704,209 @@ class StreamWrapper:
                 self._batch_count = 0
                 return None
 
-    def _start_thread(self):
+    def _start_thread(self) -> None:
         """Start an enqueueing thread."""
-        self._stopping_event = Event()
-        self._enqueueing_thread = Thread(target=self._enqueue_batches, args=(self._stopping_event,))
+        if self._enqueueing_thread is not None:
+            self._enqueueing_thread.join()  # the previous thread has already finished or is about to
+        self._stopping = False
+        self._producing = True
+        self._enqueueing_thread = Thread(target=self._enqueue_batches, daemon=True)
         self._enqueueing_thread.start()
 
-    def _stop_thread(self):
-        """Stop the enqueueing thread. Keep the queue content and stream state."""
-        self._stopping_event.set()
-        queue_content = []
-        try:  # give the enqueueing thread chance to put a batch to the queue and check the stopping event
-            while True:
-                queue_content.append(self._queue.get_nowait())
-        except Empty:
-            pass
+    def _stop_thread(self) -> None:
+        """Stop the enqueueing thread. Keep the buffer content and stream state."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
         self._enqueueing_thread.join()
-        try:
-            queue_content.append(self._queue.get_nowait())  # collect the very last item
-        except Empty:
-            pass
-        self._queue = Queue(max(len(queue_content), self._buffer_size))  # queue content may be bigger than queue size
-        for batch in queue_content:
-            self._queue.put(batch)
+        self._producing = False
+
+    def _start_workers(self) -> None:
+        """Start the producer processes unless they are already running."""
+        if self._worker_processes:
+            return
+        context = multiprocessing.get_context(self._start_method)
+        queue_size = max(1, -(-self._buffer_size // self._workers))  # ceil division
+        if self._shared_memory > 0:
+            # each worker may fill its queue and write one more batch while the consumer holds another one
+            self._ring = _SharedMemoryRing(context, self._workers * (queue_size + 1) + 1, self._shared_memory)
+        for worker_index in range(self._workers):
+            queue = context.Queue(queue_size)
+            # the budget is split among the workers; a shared one could be exhausted by a worker the consumer
+            # does not read from at the moment
+            budget = None
+            if self._buffer_bytes > 0:
+                budget = _SharedByteBudget(context, max(1, self._buffer_bytes // self._workers))
+                self._budgets.append(budget)
+            process = context.Process(target=_produce_batches, daemon=True,
+                                      args=(self._get_stream_fn, worker_index, self._workers, queue, self._ring,
+                                            budget, self._async_in_flight, self._shard_index, self._num_shards),
+                                      name='{}_worker_{}'.format(self._name, worker_index))
+            process.start()
+            self._worker_queues.append(queue)
+            self._worker_processes.append(process)
+        self._next_worker = 0
+        self._finished_workers = set()
+
+    def _dequeue_worker_batch(self, worker_index: int) -> Optional[Batch]:
+        """
+        Return a single batch from the queue of the given producer process or ``None`` signaling its epoch end.
+
+        :param worker_index: index of the producer process
+        :raise ChildProcessError: if the producer process failed or ended unexpectedly
+        """
+        queue, process = self._worker_queues[worker_index], self._worker_processes[worker_index]
+        while True:
+            try:
+                batch = queue.get(timeout=EL_WORKER_POLL_TIMEOUT)
+                break
+            except Empty:
+                if not process.is_alive():
+                    raise ChildProcessError('Worker `{}` of stream `{}` ended unexpectedly with exit code {}.'
+                                            .format(worker_index, self._name, process.exitcode))
+        if isinstance(batch, _WorkerFailure):
+            raise ChildProcessError('Worker `{}` of stream `{}` failed:\n{}'
+                                    .format(worker_index, self._name, batch.traceback))
+        if isinstance(batch, _SharedBatch):
+            self._held_slot = batch.slot
+            batch = self._ring.read(batch)
+        if self._budgets:
+            self._budgets[worker_index].release(_batch_nbytes(batch))
+        return batch
+
+    def _next_worker_batch(self) -> Optional[Batch]:
+        """
+        Return a single batch produced by the worker processes or ``None`` signaling epoch end.
+
+        The workers are visited in a round-robin manner; the pass through the stream ends when all of them signal
+        its end. The epoch ends with the pass unless ``epoch_size`` is set; in that case, it ends after ``epoch_size``
+        batches.
+        """
+        if self._epoch_limit_reached():
+            self._batch_count = 0
+            return None
+        while True:
+            while len(self._finished_workers) < self._workers:
+                worker_index = self._next_worker
+                self._next_worker = (self._next_worker + 1) % self._workers
+                if worker_index in self._finished_workers:
+                    continue
+                batch = self._dequeue_worker_batch(worker_index)
+                if batch is None:
+                    self._finished_workers.add(worker_index)
+                    continue
+                self._batch_count += 1
+                return batch
+            self._next_worker = 0
+            self._finished_workers = set()
+            if self._epoch_size <= 0:
+                self._batch_count = 0
+                return None
+
+    def _flush_cache_stats(self) -> None:
+        """Record the epoch cache hits, misses and bytes saved to the profile (if any) and reset them."""
+        if self._profile is not None:
+            for stat, value in self._cache_stats.items():
+                self._profile.setdefault('cache_{}_{}'.format(stat, self._name), []).append(value)
+        self._cache_stats = dict.fromkeys(self._cache_stats, 0)
+
+    def _flush_buffered_bytes(self) -> None:
+        """Log the sizes of the buffered batches sampled in the finished epoch (if any) and reset them."""
+        if self._buffered_bytes_samples:
+            samples = self._buffered_bytes_samples
+            logging.debug('Stream `%s` buffered %.0f bytes on average and %d bytes at most (limit %d bytes)',
+                          self._name, sum(samples) / len(samples), max(samples), self._buffer_bytes)
+            self._epoch_buffered_bytes, self._buffered_bytes_samples = samples, []
+
+    def release_batch(self) -> None:
+        """
+        Release the shared memory slot of the last returned batch (if any) so that the workers may reuse it.
+
+        .. warning::
+            The sources of the released batch must not be used anymore.
+        """
+        if self._held_slot is not None:
+            self._ring.release(self._held_slot)
+            self._held_slot = None
+
+    def close(self) -> None:
+        """
+        Terminate the producer processes and the persistent enqueueing thread (if any).
+
+        The stream restarts from its beginning once used again.
+        """
+        if self._producing:
+            if self._buffering_between_epochs:
+                self._stop_thread()
+                self._semaphore.acquire()
+                self._buffering_between_epochs = False
+            else:
+                with self.allow_buffering:
+                    self._stop_thread()
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._buffered_bytes_samples = []
+        if isinstance(self._stream, AsyncStream):
+            self._stream.close()
+        self._stream = None
+        self._cursor_stream = None
+        self._consumed = 0
+        self._skip = 0
+        self._restore_state = None
+        self._replay = None
+        if self._cache is not None:
+            self._cache.abort()
+        self._held_slot = None
+        for process in self._worker_processes:
+            process.terminate()
+        for process, queue in zip(self._worker_processes, self._worker_queues):
+            process.join()
+            queue.cancel_join_thread()
+            queue.close()
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        self._budgets = []
+        self._worker_processes = []
+        self._worker_queues = []
+        self._batch_count = 0
 
     def __enter__(self) -> Iterator[Batch]:
-        """If buffered, start the enqueueing thread."""
-        if self._buffer_size > 0:
-            self._start_thread()
+        """
+        If buffered, start the enqueueing thread unless it persists from the previous epoch.
+        If required, start the producer processes.
+
+        Once the cache is complete, the epochs are replayed from it and the producers are stopped.
+        """
+        self._replaying = self._cache is not None and self._cache.complete
+        if self._replaying:
+            if self._producing or self._worker_processes:
+                self.close()
+        elif self._workers > 0:
+            self._start_workers()
+        elif self._buffer_size > 0:
+            if self._buffering_between_epochs:
+                self._semaphore.acquire()
+                self._buffering_between_epochs = False
+            if not self._producing:
+                self._start_thread()
         return self
 
     def __exit__(self, *args) -> None:
-        """If buffered, terminate the enqueueing thread."""
-        if self._buffer_size > 0:
-            with self.allow_buffering:
-                self._stop_thread()
+        """
+        If buffered, terminate the enqueueing thread or, if persistent, let it buffer freely until the next
+        ``__enter__``. The producer processes keep running.
+        """
+        if self._replaying:
+            self._replaying = False
+            return
+        if self._workers <= 0 and self._buffer_size > 0:
+            if self._persistent and self._producing:
+                self._semaphore.release()
+                self._buffering_between_epochs = True
+            else:
+                with self.allow_buffering:
+                    self._stop_thread()
 
     def __iter__(self) -> Iterator[Batch]:
         """Get stream iterator."""
@@ -238,7 +914,9 @@ class StreamWrapper:
 
     def empty(self) -> bool:
         """Return whether the buffer is empty."""
-        return self._queue is None or self._queue.empty()
+        if self._worker_queues:
+            return all(queue.empty() for queue in self._worker_queues)
+        return not self._buffer
 
     def __next__(self) -> Batch:
         """
@@ -247,8 +925,18 @@ class StreamWrapper:
         :return: next batch
         :raises StopIteration: at the end of the epoch
         """
+        self.release_batch()
+        if self._seek_position is not None:
+            self._apply_seek()
+
         # get the next batch and if the buffer is empty, allow buffering
         def get_batch_maybe_buffer():
+            # batches are produced by the worker processes; there is no GIL to share
+            if self._workers > 0:
+                if not self._worker_processes:
+                    raise ValueError('StreamWrapper `{}` with {} workers was used outside with-resource environment.'
+                                     .format(self._name, self._workers))
+                return self._next_worker_batch()
             # buffering is fully disabled; just compute the next batch
             if self._buffer_size <= 0:
                 return self._next_batch()
@@ -259,19 +947,54 @@ class StreamWrapper:
             with self.allow_buffering:
                 return self._dequeue_batch()
 
+        # replay the batch from the complete cache or get the next batch and record it
+        def get_batch_maybe_cache():
+            if self._cache is None:
+                return get_batch_maybe_buffer()
+            if self._replay is not None or self._cache.complete:
+                if self._replay is None:
+                    self._replay = self._cache.replay()
+                batch = next(self._replay, None)
+                if batch is None:
+                    self._replay = None
+                else:
+                    self._cache_stats['hits'] += 1
+                    self._cache_stats['bytes_saved'] += _batch_nbytes(batch)
+                return batch
+            batch = get_batch_maybe_buffer()
+            if batch is None:
+                self._cache.finish()
+            else:
+                self._cache_stats['misses'] += 1
+                self._cache.record(batch)
+            return batch
+
         # get the next batch and measure the read time if requested
         def get_batch_maybe_profile(event_name):
             if self._profile is not None:
                 with Timer(event_name, self._profile):
-                    return get_batch_maybe_buffer()
-            return get_batch_maybe_buffer()
+                    return get_batch_maybe_cache()
+            return get_batch_maybe_cache()
 
         event_name = 'read_batch_{}'.format(self._name)
         batch = get_batch_maybe_profile(event_name)
+        while batch is not None and self._skip > 0:  # resuming the position by skipping the consumed batches
+            self._skip -= 1
+            self._consumed += 1
+            self.release_batch()
+            batch = get_batch_maybe_cache()
         if batch is None:
+            self._consumed = self._skip = 0
+            self._restore_state = None
             if self._profile:
                 self._profile[event_name].pop()
+            if self._cache is not None:
+                self._flush_cache_stats()
+            self._flush_buffered_bytes()
             raise StopIteration
+        if self._buffer_bytes > 0:
+            self._buffered_bytes_samples.append(self.buffered_bytes)
+        self._consumed += 1
         return batch
 
     @property
@@ -68,7 +68,8 @@ def entry_point() -> None:
 
     elif known_args.subcommand == 'dataset':
         invoke_dataset_method(config_path=known_args.config_file, method_name=known_args.method,
-                              cl_arguments=unknown_args, output_root=known_args.output_root)
+                              cl_arguments=unknown_args, output_root=known_args.output_root,
+                              method_args=known_args.method_args)
 
     elif known_args.subcommand == 'gridsearch':
         grid_search(script=known_args.script, params=known_args.params, dry_run=known_args.dry_run)
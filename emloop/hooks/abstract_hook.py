@@ -5,7 +5,7 @@ Furthermore, TrainingTerminated exception is defined.
 """
 import logging
 import inspect
-from typing import Iterable, List
+from typing import Iterable, List, Optional, Collection
 from ..types import EpochData, Batch, TimeProfile, TrainingTerminated
 
 
@@ -28,17 +28,43 @@ class AbstractHook:
 
         - hook names should describe hook actions with verb stems. E.g.: ``LogProfile`` or ``SaveBest``
         - hook names should not include ``Hook`` suffix
+
+    The hooks whose ``after_batch`` is not cheap (e.g. writing files or plotting) may opt in to running it in
+    the background with ``async_after_batch``, so that the model keeps training meanwhile. The events of each hook are
+    still processed in order and all of them are processed before the ``after_epoch`` event. The batch data must not
+    be modified by the other hooks, and the exceptions (including :py:class:`TrainingTerminated`) are re-raised
+    in the main loop a bit later.
+
+    The ``after_batch`` events are dispatched only to the hooks which override :py:meth:`after_batch` and only for
+    the streams listed in :py:attr:`batch_streams` (if any) whose batches contain some of the
+    :py:attr:`batch_variables` (if any). The hooks declaring their :py:attr:`batch_variables` receive only those
+    variables.
+
+    With ``main_loop.after_epoch_threads`` configured, the ``after_epoch`` events run concurrently unless they depend
+    on each other through the epoch data; the hooks declare their access to it with :py:attr:`epoch_data_access`.
+    The readers wait for the preceding writers and the writers wait for all the preceding hooks accessing the epoch
+    data. By default, the hooks are assumed to write it, hence they run in the configured order.
     """
 
     EL_HOOK_INIT_ARGS = {'model', 'dataset', 'output_dir'}
     """Arguments which **emloop** pass, in addition to the config args, to ``__init__``
     methods of every hook being created."""
 
-    def __init__(self, **kwargs):
+    EPOCH_DATA_ACCESSES = ['none', 'read', 'write']
+    """Possible accesses of the ``after_epoch`` events to the epoch data; ``write`` includes reading."""
+
+    async_after_batch = False
+    """Whether the ``after_batch`` events are run in the background."""
+
+    epoch_data_access = 'write'
+    """Access of :py:meth:`after_epoch` to the epoch data; one of :py:attr:`EPOCH_DATA_ACCESSES`."""
+
+    def __init__(self, async_after_batch: Optional[bool]=None, **kwargs):
         """
         Check and warn if there is any argument created by the user yet not recognized in the child hook ``__init__``
         method.
 
+        :param async_after_batch: if specified, overrides whether the ``after_batch`` events are run in the background
         :param kwargs: ``**kwargs`` not recognized in the child hook
         """
         for key in kwargs:
@@ -46,6 +72,8 @@ class AbstractHook:
                 logging.warning('Argument `%s` was not recognized by `%s`. Recognized arguments are `%s`.',
                                 key, type(self).__name__, list(inspect.signature(type(self)).parameters.keys()))
 
+        if async_after_batch is not None:
+            self.async_after_batch = async_after_batch
         self._main_loop = None
 
     def before_training(self) -> None:
@@ -59,15 +87,29 @@ class AbstractHook:
         """
         pass
 
+    @property
+    def batch_streams(self) -> Optional[Collection[str]]:
+        """Names of the streams whose batches are of interest to :py:meth:`after_batch`; ``None`` means all."""
+        return None
+
+    @property
+    def batch_variables(self) -> Optional[Collection[str]]:
+        """
+        Names of the batch variables of interest to :py:meth:`after_batch`; ``None`` means all.
+        Only these variables are passed to :py:meth:`after_batch`.
+        """
+        return None
+
     def after_batch(self, stream_name: str, batch_data: Batch) -> None:
         """
         After batch event.
 
-        This event is triggered after every processed batch regardless of stream type.
-        Batch results are available in results argument.
+        This event is triggered after every processed batch of the streams of interest (see :py:attr:`batch_streams`
+        and :py:attr:`batch_variables`). Batch results are available in results argument.
 
         :param stream_name: name of the stream (usually ``train``, ``valid`` or``test``)
-        :param batch_data: batch inputs and model outputs
+        :param batch_data: view of the batch inputs and model outputs; the variables assigned to it
+            (e.g. by :py:class:`emloop.hooks.Flatten`) are visible to the following hooks
         """
         pass
 
@@ -2,12 +2,208 @@
 Module with batch data accumulating hook.
 """
 import typing
+import warnings
+from threading import Lock
 from collections import defaultdict
 
+import numpy as np
+
 from . import AbstractHook
 from ..types import Batch
 
 
+class VariableBuffer:
+    """
+    Values of a single variable accumulated over the batches.
+
+    The values are kept in a typed numpy array whose capacity is doubled when full, so that extending it takes
+    amortized constant time per example. The dtype is chosen by the first non-empty batch and promoted when needed;
+    the values of mixed types which would be converted to strings are kept as objects instead. Once the batches can
+    not be stacked (e.g. their examples differ in shape), the values are kept as a list of per-batch chunks instead.
+
+    The buffer is array-like: it has a length, it may be indexed and iterated over and it may be passed to the numpy
+    functions. The ragged values are exposed as an object array of the examples.
+    """
+
+    def __init__(self):
+        """Create new empty VariableBuffer."""
+        self._data = None  # type: typing.Optional[np.ndarray]
+        self._size = 0
+        self._chunks = None  # type: typing.Optional[typing.List[list]]
+        self._ragged_values = None  # type: typing.Optional[np.ndarray]
+
+    @staticmethod
+    def _stackable(value: typing.Iterable) -> typing.Optional[np.ndarray]:
+        """Return the given batch value as a numpy array or ``None`` if it is ragged."""
+        if isinstance(value, np.ndarray):
+            return value if value.ndim > 0 else None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', np.VisibleDeprecationWarning)  # ragged sequences
+                array = np.asarray(value)
+                if array.dtype.kind in 'US':  # the non-string values would be converted to strings
+                    objects = np.asarray(value, dtype=object)
+                    if not all(isinstance(item, (str, bytes)) for item in objects.flat):
+                        array = objects
+        except (ValueError, np.VisibleDeprecationWarning):
+            return None
+        return array if array.ndim > 0 else None
+
+    @staticmethod
+    def _promote_types(dtype: np.dtype, other: np.dtype) -> np.dtype:
+        """Return the dtype of both the given dtypes; strings and non-strings are promoted to objects."""
+        if (dtype.kind in 'US') != (other.kind in 'US') and object not in (dtype, other):
+            return np.dtype(object)
+        return np.promote_types(dtype, other)
+
+    def _append(self, array: np.ndarray) -> None:
+        """Copy the given array to the end of the typed storage; grow it or promote its dtype when needed."""
+        if self._data is None:
+            self._data = np.empty_like(array)
+        else:
+            dtype = VariableBuffer._promote_types(self._data.dtype, array.dtype)
+            if self._size + len(array) > len(self._data) or dtype != self._data.dtype:
+                data = np.empty((max(2 * len(self._data), self._size + len(array)),) + self._data.shape[1:], dtype)
+                data[:self._size] = self._data[:self._size]
+                self._data = data
+        self._data[self._size:self._size + len(array)] = array
+        self._size += len(array)
+
+    def extend(self, value: typing.Iterable) -> None:
+        """
+        Extend the buffer with the examples of the given batch value.
+
+        :param value: value of the variable in a single batch
+        """
+        if self._chunks is None:
+            array = VariableBuffer._stackable(value)
+            if array is not None and len(array) == 0:
+                return  # the empty batches do not determine the dtype nor the shape of the examples
+            if array is not None and (self._data is None or array.shape[1:] == self._data.shape[1:]):
+                self._append(array)
+                return
+            self._chunks = [list(self._data[:self._size])] if self._data is not None else []
+            self._data = None
+        if isinstance(value, np.ndarray) and value.ndim > 1:
+            # the rows would be views of the batch buffer which may be reused (e.g. shared memory)
+            value = value.copy()
+        chunk = list(value)
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        self._ragged_values = None
+
+    @property
+    def values(self) -> np.ndarray:
+        """The accumulated values; a view of the typed storage or an object array of the ragged examples."""
+        if self._chunks is None:
+            return self._data[:self._size] if self._data is not None else np.empty(0)
+        if self._ragged_values is None:
+            self._ragged_values = np.empty(self._size, dtype=object)
+            for index, example in enumerate(self):
+                self._ragged_values[index] = example
+        return self._ragged_values
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> typing.Iterator:
+        if self._chunks is None:
+            return iter(self.values)
+        return (example for chunk in self._chunks for example in chunk)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __repr__(self) -> str:
+        return 'VariableBuffer({!r})'.format(self.values)
+
+
+def _accumulate(buffer: VariableBuffer, variable: str, batch_data: Batch) -> None:
+    """
+    Extend the given buffer with the given variable of the given batch.
+
+    :raise KeyError: if the variable is missing
+    :raise TypeError: if the variable value is not iterable (e.g. it is only a scalar)
+    """
+    if variable not in batch_data:
+        raise KeyError('Variable `{}` to be accumulated was not found in the batch data. '
+                       'Available variables are `{}`.'.format(variable, list(batch_data)))
+    value = batch_data[variable]
+    if not hasattr(value, '__iter__'):
+        raise TypeError('Variable `{}` to be accumulated is not iterable.'.format(variable))
+    buffer.extend(value)
+
+
+class AccumulatorRegistry:
+    """
+    Accumulator of the batch variables shared by the hooks, so that each variable is stored once per stream
+    no matter how many hooks consume it.
+
+    The main loop identifies every batch with :py:meth:`begin_batch` and the hooks subscribe to the variables and
+    pass the batches to :py:meth:`accumulate`; each variable of the batch is accumulated by the first of its
+    subscribers the batch is passed to. The accumulated variables are kept until :py:meth:`reset`.
+    """
+
+    def __init__(self):
+        """Create new empty AccumulatorRegistry."""
+        self._accumulator = defaultdict(lambda: defaultdict(VariableBuffer))
+        self._variables = {}  # type: typing.Dict[AbstractHook, typing.List[str]]
+        self._batch_key = None  # type: typing.Optional[typing.Hashable]
+        self._accumulated_batches = {}  # (stream, variable) -> key of the last accumulated batch
+        self._lock = Lock()
+
+    @property
+    def variables(self) -> typing.Set[str]:
+        """Names of the variables accumulated for the subscribed hooks."""
+        return {variable for variables in self._variables.values() for variable in variables}
+
+    def subscribe(self, hook: AbstractHook, variables: typing.Iterable[str]) -> typing.Mapping:
+        """
+        Subscribe the given hook to the given variables.
+
+        :param hook: subscribing hook
+        :param variables: names of the variables to be accumulated
+        :return: the shared accumulator, i.e., mapping ``stream_name`` -> ``variable_name`` ->
+            :py:class:`VariableBuffer`
+        """
+        self._variables[hook] = list(variables)
+        return self._accumulator
+
+    def begin_batch(self, batch_key: typing.Hashable) -> None:
+        """
+        Identify the batch passed to the hooks next.
+
+        :param batch_key: key unique for each batch, e.g. (epoch, stream name, batch index)
+        """
+        self._batch_key = batch_key
+
+    def accumulate(self, hook: AbstractHook, stream_name: str, batch_data: Batch) -> None:
+        """
+        Accumulate the variables of the given subscribed hook from the current batch (see :py:meth:`begin_batch`)
+        unless they were accumulated already.
+
+        :param hook: subscribed hook
+        :param stream_name: stream name
+        :param batch_data: batch data = stream sources + model outputs
+        :raise KeyError: if the variables to be aggregated are missing
+        :raise TypeError: if the variable value is not iterable (e.g. it is only a scalar)
+        """
+        with self._lock:
+            for variable in self._variables[hook]:
+                if self._accumulated_batches.get((stream_name, variable)) != self._batch_key:
+                    _accumulate(self._accumulator[stream_name][variable], variable, batch_data)
+                    self._accumulated_batches[stream_name, variable] = self._batch_key
+
+    def reset(self) -> None:
+        """Drop the accumulated variables (e.g. after each epoch)."""
+        with self._lock:
+            self._accumulator.clear()
+            self._accumulated_batches.clear()
+
+
 class AccumulateVariables(AbstractHook):
     """
     Accumulate the specified variables allowing their aggregation after each epoch.
@@ -16,26 +212,53 @@ class AccumulateVariables(AbstractHook):
     will have the accumulated variables available in ``self._accumulator`` after each epoch.
 
     The data are accumulated in a form of nested mapping
-    ``stream_name`` -> ``variable_name`` -> ``Iterable``[``values``].
+    ``stream_name`` -> ``variable_name`` -> :py:class:`VariableBuffer`, an array-like typed storage of the values.
+
+    Within :py:class:`emloop.MainLoop`, the variables are stored in the :py:class:`AccumulatorRegistry` of the main
+    loop shared with the other accumulating hooks, unless ``shared_accumulator`` is disabled or the hook runs
+    ``after_batch`` in the background. The shared accumulator may contain the variables of the other hooks too;
+    it is reset by the main loop after all the ``after_epoch`` events.
+
+    Only the accumulated variables are passed to :py:meth:`after_batch` (see :py:attr:`batch_variables`).
 
     .. warning::
         This hook should not be used directly as it does nothing on its own.
     """
 
-    def __init__(self, variables: typing.Iterable[str], **kwargs):
+    def __init__(self, variables: typing.Iterable[str], shared_accumulator: bool=True, **kwargs):
         """
         Create new AccumulateVariables hook.
 
         :param variables: collection of variable names to be logged
+        :param shared_accumulator: whether to use the accumulator shared by the hooks of the main loop
         """
         super().__init__(**kwargs)
         self._variables = variables
+        self._shared_accumulator = shared_accumulator
+        self._registry = None  # type: typing.Optional[AccumulatorRegistry]
         self._accumulator = None
         self._reset_accumulator()
 
+    def register_mainloop(self, main_loop: 'emloop.MainLoop') -> None:
+        """Subscribe to the accumulator registry of the main loop if it is shared."""
+        super().register_mainloop(main_loop)
+        registry = getattr(main_loop, 'accumulators', None)
+        if self._shared_accumulator and not self.async_after_batch and registry is not None:
+            self._registry = registry
+            self._accumulator = registry.subscribe(self, self._variables)
+
+    @property
+    def batch_variables(self) -> typing.Optional[typing.Collection[str]]:
+        """The accumulated variables."""
+        return self._variables
+
     def _reset_accumulator(self):
-        """Set the accumulator to an empty double-index :py:class:`collections.defaultdict`."""
-        self._accumulator = defaultdict(lambda: defaultdict(list))
+        """
+        Set the accumulator to an empty double-index :py:class:`collections.defaultdict`.
+        The shared accumulator is reset by the main loop instead.
+        """
+        if self._registry is None:
+            self._accumulator = defaultdict(lambda: defaultdict(VariableBuffer))
 
     def after_batch(self, stream_name: str, batch_data: Batch):
         """
@@ -46,15 +269,11 @@ class AccumulateVariables(AbstractHook):
         :raise KeyError: if the variables to be aggregated are missing
         :raise TypeError: if the variable value is not iterable (e.g. it is only a scalar)
         """
+        if self._registry is not None:
+            self._registry.accumulate(self, stream_name, batch_data)
+            return
         for variable in self._variables:
-            if variable in batch_data:
-                value = batch_data[variable]
-                if not hasattr(value, '__iter__'):
-                    raise TypeError('Variable `{}` to be accumulated is not iterable.'.format(variable))
-                self._accumulator[stream_name][variable] += list(value)
-            else:
-                raise KeyError('Variable `{}` to be accumulated was not found in the batch data. '
-                               'Available variables are `{}`.'.format(variable, batch_data.keys()))
+            _accumulate(self._accumulator[stream_name][variable], variable, batch_data)
 
     def after_epoch(self, **_):
         """Reset the accumulator after each epoch."""
@@ -24,6 +24,8 @@ class Check(AbstractHook):
 
     """
 
+    epoch_data_access = 'read'
+
     def __init__(self, variable: str, required_min_value: float, max_epoch: int, stream: str='valid', **kwargs):
         """
         Create new Check hook.
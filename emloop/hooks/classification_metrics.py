@@ -5,6 +5,8 @@ Hook computing epoch statistics for classification tasks.
 from typing import Mapping, List, Union, Optional
 import logging
 
+import numpy as np
+
 try:
     import sklearn.metrics as sk
 except ImportError:
@@ -50,7 +52,7 @@ class ClassificationMetrics(AccumulateVariables):
         self._f1_average = f1_average
         self._var_prefix = var_prefix
 
-    def _get_metrics(self, gt: List[float], predicted: List[float]) -> Mapping[str, Union[float, List[float]]]:
+    def _get_metrics(self, gt: np.ndarray, predicted: np.ndarray) -> Mapping[str, Union[float, List[float]]]:
         """Compute accuracy, precision, recall, f1 and sometimes specificity (if f1_average is set to 'binary')."""
         metrics = {}
         metrics[self._var_prefix+'precision'], metrics[self._var_prefix+'recall'], metrics[self._var_prefix+'f1'], _ = \
@@ -72,8 +74,8 @@ class ClassificationMetrics(AccumulateVariables):
         """
         for stream_name, stream_data in epoch_data.items():
             # variables are already checked in the AccumulatingHook; hence, we do not check them here
-            metrics = self._get_metrics(self._accumulator[stream_name][self._gt_variable],
-                                        self._accumulator[stream_name][self._predicted_variable])
+            metrics = self._get_metrics(np.asarray(self._accumulator[stream_name][self._gt_variable]),
+                                        np.asarray(self._accumulator[stream_name][self._predicted_variable]))
 
             for var_name, var_data in metrics.items():
                 if var_name in stream_data:
@@ -1,13 +1,15 @@
 """
 Module with a hook capable of computing accumulated variable statistics such as mean or median.
 """
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
+from functools import partial
 from typing import Iterable, Any
 
 import numpy as np
 
 from . import AccumulateVariables
 from ..types import EpochData
+from ..utils.running_stats import RunningStats, parse_percentile
 
 
 class ComputeStats(AccumulateVariables):
@@ -29,12 +31,31 @@ class ComputeStats(AccumulateVariables):
               variables:
                 - loss : [min, max]
 
+    In the ``streaming`` mode, the values are not kept; instead, the aggregations are computed on the fly in constant
+    memory per variable (see :py:class:`emloop.utils.running_stats.RunningStats`). The mean, standard deviation,
+    variance, minimum, maximum, sum and the NaN counts are exact while the median and the percentiles are estimated
+    within the given relative accuracy.
+
+    .. code-block:: yaml
+        :caption: compute loss mean and its approximate 95th percentile in constant memory
+
+        hooks:
+          - ComputeStats:
+              variables:
+                - loss : [mean, percentile_95]
+              mode: streaming
+              relative_accuracy: 0.005
+
     """
 
     EXTRA_AGGREGATIONS = {'nanfraction', 'nancount'}
-    """Extra aggregation methods extending the set of all NumPy functions."""
+    """Extra aggregation methods extending the set of all NumPy functions; additionally, the percentiles such as
+    ``percentile_95`` or ``nanpercentile_99.9`` are supported."""
 
-    def __init__(self, variables, **kwargs):
+    MODES = ['exact', 'streaming']
+    """Possible modes of computing the aggregations."""
+
+    def __init__(self, variables, mode: str='exact', relative_accuracy: float=0.01, **kwargs):
         """
         Create new stats hook.
 
@@ -42,9 +63,17 @@ class ComputeStats(AccumulateVariables):
             ``aggregations`` are the names of arbitrary NumPy functions returning a scalar (e.g., ``'mean'``,
             ``'nanmean'``, ``'max'``, etc.) or one of :py:attr:`EXTRA_AGGREGATIONS`. Passing just the
             ``variable name`` instead of a mapping is the same as passing {variable_name: ['mean']}.
+        :param mode: one of :py:attr:`MODES`; ``exact`` keeps all the values of the epoch while ``streaming`` computes
+            the aggregations supported by :py:class:`emloop.utils.running_stats.RunningStats` on the fly
+        :param relative_accuracy: relative accuracy of the median and percentiles estimated in the ``streaming`` mode
         :param kwargs: Ignored
-        :raise ValueError: if the specified aggregation function is not supported
+        :raise ValueError: if the specified mode or aggregation function is not supported
         """
+        if mode not in ComputeStats.MODES:
+            raise ValueError('Unrecognized mode `{}`. It must be one of `{}`'.format(mode, ComputeStats.MODES))
+        self._mode = mode
+        self._relative_accuracy = relative_accuracy
+
         # list of mappings variable -> [aggregations..]
         variable_aggregations = [{variable: ['mean']} if isinstance(variable, str) else variable for variable in
                                  variables]
@@ -57,7 +86,11 @@ class ComputeStats(AccumulateVariables):
         for variable, aggregations in self._variable_aggregations.items():
             for aggregation in aggregations:
                 ComputeStats._raise_check_aggregation(aggregation)
+                if mode == 'streaming' and not RunningStats.supports(aggregation):
+                    raise ValueError('Aggregation `{}` is not supported in the streaming mode.'.format(aggregation))
 
+        if mode == 'streaming':
+            kwargs['shared_accumulator'] = False  # the running statistics are kept by the hook
         super().__init__(variables=list(self._variable_aggregations.keys()), **kwargs)
 
     @staticmethod
@@ -68,7 +101,8 @@ class ComputeStats(AccumulateVariables):
         :param aggregation: the aggregation name
         :raise ValueError: if the specified aggregation is not supported or found in NumPy
         """
-        if aggregation not in ComputeStats.EXTRA_AGGREGATIONS and not hasattr(np, aggregation):
+        if aggregation not in ComputeStats.EXTRA_AGGREGATIONS and not hasattr(np, aggregation) \
+                and parse_percentile(aggregation) is None:
             raise ValueError('Aggregation `{}` is not a NumPy function or a member '
                              'of EXTRA_AGGREGATIONS.'.format(aggregation))
 
@@ -83,6 +117,10 @@ class ComputeStats(AccumulateVariables):
         :raise ValueError: if the specified aggregation is not supported or found in NumPy
         """
         ComputeStats._raise_check_aggregation(aggregation)
+        percentile = parse_percentile(aggregation)
+        if percentile is not None:
+            ignore_nans, q = percentile
+            return (np.nanpercentile if ignore_nans else np.percentile)(data, q)
         if aggregation == 'nanfraction':
             return np.sum(np.isnan(data)) / len(data)
         if aggregation == 'nancount':
@@ -99,9 +137,19 @@ class ComputeStats(AccumulateVariables):
         for stream_name in epoch_data.keys():
             for variable, aggregations in self._variable_aggregations.items():
                 # variables are already checked in the AccumulatingHook; hence, we do not check them here
-                epoch_data[stream_name][variable] = OrderedDict(
-                    {aggr: ComputeStats._compute_aggregation(aggr, self._accumulator[stream_name][variable])
-                     for aggr in aggregations})
+                accumulated = self._accumulator[stream_name][variable]
+                if self._mode == 'streaming':
+                    aggregate = accumulated.aggregate
+                else:
+                    aggregate = partial(ComputeStats._compute_aggregation, data=np.asarray(accumulated))
+                epoch_data[stream_name][variable] = OrderedDict({aggr: aggregate(aggr) for aggr in aggregations})
+
+    def _reset_accumulator(self):
+        """In the ``streaming`` mode, set the accumulator to an empty mapping of the running statistics."""
+        if self._mode == 'streaming':
+            self._accumulator = defaultdict(lambda: defaultdict(partial(RunningStats, self._relative_accuracy)))
+        else:
+            super()._reset_accumulator()
 
     def after_epoch(self, epoch_data: EpochData, **kwargs) -> None:
         """
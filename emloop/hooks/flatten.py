@@ -40,6 +40,11 @@ class Flatten(AbstractHook):
         self._variables = variables
         self._streams = streams
 
+    @property
+    def batch_streams(self) -> Optional[Iterable[str]]:
+        """Names of the streams to be processed; all the streams if not specified."""
+        return self._streams
+
     def after_batch(self, stream_name: str, batch_data: Batch) -> None:
         """Flatten given variables."""
         if self._streams is not None and stream_name not in self._streams:
@@ -48,5 +53,5 @@ class Flatten(AbstractHook):
         for variable in self._variables:
             if variable not in batch_data:
                 raise KeyError('Variable `{}` to be flattened was not found in the batch data for stream `{}`. '
-                               'Available variables are `{}`.'.format(variable, stream_name, batch_data.keys()))
+                               'Available variables are `{}`.'.format(variable, stream_name, list(batch_data)))
             batch_data[self._variables[variable]] = list(more_itertools.collapse(batch_data[variable]))
@@ -0,0 +1,210 @@
+"""
+Module with the background and concurrent execution of the hook events.
+"""
+from queue import Queue
+from threading import Thread, Lock
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Iterable, Dict, Optional, Tuple, List, Mapping, Set
+
+from .abstract_hook import AbstractHook, TrainingTerminated
+from ..types import Batch, EpochData, TimeProfile
+from ..utils import Timer
+
+
+class AsyncHookRunner:
+    """
+    Run the ``after_batch`` events of the given hooks in the background.
+
+    Each hook has its own thread and a bounded queue of the pending events, hence the events of a single hook are
+    processed in order while the hooks run alongside each other and the main loop. When the queue of a hook is full,
+    the main loop waits.
+
+    The first exception (including :py:class:`emloop.TrainingTerminated`) raised by a hook is re-raised at the next
+    safe point, i.e., when the next event is submitted or when the main loop waits for all the events to be
+    processed (:py:meth:`wait`). The following events of the failed hook are discarded.
+    """
+
+    def __init__(self, hooks: Iterable[AbstractHook], queue_size: int=16, profile: Optional[TimeProfile]=None):
+        """
+        Create new AsyncHookRunner.
+
+        :param hooks: hooks whose ``after_batch`` events are run in the background
+        :param queue_size: maximum number of the pending events of each hook
+        :param profile: profile to record the timings of the events to
+        """
+        self._hooks = list(hooks)
+        self._queue_size = queue_size
+        self._profile = profile
+        self._queues = {}  # type: Dict[AbstractHook, Queue]
+        self._threads = []
+        self._lock = Lock()
+        self._failure = None  # type: Optional[Tuple[AbstractHook, BaseException]]
+
+    def _process_events(self, hook: AbstractHook, queue: Queue) -> None:
+        """Process the events of the given hook from the given queue until ``None`` is received."""
+        failed = False
+        while True:
+            event = queue.get()
+            try:
+                if event is None:
+                    return
+                if not failed:
+                    stream_name, batch_data, profile_key = event
+                    if profile_key is not None and self._profile is not None:
+                        with Timer(profile_key, self._profile):
+                            hook.after_batch(stream_name, batch_data)
+                    else:
+                        hook.after_batch(stream_name, batch_data)
+            except BaseException as ex:  # pylint: disable=broad-except
+                failed = True
+                with self._lock:
+                    if self._failure is None:
+                        self._failure = (hook, ex)
+            finally:
+                queue.task_done()
+
+    def _start(self) -> None:
+        """Start the threads of the hooks."""
+        for hook in self._hooks:
+            queue = self._queues[hook] = Queue(maxsize=self._queue_size)
+            thread = Thread(target=self._process_events, args=(hook, queue), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def check(self) -> None:
+        """Re-raise the first exception raised by a hook (if any)."""
+        with self._lock:
+            failure, self._failure = self._failure, None
+        if failure is not None:
+            raise failure[1]
+
+    def after_batch(self, hook: AbstractHook, stream_name: str, batch_data: Batch,
+                    profile_key: Optional[str]=None) -> None:
+        """
+        Submit the ``after_batch`` event of the given hook.
+
+        :param hook: hook whose event is submitted
+        :param stream_name: name of the stream
+        :param batch_data: batch inputs and model outputs
+        :param profile_key: if specified, the profile entry to record the processing time of the event to
+        """
+        self.check()
+        if not self._threads:
+            self._start()
+        self._queues[hook].put((stream_name, batch_data, profile_key))
+
+    def wait(self) -> None:
+        """Wait until all the submitted events are processed and re-raise the first exception raised (if any)."""
+        for queue in self._queues.values():
+            queue.join()
+        self.check()
+
+    def close(self) -> None:
+        """Process the submitted events and stop the threads."""
+        for queue in self._queues.values():
+            queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._queues.clear()
+        self._threads.clear()
+
+
+class EpochHookRunner:
+    """
+    Run the ``after_epoch`` events of the given hooks concurrently with respect to their
+    :py:attr:`emloop.hooks.AbstractHook.epoch_data_access`.
+
+    The hooks are ordered as configured; a hook waits for the preceding hooks which write the epoch data if it
+    reads it and for all the preceding hooks accessing the epoch data if it writes it. The hooks which do not access
+    the epoch data (and the hooks whose dependencies are done) run alongside each other on a pool of threads.
+    With no threads, the events are run one by one in the calling thread.
+
+    As in the sequential case, all the hooks are run even if some of them raise
+    :py:class:`emloop.TrainingTerminated`, which is re-raised afterwards. Once a hook raises another exception,
+    no more hooks are started and the exception is re-raised as soon as the running hooks finish.
+    """
+
+    def __init__(self, hooks: Iterable[AbstractHook], threads: int=0, names: Optional[Mapping[AbstractHook, str]]=None,
+                 profile: Optional[TimeProfile]=None):
+        """
+        Create new EpochHookRunner.
+
+        :param hooks: hooks whose ``after_epoch`` events are run
+        :param threads: number of the threads running the events, 0 means the events are run sequentially
+        :param names: names of the hooks in the profile entries ``after_epoch_hook_<name>``
+        :param profile: profile to record the timings of the events to
+        """
+        self._hooks = list(hooks)
+        self._threads = threads
+        self._names = names
+        self._profile = profile
+        self._dependencies = EpochHookRunner.dependencies(self._hooks)
+
+    @staticmethod
+    def dependencies(hooks: List[AbstractHook]) -> Dict[AbstractHook, Set[AbstractHook]]:
+        """
+        Compute the hooks each of the given hooks has to wait for in the ``after_epoch`` event.
+
+        :param hooks: hooks in the order of their configuration
+        :return: the preceding hooks each of the hooks depends on
+        :raise AssertionError: if a hook declares an unsupported ``epoch_data_access``
+        """
+        accesses = {}
+        for hook in hooks:
+            if getattr(hook.after_epoch, '__func__', None) is AbstractHook.after_epoch:
+                accesses[hook] = 'none'
+            else:
+                accesses[hook] = hook.epoch_data_access
+                assert accesses[hook] in AbstractHook.EPOCH_DATA_ACCESSES
+        dependencies = {}
+        for i, hook in enumerate(hooks):
+            conflicts = {'none': (), 'read': ('write',), 'write': ('read', 'write')}[accesses[hook]]
+            dependencies[hook] = {preceding for preceding in hooks[:i] if accesses[preceding] in conflicts}
+        return dependencies
+
+    def _after_epoch(self, hook: AbstractHook, epoch_id: int, epoch_data: EpochData) -> None:
+        """Run and time the ``after_epoch`` event of the given hook."""
+        if self._names is not None and self._profile is not None:
+            with Timer('after_epoch_hook_{}'.format(self._names[hook]), self._profile):
+                hook.after_epoch(epoch_id=epoch_id, epoch_data=epoch_data)
+        else:
+            hook.after_epoch(epoch_id=epoch_id, epoch_data=epoch_data)
+
+    def after_epoch(self, epoch_id: int, epoch_data: EpochData) -> None:
+        """
+        Run the ``after_epoch`` events of all the hooks.
+
+        :param epoch_id: finished epoch id
+        :param epoch_data: epoch data shared among the hooks
+        :raise TrainingTerminated: if any of the hooks raised it
+        """
+        end_training_exception = None
+        if self._threads == 0:
+            for hook in self._hooks:
+                try:
+                    self._after_epoch(hook, epoch_id, epoch_data)
+                except TrainingTerminated as ex:
+                    end_training_exception = ex
+        else:
+            pending = list(self._hooks)
+            running = {}  # type: Dict[Future, AbstractHook]
+            done = set()
+            failure = None
+            with ThreadPoolExecutor(self._threads) as executor:
+                while running or (pending and failure is None):
+                    if failure is None:
+                        for hook in [hook for hook in pending if self._dependencies[hook] <= done]:
+                            pending.remove(hook)
+                            running[executor.submit(self._after_epoch, hook, epoch_id, epoch_data)] = hook
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in sorted(finished, key=lambda future: self._hooks.index(running[future])):
+                        done.add(running.pop(future))
+                        exception = future.exception()
+                        if isinstance(exception, TrainingTerminated):
+                            end_training_exception = exception
+                        elif exception is not None and failure is None:
+                            failure = exception
+            if failure is not None:
+                raise failure
+        if end_training_exception:
+            raise end_training_exception
@@ -18,6 +18,8 @@ class LogDir(AbstractHook):
 
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, output_dir: str, **kwargs):
         """
         Create new LogDir hook.
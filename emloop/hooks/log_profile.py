@@ -2,8 +2,9 @@
 Module with a hook which reports the time profile data in the standard logging.
 """
 import logging
+from collections import defaultdict
 from itertools import chain
-from typing import Iterable, List
+from typing import Iterable, List, Dict
 
 from . import AbstractHook
 from ..types import TimeProfile
@@ -22,31 +23,81 @@ class LogProfile(AbstractHook):
         hooks:
           - LogProfile
 
+    In addition, the hooks which took the most time (in all their events) are logged along with the share of
+    their ``after_batch`` events in the step time, i.e., in the total time of reading, evaluating and
+    processing the batches by the hooks.
     """
 
+    def __init__(self, top_hooks: int=5, **kwargs):
+        """
+        Create new LogProfile hook.
+
+        :param top_hooks: number of the slowest hooks to be logged
+        """
+        super().__init__(**kwargs)
+        self._top_hooks = top_hooks
+
+    @staticmethod
+    def _hook_times(profile: TimeProfile, streams: List[str]) -> Dict[str, List[float]]:
+        """
+        Sum the per-hook timings of the given streams.
+
+        :param profile: epoch timings profile
+        :param streams: streams to be considered
+        :return: the total time and the ``after_batch`` time of each hook
+        """
+        times = defaultdict(lambda: [0., 0.])
+        for key, timings in profile.items():
+            if key.startswith('after_batch_hook_'):
+                for stream_name in streams:
+                    if key.endswith('_' + stream_name):
+                        hook_name = key[len('after_batch_hook_'):-len(stream_name) - 1]
+                        times[hook_name][0] += sum(timings)
+                        times[hook_name][1] += sum(timings)
+                        break
+            for prefix in ('after_epoch_hook_', 'after_epoch_profile_hook_'):
+                if key.startswith(prefix):
+                    times[key[len(prefix):]][0] += sum(timings)
+        return times
+
     def after_epoch_profile(self, epoch_id, profile: TimeProfile, streams: List[str]) -> None:
         """
         Summarize and log the given epoch profile.
 
         The profile is expected to contain at least:
             - ``read_data_train``, ``eval_batch_train`` and ``after_batch_hooks_train`` entries produced by the train
-              stream (if train stream name is `train`)
+              stream (if train stream name is `train`); the read time of an interleaved train stream includes
+              the ``read_batch_<source>`` entries of its sources
             - ``after_epoch_hooks`` entry
 
+        The per-hook entries ``after_batch_hook_<hook>_<stream>``, ``after_epoch_hook_<hook>`` and
+        ``after_epoch_profile_hook_<hook>`` are optional.
+
         :param profile: epoch timings profile
         :param streams: streams for which profiling times will be printed
         """
 
         read_data_total = 0
         eval_total = 0
+        batch_hooks_total = 0
         hooks_total = sum(profile.get('after_epoch_hooks', []))
 
         for stream_name in streams:
             read_data_total += sum(profile.get('read_batch_' + stream_name, []))
-            hooks_total += sum(profile.get('after_batch_hooks_' + stream_name, []))
+            batch_hooks_total += sum(profile.get('after_batch_hooks_' + stream_name, []))
+        hooks_total += batch_hooks_total
 
         for stream_name in streams:
-            logging.info('\tT %s:\t%f', stream_name, sum(profile.get('eval_batch_{}'.format(stream_name), [])))
+            stream_eval = sum(profile.get('eval_batch_{}'.format(stream_name), []))
+            eval_total += stream_eval
+            logging.info('\tT %s:\t%f', stream_name, stream_eval)
 
         logging.info('\tT read data:\t%f', read_data_total)
         logging.info('\tT hooks:\t%f', hooks_total)
+
+        hook_times = LogProfile._hook_times(profile, streams)
+        step_total = read_data_total + eval_total + batch_hooks_total
+        slowest = sorted(hook_times.items(), key=lambda item: item[1][0], reverse=True)[:self._top_hooks]
+        for hook_name, (total, after_batch) in slowest:
+            logging.info('\tT hook %s:\t%f\t(%.1f%% of the step time)', hook_name, total,
+                         100 * after_batch / step_total if step_total > 0 else 0)
@@ -37,6 +37,8 @@ class LogVariables(AbstractHook):
 
     """
 
+    epoch_data_access = 'read'
+
     UNKNOWN_TYPE_ACTIONS = ['error', 'warn', 'str', 'ignore']
     """Posible actions to take on unknown variable type."""
 
@@ -32,6 +32,8 @@ class LogitsToCsv(AbstractHook):
               output_file: /tmp/colors.csv
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, variable: str, class_names: Iterable[str], id_variable: str,
                  output_file: str, streams: Optional[Iterable[str]]=None, **kwargs):
         """
@@ -53,6 +55,11 @@ class LogitsToCsv(AbstractHook):
         self._streams = streams
         self._accumulator = []
 
+    @property
+    def batch_streams(self) -> Optional[Iterable[str]]:
+        """Names of the streams to be processed; all the streams if not specified."""
+        return self._streams
+
     def after_batch(self, stream_name: str, batch_data: Batch) -> None:
         """Accumulate the given logits."""
         if self._streams is not None and stream_name not in self._streams:
@@ -61,10 +68,10 @@ class LogitsToCsv(AbstractHook):
         # Assert variables in batch data.
         if self._id_variable not in batch_data:
             raise KeyError('Variable `{}` to be used as unique id was not found in the batch data for stream `{}`. '
-                           'Available variables are `{}`.'.format(self._id_variable, stream_name, batch_data.keys()))
+                           'Available variables are `{}`.'.format(self._id_variable, stream_name, list(batch_data)))
         if self._variable not in batch_data:
             raise KeyError('Variable `{}` to be saved to csv was not found in the batch data for stream `{}`. '
-                           'Available variables are `{}`.'.format(self._variable, stream_name, batch_data.keys()))
+                           'Available variables are `{}`.'.format(self._variable, stream_name, list(batch_data)))
 
         # Assert equal batch sizes.
         assert len(batch_data[self._id_variable]) == len(batch_data[self._variable]), 'Batch sizes of variable ' \
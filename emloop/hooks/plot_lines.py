@@ -40,6 +40,8 @@ class PlotLines(AbstractHook):
               batch_count: 10
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, output_dir: str, variables: Iterable[str], streams: Optional[Iterable[str]]=None,
                  id_variable: str='ids', pad_mask_variable: Optional[str]=None, out_format: str='png',
                  ymin: Optional[float]=None, ymax: Optional[float]=None, example_count: Optional[int]=None,
@@ -107,6 +109,11 @@ class PlotLines(AbstractHook):
         fig.tight_layout()
         return fig
 
+    @property
+    def batch_streams(self) -> Optional[Iterable[str]]:
+        """Names of the streams to be processed; all the streams if not specified."""
+        return self._streams
+
     def after_batch(self, stream_name: str, batch_data: Batch):
         """
         Save images in provided streams from selected variable. The amount of batches and images to be processed is
@@ -118,15 +125,15 @@ class PlotLines(AbstractHook):
         # assert variables in batch data
         if self._id_variable not in batch_data:
             raise KeyError('Variable `{}` to be used as unique id was not found in the batch data for stream `{}`. '
-                           'Available variables are `{}`.'.format(self._id_variable, stream_name, batch_data.keys()))
+                           'Available variables are `{}`.'.format(self._id_variable, stream_name, list(batch_data)))
         if self._pad_mask_variable is not None and self._pad_mask_variable not in batch_data:
             raise KeyError('Variable `{}` to be used as padding mask was not found in the batch data for stream `{}`. '
                            'Available variables are `{}`.'.format(self._pad_mask_variable, stream_name,
-                                                                  batch_data.keys()))
+                                                                  list(batch_data)))
         for variable in self._variables:
             if variable not in batch_data:
                 raise KeyError('Variable `{}` to be plotted was not found in the batch data for stream `{}`. '
-                               'Available variables are `{}`.'.format(variable, stream_name, batch_data.keys()))
+                               'Available variables are `{}`.'.format(variable, stream_name, list(batch_data)))
 
         # only plot the requested number of batches
         self._batch_done[stream_name] += 1
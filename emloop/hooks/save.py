@@ -2,12 +2,17 @@
 Module with hooks saving the trained model under certain criteria.
 """
 import logging
+import os.path as path
+from threading import Lock
+from typing import Optional, Collection
 
 import numpy as np
 
 from . import AbstractHook, EveryNEpoch
 from ..models import AbstractModel
-from ..types import EpochData
+from ..types import EpochData, Batch
+from ..utils.yaml import yaml_to_file
+from ..constants import EL_STREAM_POSITION_FILE
 
 
 class SaveEvery(EveryNEpoch):
@@ -28,21 +33,76 @@ class SaveEvery(EveryNEpoch):
           - SaveEvery:
               on_failure: warn
 
+    With ``n_batches`` specified, the model is saved also every ``n_batches`` training batches (named by the epoch
+    and the batch). Along with every saved model, the position of the training stream is written to the output
+    directory (keyed by the name suffix of the model) so that ``emloop resume`` of that model continues from the very
+    same batch instead of the beginning of the epoch (see :py:attr:`emloop.datasets.StreamWrapper.position`).
+
+    .. code-block:: yaml
+        :caption: save every epoch and every 1000 training batches
+
+        hooks:
+          - SaveEvery:
+              n_batches: 1000
+
     """
 
+    epoch_data_access = 'none'
+
     SAVE_FAILURE_ACTIONS = ['error', 'warn', 'ignore']
     """Action to be executed when model save fails."""
 
-    def __init__(self, model: AbstractModel, on_failure: str='error', **kwargs):
+    _SAVE_LOCK = Lock()
+    """Lock serializing the saves of the hooks running concurrently."""
+
+    def __init__(self, model: AbstractModel, on_failure: str='error', n_batches: Optional[int]=None,
+                 output_dir: Optional[str]=None, **kwargs):
         """
         :param model: trained model
         :param on_failure: action to be taken when model fails to save itself; one of :py:attr:`SAVE_FAILURE_ACTIONS`
+        :param n_batches: if specified, save the model also every ``n_batches`` training batches
+        :param output_dir: output directory to write the training stream position to
         """
         super().__init__(model=model, **kwargs)
         assert on_failure in SaveEvery.SAVE_FAILURE_ACTIONS
 
         self._model = model
         self._on_save_failure = on_failure
+        self._n_batches = n_batches
+        self._output_dir = output_dir
+        self._batch_count = 0
+
+    def _save(self, name_suffix: str) -> None:
+        """
+        Save the model and the position of the training stream (if known) with the given name suffix.
+
+        :param name_suffix: name to be used for saving
+        """
+        save_path = SaveEvery.save_model(model=self._model, name_suffix=name_suffix, on_failure=self._on_save_failure)
+        if save_path is not None and self._output_dir is not None and self._main_loop is not None:
+            stream_position = self._main_loop.stream_position
+            if stream_position is not None:
+                stream_position['checkpoint'] = path.basename(path.normpath(save_path))
+                yaml_to_file(stream_position, self._output_dir, EL_STREAM_POSITION_FILE.format(name_suffix))
+
+    @property
+    def batch_streams(self) -> Optional[Collection[str]]:
+        """No streams are processed unless saving every ``n_batches`` training batches."""
+        return None if self._n_batches is not None else ()
+
+    def after_batch(self, stream_name: str, batch_data: Batch) -> None:
+        """Save the model every ``n_batches`` batches of a training epoch (if specified)."""
+        if self._n_batches is None or self._main_loop is None or not self._main_loop.training \
+                or stream_name != self._main_loop.train_stream_name:
+            return
+        self._batch_count += 1
+        if self._batch_count % self._n_batches == 0:
+            self._save('{}_{}'.format(self._main_loop.training_epochs_done + 1, self._batch_count))
+
+    def after_epoch(self, epoch_id: int, **kwargs) -> None:
+        """Reset the batch counter and save the model every ``n_epochs`` epoch."""
+        self._batch_count = 0
+        super().after_epoch(epoch_id=epoch_id, **kwargs)
 
     def _after_n_epoch(self, epoch_id: int, **_) -> None:
         """
@@ -50,22 +110,26 @@ class SaveEvery(EveryNEpoch):
 
         :param epoch_id: number of the processed epoch
         """
-        SaveEvery.save_model(model=self._model, name_suffix=str(epoch_id), on_failure=self._on_save_failure)
+        self._save(str(epoch_id))
 
     @staticmethod
-    def save_model(model: AbstractModel, name_suffix: str, on_failure: str) -> None:
+    def save_model(model: AbstractModel, name_suffix: str, on_failure: str) -> Optional[str]:
         """
         Save the given model with the given name_suffix. On failure, take the specified action.
+        The model is saved by a single hook at a time.
 
         :param model: the model to be saved
         :param name_suffix: name to be used for saving
         :param on_failure: action to be taken on failure; one of :py:attr:`SAVE_FAILURE_ACTIONS`
+        :return: path to the saved model or ``None`` on failure
         :raise IOError: on save failure with ``on_failure`` set to ``error``
         """
         try:
             logging.debug('Saving the model')
-            save_path = model.save(name_suffix)
+            with SaveEvery._SAVE_LOCK:
+                save_path = model.save(name_suffix)
             logging.info('Model saved to: %s', save_path)
+            return save_path
         except Exception as ex:  # pylint: disable=broad-except
             if on_failure == 'error':
                 raise IOError('Failed to save the model.') from ex
@@ -93,6 +157,8 @@ class SaveBest(AbstractHook):
 
     """
 
+    epoch_data_access = 'read'
+
     OBJECTIVES = {'min', 'max'}
     """Possible objectives for the monitor variable."""
 
@@ -196,6 +262,8 @@ class SaveLatest(AbstractHook):
           - SaveLatest
     """
 
+    epoch_data_access = 'none'
+
     _OUTPUT_NAME = 'latest'
 
     def __init__(self, model: AbstractModel, on_save_failure: str='error', **kwargs):
@@ -3,9 +3,8 @@ import os.path as path
 from typing import Optional, Sequence, Tuple
 
 import itertools
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from . import AccumulateVariables
 from ..types import EpochData
@@ -93,23 +92,25 @@ class SaveConfusionMatrix(AccumulateVariables):
         if self._mask_name is not None:
             accum_variables.append(self._mask_name)
         super().__init__(variables=accum_variables, **kwargs)
+        self.epoch_data_access = 'write' if figure_action == 'store' else 'none'
 
     def after_epoch(self, epoch_id: int, epoch_data: EpochData) -> None:
         for stream_name, variables in self._accumulator.items():
-            predicted = np.array(variables[self._predictions_name])
-            expected = np.array(variables[self._labels_name])
+            predicted = np.asarray(variables[self._predictions_name])
+            expected = np.asarray(variables[self._labels_name])
 
             # Only use the masked data if requested
             if self._mask_name is not None:
                 mask = np.asarray(variables[self._mask_name]).astype(np.bool)
                 predicted = predicted[mask]
                 expected = expected[mask]
+            max_class = max(np.max(predicted), np.max(expected))
 
             # Try to get names of classes from possible sources
             classes_names = False
             if self._classes_names is not None:
                 classes_names = self._classes_names
-                assert len(classes_names) > np.max([predicted, expected])
+                assert len(classes_names) > max_class
             elif hasattr(self._dataset, self._classes_names_method_name):
                 classes_names = getattr(self._dataset, self._classes_names_method_name)()
 
@@ -118,9 +119,9 @@ class SaveConfusionMatrix(AccumulateVariables):
                 num_classes = len(classes_names)
             elif hasattr(self._dataset, self._num_classes_method_name):
                 num_classes = getattr(self._dataset, self._num_classes_method_name)()
-                assert num_classes > np.max([predicted, expected])
+                assert num_classes > max_class
             else:
-                num_classes = np.max([predicted, expected]) + 1
+                num_classes = max_class + 1
 
             # Calculate confusion matrix (cm) with absolute values
             cm_abs = confusion_matrix(expected=expected, predicted=predicted, num_classes=num_classes)
@@ -131,39 +132,42 @@ class SaveConfusionMatrix(AccumulateVariables):
             # Choose cm type
             cm = cm_norm if self._normalize else cm_abs
 
-            # Save the heatmap of confusion matrix
-            plt.figure(figsize=self._figsize)
-            plt.imshow(cm, interpolation='nearest', cmap=self._cmap)
-            plt.title('Predicted', y=1.1)
-            plt.ylabel('Expected')
-            plt.tick_params(labeltop=True, labelbottom=False, top=True, bottom=False)
-            plt.colorbar()
+            # Save the heatmap of confusion matrix; the figure is not managed by pyplot, so that the hooks may plot
+            # concurrently
+            fig = Figure(figsize=self._figsize)
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+            image = ax.imshow(cm, interpolation='nearest', cmap=self._cmap)
+            ax.set_title('Predicted', y=1.1)
+            ax.set_ylabel('Expected')
+            ax.tick_params(labeltop=True, labelbottom=False, top=True, bottom=False)
+            fig.colorbar(image)
 
             # Change ticks if `classes_names` found
             if classes_names:
-                plt.xticks(np.arange(num_classes), classes_names, rotation=90)
-                plt.yticks(np.arange(num_classes), classes_names)
+                ax.set_xticks(np.arange(num_classes))
+                ax.set_xticklabels(classes_names, rotation=90)
+                ax.set_yticks(np.arange(num_classes))
+                ax.set_yticklabels(classes_names)
 
             # Add both normalized and absolute values to graph
             thresh = np.nanmax(cm) / 2.  # To avoid printing dark (bright) text to dark (bright) background
             for i, j in itertools.product(range(cm.shape[0]), range(cm.shape[1])):
-                plt.text(j, i, '{:.2f} / {}'.format(cm_norm[i, j], cm_abs[i, j]), fontdict={'size': 8},
-                         horizontalalignment="center", color='white' if cm[i, j] > thresh else 'black')
+                ax.text(j, i, '{:.2f} / {}'.format(cm_norm[i, j], cm_abs[i, j]), fontdict={'size': 8},
+                        horizontalalignment="center", color='white' if cm[i, j] > thresh else 'black')
 
-            plt.tight_layout()
+            fig.tight_layout()
 
             # Save / store the figure
             if self._figure_action == 'store':
-                fig = plt.gcf()
                 # Draw the figure first
-                fig.canvas.draw()
+                canvas.draw()
                 # Now we can save it to a numpy array
-                data = np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8)
-                data = data.reshape(fig.canvas.get_width_height()[::-1] + (3,))
+                data = np.frombuffer(canvas.tostring_rgb(), dtype=np.uint8)
+                data = data.reshape(canvas.get_width_height()[::-1] + (3,))
                 epoch_data[stream_name]['confusion_heatmap'] = data
             else:
                 fig_path = path.join(self._output_dir, 'confusion_matrix_epoch_{}_{}.png'.format(epoch_id, stream_name))
-                plt.savefig(fig_path)
-            plt.gcf().clear()
+                fig.savefig(fig_path)
 
         super().after_epoch()
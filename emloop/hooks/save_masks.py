@@ -4,6 +4,7 @@ Hook for saving masks to the filesystem.
 
 import os
 import logging
+from typing import Collection, Optional
 
 import numpy as np
 
@@ -49,6 +50,11 @@ class SaveMasks(AbstractHook):
         self._output_root = output_root
         self._suffix = suffix
 
+    @property
+    def batch_variables(self) -> Optional[Collection[str]]:
+        """The mask and path variables."""
+        return self._mask_variable, self._path_variable
+
     def save_mask(self, mask: np.ndarray, path: str) -> None:
         """
         Save the given mask to a file.
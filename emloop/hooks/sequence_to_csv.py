@@ -30,6 +30,8 @@ class SequenceToCsv(AbstractHook):
               output_file: /tmp/areas.csv
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, variables: Iterable[str], id_variable: str, output_file: str,
                  pad_mask_variable: Optional[str]=None,
                  streams: Optional[Iterable[str]]=None, **kwargs):
@@ -51,6 +53,11 @@ class SequenceToCsv(AbstractHook):
         self._streams = streams
         self._accumulator = []
 
+    @property
+    def batch_streams(self) -> Optional[Iterable[str]]:
+        """Names of the streams to be processed; all the streams if not specified."""
+        return self._streams
+
     def after_batch(self, stream_name: str, batch_data: Batch) -> None:
         """Accumulate the given sequences."""
         if self._streams is not None and stream_name not in self._streams:
@@ -59,15 +66,15 @@ class SequenceToCsv(AbstractHook):
         # Assert variables in batch data.
         if self._id_variable not in batch_data:
             raise KeyError('Variable `{}` to be used as unique id was not found in the batch data for stream `{}`. '
-                           'Available variables are `{}`.'.format(self._id_variable, stream_name, batch_data.keys()))
+                           'Available variables are `{}`.'.format(self._id_variable, stream_name, list(batch_data)))
         if self._pad_mask_variable is not None and self._pad_mask_variable not in batch_data:
             raise KeyError('Variable `{}` to be used as padding mask was not found in the batch data for stream `{}`. '
                            'Available variables are `{}`.'.format(self._pad_mask_variable, stream_name,
-                                                                  batch_data.keys()))
+                                                                  list(batch_data)))
         for variable in self._variables:
             if variable not in batch_data:
                 raise KeyError('Variable `{}` to be saved to csv was not found in the batch data for stream `{}`. '
-                               'Available variables are `{}`.'.format(variable, stream_name, batch_data.keys()))
+                               'Available variables are `{}`.'.format(variable, stream_name, list(batch_data)))
 
         # Assert equal batch sizes.
         batch_size = -1
@@ -76,6 +76,8 @@ class ShowProgress(AbstractHook):
           - ShowProgress
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, dataset: AbstractDataset, **kwargs):
         """
         Create new ShowProgress hook.
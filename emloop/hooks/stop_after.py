@@ -31,6 +31,8 @@ class StopAfter(AbstractHook):
               iterations: 1000
     """
 
+    epoch_data_access = 'none'
+
     def __init__(self, epochs: Optional[int]=None, iterations: Optional[int]=None, minutes: Optional[float]=None,
                  train_stream_name: str=EL_DEFAULT_TRAIN_STREAM, **kwargs):
         """
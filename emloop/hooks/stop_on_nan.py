@@ -2,7 +2,7 @@
 Module with StopOnNaN hook.
 """
 import logging
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Collection
 
 import numpy as np
 
@@ -29,6 +29,8 @@ class StopOnNaN(AbstractHook):
 
     """
 
+    epoch_data_access = 'read'
+
     UNKNOWN_TYPE_ACTIONS = ['error', 'warn', 'ignore']
     """Posible actions to take on unknown variable type."""
 
@@ -111,6 +113,16 @@ class StopOnNaN(AbstractHook):
         if self._after_epoch:
             self._check_nan(epoch_data)
 
+    @property
+    def batch_streams(self) -> Optional[Collection[str]]:
+        """No streams are processed unless checking after each batch."""
+        return None if self._after_batch else ()
+
+    @property
+    def batch_variables(self) -> Optional[Collection[str]]:
+        """The monitored variables; ``None`` means all."""
+        return self._variables
+
     def after_batch(self, stream_name: str, batch_data) -> None:
         """
         If initialized to check after each batch, stop the training once the batch data contains a monitored
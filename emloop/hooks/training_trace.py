@@ -28,6 +28,8 @@ class TrainingTrace(AbstractHook):
     """
     Takes care of the "trace.yaml" file in output_dir.
     """
+
+    epoch_data_access = 'none'
     def __init__(self, output_dir: str, **kwargs):
         super().__init__(**kwargs)
 
@@ -38,6 +38,8 @@ class WriteCSV(AbstractHook):
 
     """
 
+    epoch_data_access = 'read'
+
     UNKNOWN_TYPE_ACTIONS = ['error', 'warn', 'default']
     """Action executed on unknown type detection."""
 
@@ -4,19 +4,25 @@
 The MainLoop requires AbstractModel, AbstractDataset and a list of AbstractHooks.
 Having all that, it manages iterating through streams, training and hooks execution.
 """
+import os
 import logging
-from typing import Iterable, Callable, List, Dict, Optional, Union
-from collections import OrderedDict
+import os.path as path
+from typing import Iterable, Callable, List, Dict, Optional, Union, Mapping
+from collections import OrderedDict, ChainMap, Counter
 
-from .datasets import AbstractDataset
+from .datasets import AbstractDataset, DiskCache, MemoryCache, MemoryCachePool
 from .models.abstract_model import AbstractModel
 from .hooks.abstract_hook import AbstractHook, TrainingTerminated
 from .hooks.training_trace import TrainingTrace
+from .hooks.hook_runner import AsyncHookRunner, EpochHookRunner
+from .hooks.accumulate_variables import AccumulatorRegistry
 from .utils import Timer
 from .utils.misc import CaughtInterrupts
 from .datasets.stream_wrapper import StreamWrapper
-from .constants import EL_DEFAULT_TRAIN_STREAM, EL_PREDICT_STREAM
-from .types import EpochData
+from .datasets.stream_tuner import StreamTuner
+from .datasets.interleaved_stream import InterleavedStream
+from .constants import EL_DEFAULT_TRAIN_STREAM, EL_PREDICT_STREAM, EL_BUFFER_SLEEP
+from .types import EpochData, ColumnarBatch
 
 
 class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attributes
@@ -28,13 +34,35 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
     """Possible actions to be taken when a stream source is unused by the trained model."""
     INCORRECT_CONFIG_ACTIONS = ['ignore', 'warn', 'error']
     """Possible actions to be taken when a mainloop config contains some unexpected arguments."""
+    CACHES = ['disk', 'memory']
+    """Possible kinds of the stream caches."""
 
     def __init__(self,   # pylint: disable=too-many-arguments
                  model: AbstractModel, dataset: AbstractDataset,
                  hooks: Iterable[AbstractHook]=(),
                  train_stream_name: str=EL_DEFAULT_TRAIN_STREAM,
+                 interleave_streams: Optional[Mapping[str, float]]=None,
+                 interleave_temperature: float=1.,
+                 interleave_seed: Optional[int]=None,
                  extra_streams: Iterable[str]=(),  # pylint: disable=invalid-sequence-index
-                 buffer: int=0,
+                 buffer: Union[int, str]=0,
+                 buffer_bytes: int=0,
+                 workers: Union[int, str]=0,
+                 worker_start_method: Optional[str]=None,
+                 shared_memory: int=0,
+                 buffer_sleep: float=EL_BUFFER_SLEEP,
+                 persistent_buffer: bool=False,
+                 auto_tune_epochs: int=3,
+                 auto_max_buffer: int=64,
+                 auto_max_workers: Optional[int]=None,
+                 async_in_flight: int=1,
+                 shard_index: int=0,
+                 num_shards: int=1,
+                 cache_streams: Iterable[str]=(),  # pylint: disable=invalid-sequence-index
+                 cache_dir: Optional[str]=None,
+                 cache: str='disk',
+                 cache_size: int=2**30,
+                 cache_compression: Optional[str]=None,
                  on_empty_batch: str='error',
                  on_empty_stream: str='error',
                  on_unused_sources: str='warn',
@@ -43,14 +71,52 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
                  fixed_batch_size: Optional[int]=None,
                  fixed_epoch_size: Optional[int]=None,
                  skip_zeroth_epoch: bool=False,
+                 hook_queue_size: int=16,
+                 after_epoch_threads: int=0,
                  **kwargs):
         """
         :param model: trained model
         :param dataset: loaded dataset
         :param hooks: training hooks
         :param train_stream_name: name of the training stream
+        :param interleave_streams: if specified, the training stream interleaves the batches of these streams sampled
+            according to the given weights (see :py:class:`emloop.datasets.InterleavedStream`)
+        :param interleave_temperature: temperature of sampling the ``interleave_streams``
+        :param interleave_seed: seed of sampling the ``interleave_streams``
         :param extra_streams: additional stream names to be evaluated between epochs
-        :param buffer: size of the batch buffer, 0 means no buffer
+        :param buffer: size of the batch buffer, 0 means no buffer; ``auto`` means the size is tuned in the first
+            ``auto_tune_epochs`` epochs of each stream (see :py:class:`emloop.datasets.StreamTuner`)
+        :param buffer_bytes: limit of the total size (in bytes) of the numpy sources of the buffered batches, 0 means
+            no limit (see :py:class:`emloop.datasets.StreamWrapper`)
+        :param workers: number of worker processes producing the batches of each stream, 0 means no worker processes
+            (see :py:class:`emloop.datasets.StreamWrapper`); ``auto`` means the number is tuned in the first
+            ``auto_tune_epochs`` epochs of each stream (see :py:class:`emloop.datasets.StreamTuner`)
+        :param worker_start_method: start method of the worker processes (``fork``, ``spawn`` or ``forkserver``),
+            ``None`` means the platform default
+        :param shared_memory: size (in bytes) of the shared memory slot for a single batch produced by the worker
+            processes, 0 means the batches are pickled (see :py:class:`emloop.datasets.StreamWrapper`)
+        :param buffer_sleep: duration (in seconds) for which the buffer waits for the GIL to be released after the
+            model allowed buffering, 0 means no waiting (see :py:class:`emloop.datasets.StreamWrapper`)
+        :param persistent_buffer: if ``True``, the buffers keep buffering the next epoch while the other streams and
+            the ``after_epoch`` hooks run (see :py:class:`emloop.datasets.StreamWrapper`)
+        :param auto_tune_epochs: number of the epochs of each stream in which the ``auto`` buffer and workers are tuned
+        :param auto_max_buffer: maximum size of the ``auto`` buffer
+        :param auto_max_workers: maximum number of the ``auto`` worker processes, ``None`` means the number of CPUs
+            minus one
+        :param async_in_flight: maximum number of the concurrently awaited items of asynchronous streams
+            (see :py:class:`emloop.datasets.AsyncStream`)
+        :param shard_index: index of the shard of the streams to be produced by this process
+        :param num_shards: total number of the stream shards (e.g. the number of the nodes of a multi-node training),
+            1 means the whole streams are produced (see :py:class:`emloop.datasets.StreamWrapper`)
+        :param cache_streams: names of the deterministic streams to be recorded in the first epoch and replayed
+            from the cache in the following epochs
+        :param cache_dir: directory of the disk stream caches (required with ``cache_streams`` and ``disk`` cache);
+            the cache of each stream (or of its shard) is stored in its subdirectory of the same name
+        :param cache: kind of the stream caches; one of :py:attr:`MainLoop.CACHES`
+            (see :py:class:`emloop.datasets.DiskCache` and :py:class:`emloop.datasets.MemoryCache`)
+        :param cache_size: size limit (in bytes) of the memory shared by the ``memory`` stream caches
+        :param cache_compression: compression of the numpy sources in the ``memory`` stream caches; one of
+            :py:attr:`emloop.datasets.MemoryCachePool.COMPRESSIONS` or ``None``
         :param on_empty_batch: action to take when batch is empty; one of :py:attr:`MainLoop.EMPTY_ACTIONS`
         :param on_empty_stream: action to take when stream is empty; one of :py:attr:`MainLoop.EMPTY_ACTIONS`
         :param on_unused_sources: action to take when stream provides an unused sources; one of
@@ -61,13 +127,25 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         :param fixed_batch_size: if specified, main_loop removes all batches that do not have the specified size
         :param fixed_epoch_size: if specified, cut the train stream to epochs of at most ``fixed_epoch_size`` batches
         :param skip_zeroth_epoch: if specified, main loop skips the 0th epoch
-        :raise AssertionError: in case of unsupported value of ``on_empty_batch``, ``on_empty_stream`` or \
-        ``on_unused_sources``
+        :param hook_queue_size: maximum number of the pending ``after_batch`` events of each hook running them
+            in the background (see :py:class:`emloop.hooks.AbstractHook`)
+        :param after_epoch_threads: number of the threads running the ``after_epoch`` events of the independent hooks
+            concurrently (see :py:attr:`emloop.hooks.AbstractHook.epoch_data_access`), 0 means the events are run
+            one by one
+        :raise AssertionError: in case of unsupported value of ``on_empty_batch``, ``on_empty_stream``, \
+        ``on_unused_sources``, ``cache``, ``buffer`` or ``workers``
+        :raise ValueError: if ``cache_streams`` are specified without ``cache_dir`` for the ``disk`` cache
         """
         assert on_empty_batch in MainLoop.EMPTY_ACTIONS
         assert on_empty_stream in MainLoop.EMPTY_ACTIONS
         assert on_unused_sources in MainLoop.UNUSED_SOURCE_ACTIONS
         assert on_incorrect_config in MainLoop.INCORRECT_CONFIG_ACTIONS
+        assert cache in MainLoop.CACHES
+        assert buffer == 'auto' or isinstance(buffer, int)
+        assert workers == 'auto' or isinstance(workers, int)
+        if cache_streams and cache == 'disk' and cache_dir is None:
+            raise ValueError('Stream cache directory `main_loop.cache_dir` has to be specified with '
+                             '`main_loop.cache_streams`.')
 
         if kwargs:
             if on_incorrect_config == 'error':
@@ -82,7 +160,27 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         self._model = model
         self._dataset = dataset
         self._hooks = hooks
-        self._buffer = buffer
+        self._buffer = 0 if buffer == 'auto' else buffer
+        self._buffer_bytes = buffer_bytes
+        self._workers = 0 if workers == 'auto' else workers
+        self._tuner = None
+        if 'auto' in (buffer, workers):
+            if auto_max_workers is None:
+                auto_max_workers = max(1, (os.cpu_count() or 1) - 1)
+            self._tuner = StreamTuner(tune_buffer=buffer == 'auto', tune_workers=workers == 'auto',
+                                      max_buffer=auto_max_buffer, max_workers=auto_max_workers,
+                                      epochs=auto_tune_epochs)
+        self._worker_start_method = worker_start_method
+        self._shared_memory = shared_memory
+        self._buffer_sleep = buffer_sleep
+        self._persistent_buffer = persistent_buffer
+        self._async_in_flight = async_in_flight
+        self._shard_index = shard_index
+        self._num_shards = num_shards
+        self._cache_streams = set(cache_streams)
+        self._cache_dir = cache_dir
+        self._cache = cache
+        self._cache_pool = MemoryCachePool(cache_size, cache_compression) if cache == 'memory' else None
         self._epochs_count = epochs_count
         self._on_empty_batch = on_empty_batch
         self._on_empty_stream = on_empty_stream
@@ -92,10 +190,23 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         self._extra_sources_warned = False
         self._epoch_profile = {}
         self._train_stream_name = train_stream_name
+        self._interleave_streams = dict(interleave_streams) if interleave_streams else None
+        self._interleave_temperature = interleave_temperature
+        self._interleave_seed = interleave_seed
         self._extra_streams = list(extra_streams)
         self._skip_zeroth_epoch = skip_zeroth_epoch
         self._streams = {}
         self._training_epochs_done = 0
+        self._training = False
+        self._epochs_run = 0
+        self._resume_position = None
+        self._checked_schemas = {}
+        async_hooks = [hook for hook in self._hooks if hook.async_after_batch]
+        self._hook_runner = AsyncHookRunner(async_hooks, hook_queue_size, self._epoch_profile) if async_hooks else None
+        self._hook_names = MainLoop._name_hooks(self._hooks)
+        self._accumulators = AccumulatorRegistry()
+        self._epoch_hook_runner = EpochHookRunner(self._hooks, after_epoch_threads, self._hook_names,
+                                                  self._epoch_profile)
 
         for hook in self._hooks:
             hook.register_mainloop(self)
@@ -109,17 +220,59 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
             hook.before_training()
 
     def __exit__(self, exc_type, exc_value, traceback):
-        """Calls after_training() for all hooks."""
+        """Closes the streams and calls after_training() for all hooks."""
         CaughtInterrupts.__exit__(self)
+        for stream in self._streams.values():
+            stream.close()
+        if self._hook_runner is not None:
+            self._hook_runner.close()
         for hook in self._hooks:
             success = exc_type == None
             hook.after_training(success)
 
+    @property
+    def accumulators(self) -> AccumulatorRegistry:
+        """Accumulator of the batch variables shared by the hooks."""
+        return self._accumulators
+
     @property
     def training_epochs_done(self) -> Optional[int]:
         """Number of training epochs done."""
         return self._training_epochs_done
 
+    @property
+    def training(self) -> bool:
+        """Whether the model is being trained, i.e., whether a training stream of a training epoch is iterated."""
+        return self._training
+
+    @property
+    def train_stream_name(self) -> str:
+        """Name of the training stream as specified in :py:meth:`self.__init__`."""
+        return self._train_stream_name
+
+    @property
+    def stream_position(self) -> Optional[dict]:
+        """
+        Position of the training stream to be stored along with a checkpoint and passed to
+        :py:meth:`resume_stream_position` on resume; ``None`` if the training stream does not track its position.
+        """
+        stream = self._streams.get(self._train_stream_name)
+        if not isinstance(stream, StreamWrapper):
+            return None
+        return {'stream': self._train_stream_name, 'position': stream.position}
+
+    def resume_stream_position(self, stream_position: dict) -> None:
+        """
+        Continue the first training epoch from the given position of the training stream.
+
+        :param stream_position: position returned from :py:attr:`stream_position`
+        """
+        if stream_position.get('stream') != self._train_stream_name:
+            logging.warning('Stream position of `%s` does not belong to the training stream `%s`; ignoring it',
+                            stream_position.get('stream'), self._train_stream_name)
+            return
+        self._resume_position = stream_position['position']
+
     @property
     def fixed_epoch_size(self) -> Optional[int]:
         """Fixed epoch size parameter as specified in :py:meth:`self.__init__`."""
@@ -155,11 +308,34 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
             raise ValueError('Stream does not provide all required sources. Missing sources: {}'
                              .format(missing_sources))
 
+    @staticmethod
+    def _name_hooks(hooks: Iterable[AbstractHook]) -> Dict[AbstractHook, str]:
+        """
+        Name the given hooks in their profile entries by their class names; the repeated names are suffixed with
+        the number of their occurrence, e.g. ``SaveBest``, ``SaveBest_2``.
+
+        :param hooks: hooks to be named
+        :return: the names of the hooks
+        """
+        names, counts = {}, Counter()
+        for hook in hooks:
+            name = type(hook).__name__
+            counts[name] += 1
+            names[hook] = name if counts[name] == 1 else '{}_{}'.format(name, counts[name])
+        return names
+
+    def _batch_hooks(self, stream_name: str) -> List[AbstractHook]:
+        """Return the hooks interested in the ``after_batch`` events of the given stream."""
+        return [hook for hook in self._hooks
+                if getattr(hook.after_batch, '__func__', None) is not AbstractHook.after_batch
+                and (hook.batch_streams is None or stream_name in hook.batch_streams)]
+
     def _run_epoch(self, stream: StreamWrapper, train: bool) -> None:
         """
         Iterate through the given stream and evaluate/train the model with the received batches.
 
-        Calls :py:meth:`emloop.hooks.AbstractHook.after_batch` events.
+        Calls :py:meth:`emloop.hooks.AbstractHook.after_batch` events of the interested hooks with a view of the batch
+        inputs and model outputs.
 
         :param stream: stream to iterate
         :param train: if set to ``True``, the model will be trained
@@ -167,11 +343,17 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         :raise ValueError: in case of empty stream when ``on_empty_stream`` is set to ``error``
         :raise ValueError: in case of two batch variables having different lengths
         """
+        batch_hooks = [(hook, 'after_batch_hook_{}_{}'.format(self._hook_names[hook], stream.name))
+                       for hook in self._batch_hooks(stream.name)]
         nonempty_batch_count = 0
         for i, batch_input in enumerate(stream):
             self.raise_check_interrupt()
 
-            batch_sizes = {len(source) for source in batch_input.values()}
+            columnar = isinstance(batch_input, ColumnarBatch)
+            if columnar:  # the batch size is known and the schema is checked only once per stream
+                batch_sizes = {batch_input.batch_size} if len(batch_input) > 0 else set()
+            else:
+                batch_sizes = {len(source) for source in batch_input.values()}
             if len(batch_sizes) == 0 or batch_sizes == {0}:
                 if self._on_empty_batch == 'warn':
                     logging.warning('%i-th batch in stream `%s` appears to be empty (%i-th empty batch in total). Set '
@@ -191,17 +373,42 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
                     continue
             nonempty_batch_count += 1
 
-            self._check_sources(batch_input)
+            check = not columnar or self._checked_schemas.get(stream.name) != batch_input.schema
+            if check:
+                self._check_sources(batch_input)
 
             with Timer('eval_batch_{}'.format(stream.name), self._epoch_profile):
                 batch_output = self._model.run(batch=batch_input, train=train, stream=stream)
-            assert set(batch_input.keys()).isdisjoint(set(batch_output)
-                                                      ), 'Batch inputs and outputs must not overlap.'
+            if check:
+                assert set(batch_input.keys()).isdisjoint(set(batch_output)
+                                                          ), 'Batch inputs and outputs must not overlap.'
+                if columnar:
+                    self._checked_schemas[stream.name] = batch_input.schema
 
             with Timer('after_batch_hooks_{}'.format(stream.name), self._epoch_profile):
-                batch_data = {**batch_input, **batch_output}
-                for hook in self._hooks:
-                    hook.after_batch(stream_name=stream.name, batch_data=batch_data)
+                self._accumulators.begin_batch((self._epochs_run, stream.name, i))
+                # the variables assigned by the hooks go to the first mapping; the batch is not copied
+                batch_data = ChainMap({}, batch_output, batch_input.columns if columnar else batch_input)
+                for hook, profile_key in batch_hooks:
+                    hook_data = batch_data
+                    variables = hook.batch_variables
+                    if variables is not None:  # only the variables of interest are passed
+                        hook_data = {variable: batch_data[variable] for variable in variables
+                                     if variable in batch_data}
+                        if not hook_data:
+                            continue
+                    if hook.async_after_batch:
+                        self._hook_runner.after_batch(hook, stream_name=stream.name, batch_data=hook_data,
+                                                      profile_key=profile_key)
+                    else:
+                        with Timer(profile_key, self._epoch_profile):
+                            hook.after_batch(stream_name=stream.name, batch_data=hook_data)
+                if self._hook_runner is not None and self._shared_memory > 0:
+                    self._hook_runner.wait()
+            stream.release_batch()  # the hooks are done with the batch; its shared memory slot may be reused
+        if self._hook_runner is not None:  # all the after_batch events are processed before the after_epoch events
+            with Timer('after_batch_hooks_wait_{}'.format(stream.name), self._epoch_profile):
+                self._hook_runner.wait()
         if nonempty_batch_count == 0:
             if self._on_empty_stream == 'warn':
                 logging.warning('Stream `%s` appears to be empty. Set `main_loop.on_empty_stream` to `ignore` in order '
@@ -211,27 +418,60 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
                                  '`main_loop.on_empty_stream` to `warn` in order to change this error into warning; '
                                  'set to `ignore` to remove it.'.format(stream.name))
 
-    def get_stream(self, stream_name: str) -> StreamWrapper:
+    def _create_stream_wrapper(self, stream_name: str, epoch_size: int=-1) -> StreamWrapper:
+        """
+        Create a :py:class:`StreamWrapper` of the dataset stream with the given name.
+
+        :param stream_name: stream name
+        :param epoch_size: fixed epoch size of the stream, -1 means no limit
+        :return: the stream wrapper
+        :raise AttributeError: if the dataset does not provide the function creating the stream
+        """
+        stream_fn_name = '{}_stream'.format(stream_name)
+        try:
+            stream_fn = getattr(self._dataset, stream_fn_name)
+        except AttributeError as ex:
+            raise AttributeError('The dataset does not have a function for creating a stream named `{}`. '
+                                 'The function has to be named `{}`.'.format(stream_name, stream_fn_name)) from ex
+        cache = None
+        if stream_name in self._cache_streams:
+            if self._cache == 'disk':
+                cache_name = stream_name
+                if self._num_shards > 1:
+                    cache_name = '{}_shard_{}_of_{}'.format(stream_name, self._shard_index, self._num_shards)
+                cache = DiskCache(path.join(self._cache_dir, cache_name))
+            else:
+                cache = MemoryCache(self._cache_pool, stream_name)
+        return StreamWrapper(stream_fn, buffer_size=self._buffer, epoch_size=epoch_size, name=stream_name,
+                             profile=self._epoch_profile, workers=self._workers, shared_memory=self._shared_memory,
+                             buffer_sleep=self._buffer_sleep, persistent=self._persistent_buffer,
+                             buffer_bytes=self._buffer_bytes, start_method=self._worker_start_method, cache=cache,
+                             async_in_flight=self._async_in_flight, shard_index=self._shard_index,
+                             num_shards=self._num_shards)
+
+    def get_stream(self, stream_name: str) -> Union[StreamWrapper, InterleavedStream]:
         """
         Get a :py:class:`StreamWrapper` with the given name.
 
+        If ``interleave_streams`` are specified, the training stream is an :py:class:`InterleavedStream` of them.
+
         :param stream_name: stream name
         :return: dataset function name providing the respective stream
         :raise AttributeError: if the dataset does not provide the function creating the stream
         """
         if stream_name not in self._streams:
-            stream_fn_name = '{}_stream'.format(stream_name)
-            try:
-                stream_fn = getattr(self._dataset, stream_fn_name)
-                stream_epoch_limit = -1
-                if self._fixed_epoch_size is not None and stream_name == self._train_stream_name:
-                    stream_epoch_limit = self._fixed_epoch_size
-                self._streams[stream_name] = StreamWrapper(stream_fn, buffer_size=self._buffer,
-                                                           epoch_size=stream_epoch_limit, name=stream_name,
-                                                           profile=self._epoch_profile)
-            except AttributeError as ex:
-                raise AttributeError('The dataset does not have a function for creating a stream named `{}`. '
-                                     'The function has to be named `{}`.'.format(stream_name, stream_fn_name)) from ex
+            stream_epoch_limit = -1
+            if self._fixed_epoch_size is not None and stream_name == self._train_stream_name:
+                stream_epoch_limit = self._fixed_epoch_size
+            if self._interleave_streams is not None and stream_name == self._train_stream_name:
+                sources = {source: self._create_stream_wrapper(source) for source in self._interleave_streams}
+                self._streams[stream_name] = InterleavedStream(sources, weights=self._interleave_streams,
+                                                               temperature=self._interleave_temperature,
+                                                               name=stream_name, epoch_size=stream_epoch_limit,
+                                                               seed=self._interleave_seed,
+                                                               profile=self._epoch_profile)
+            else:
+                self._streams[stream_name] = self._create_stream_wrapper(stream_name, stream_epoch_limit)
         return self._streams[stream_name]
 
     def prepare_streams(self, stream_list: Iterable[Union[Iterable, StreamWrapper, str]],
@@ -250,13 +490,19 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
                 stream_name = stream_object
                 streamwrapper = self.get_stream(stream_object)
 
-            elif isinstance(stream_object, StreamWrapper):
+            elif isinstance(stream_object, (StreamWrapper, InterleavedStream)):
                 stream_name = stream_object.name
                 streamwrapper = stream_object
 
             else:
                 streamwrapper = StreamWrapper(lambda stream_object=stream_object: stream_object,
-                                              buffer_size=self._buffer, profile=self._epoch_profile)
+                                              buffer_size=self._buffer, profile=self._epoch_profile,
+                                              workers=self._workers, shared_memory=self._shared_memory,
+                                              buffer_sleep=self._buffer_sleep, persistent=self._persistent_buffer,
+                                              buffer_bytes=self._buffer_bytes,
+                                              start_method=self._worker_start_method,
+                                              async_in_flight=self._async_in_flight,
+                                              shard_index=self._shard_index, num_shards=self._num_shards)
 
             if stream_name is None:
                 stream_name = f"unnamed_{base_name}_{unnamed_count}"
@@ -278,13 +524,22 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         :param train_streams: list of training streams, each either string (e.g. 'train'), StreamWrapper or iterator
         :param eval_streams: list of eval streams, each either string (e.g. 'valid'), StreamWrapper or iterator
         """
+        train_streams, eval_streams = list(train_streams), list(eval_streams)
         self._streams = {}
-        train_streams = self.prepare_streams(train_streams, "train")
-        eval_streams = self.prepare_streams(eval_streams, "eval")
+        train_stream_names = self.prepare_streams(train_streams, "train")
+        eval_stream_names = self.prepare_streams(eval_streams, "eval")
 
-        self._epoch_impl(train_streams, eval_streams)
+        self._epoch_impl(train_stream_names, eval_stream_names)
+        for stream_object, stream_name in zip(train_streams + eval_streams, train_stream_names + eval_stream_names):
+            if not isinstance(stream_object, (StreamWrapper, InterleavedStream)):  # managed by the caller
+                self._streams[stream_name].close()
         self._streams = {}
 
+    def _tune_stream(self, stream: Union[StreamWrapper, InterleavedStream]) -> None:
+        """Tune the ``auto`` buffer and workers of the given stream according to its epoch profile (if requested)."""
+        if self._tuner is not None and isinstance(stream, (StreamWrapper, InterleavedStream)):
+            self._tuner.tune(stream, self._epoch_profile)
+
     def _epoch_impl(self, train_streams: Iterable[str], eval_streams: Iterable[str]) -> None:
         """
         Runs single epoch with given streams.
@@ -293,13 +548,20 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
         :param eval_streams: list of eval streams
         """
         self._epoch_profile.clear()
+        self._epochs_run += 1
         for stream_name in train_streams:
             with self.get_stream(stream_name) as stream:
-                self._run_epoch(stream=stream, train=True)
+                self._training = True
+                try:
+                    self._run_epoch(stream=stream, train=True)
+                finally:
+                    self._training = False
+            self._tune_stream(stream)
 
         for stream_name in eval_streams:
             with self.get_stream(stream_name) as stream:
                 self._run_epoch(stream=stream, train=False)
+            self._tune_stream(stream)
 
         if len(train_streams) > 0:
             self._training_epochs_done += 1
@@ -309,15 +571,16 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
 
         end_training_exception = None
         with Timer('after_epoch_hooks', self._epoch_profile):
-            for hook in self._hooks:
-                try:
-                    hook.after_epoch(epoch_id=self._training_epochs_done, epoch_data=epoch_data)
-                except TrainingTerminated as ex:
-                    end_training_exception = ex
+            try:
+                self._epoch_hook_runner.after_epoch(epoch_id=self._training_epochs_done, epoch_data=epoch_data)
+            except TrainingTerminated as ex:
+                end_training_exception = ex
+        self._accumulators.reset()
 
         for hook in self._hooks:
-            hook.after_epoch_profile(epoch_id=self._training_epochs_done, profile=self._epoch_profile,
-                                     streams=train_streams + eval_streams)
+            with Timer('after_epoch_profile_hook_{}'.format(self._hook_names[hook]), self._epoch_profile):
+                hook.after_epoch_profile(epoch_id=self._training_epochs_done, profile=self._epoch_profile,
+                                         streams=train_streams + eval_streams)
 
         if end_training_exception:
             raise end_training_exception
@@ -340,6 +603,11 @@ class MainLoop(CaughtInterrupts):   # pylint: disable=too-many-instance-attribut
                     logging.info('0th epoch done\n\n')
 
                 while True:
+                    if self._resume_position is not None:
+                        stream = self.get_stream(self._train_stream_name)
+                        if isinstance(stream, StreamWrapper):
+                            stream.seek(self._resume_position)
+                        self._resume_position = None
                     logging.info('Training epoch %s', self._training_epochs_done + 1)
                     self._epoch_impl([self._train_stream_name], self._extra_streams)
                     logging.info('Epoch %s done\n\n', self._training_epochs_done)
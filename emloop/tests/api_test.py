@@ -18,9 +18,9 @@ from emloop.hooks.abstract_hook import AbstractHook
 from emloop.hooks import StopAfter, LogProfile
 from emloop.hooks.training_trace import TrainingTraceKeys
 from emloop.datasets import AbstractDataset, StreamWrapper
-from emloop.constants import EL_DEFAULT_TRAIN_STREAM, EL_TRACE_FILE
+from emloop.constants import EL_DEFAULT_TRAIN_STREAM, EL_TRACE_FILE, EL_STREAM_CACHE_DIR, EL_STREAM_POSITION_FILE
 from emloop.types import TimeProfile
-from emloop.utils.yaml import load_yaml
+from emloop.utils.yaml import load_yaml, yaml_to_file
 
 
 class DummyDataset:
@@ -459,3 +459,38 @@ def test_delete_output_dir(tmpdir):
     """Test that output dir will be deleted if rm set to true."""
     delete_output_dir(tmpdir)
     assert not os.path.exists(tmpdir)
+
+
+def test_stream_cache_dir(tmpdir):
+    """Test the stream cache directory is derived from the dataset configuration."""
+    config = {'dataset': {'class': 'emloop.tests.api_test.DummyDataset', 'batch_size': 10},
+              'hooks': [{'StopAfter': {'epochs': 1}}],
+              'model': {'class': 'emloop.tests.api_test.DummyModel', 'io': {'in': [], 'out': ['dummy']}},
+              'main_loop': {'cache_streams': ['valid']}}
+
+    cache_dir = create_emloop_training(config=config, output_root=tmpdir).main_loop._cache_dir
+    assert path.dirname(cache_dir) == path.join(tmpdir, EL_STREAM_CACHE_DIR)
+    assert create_emloop_training(config=config, output_root=tmpdir).main_loop._cache_dir == cache_dir
+
+    config['dataset']['batch_size'] = 20
+    config['main_loop']['cache_dir'] = path.join(tmpdir, 'my_cache')
+    other_cache_dir = create_emloop_training(config=config, output_root=tmpdir).main_loop._cache_dir
+    assert path.dirname(other_cache_dir) == path.join(tmpdir, 'my_cache')
+    assert path.basename(other_cache_dir) != path.basename(cache_dir)
+
+
+def test_resume_stream_position(tmpdir):
+    """Test the training stream position stored along with the checkpoint is resumed."""
+    config = {'dataset': {'class': 'emloop.tests.api_test.DummyDataset'},
+              'hooks': [{'StopAfter': {'epochs': 1}}],
+              'model': {'class': 'emloop.tests.api_test.DummyModel', 'io': {'in': [], 'out': ['dummy']}}}
+    for name_suffix, batches in [('3', 0), ('3_42', 42)]:
+        position = {'stream': 'train', 'position': {'batches': batches}, 'checkpoint': 'model_{}'.format(name_suffix)}
+        yaml_to_file(position, str(tmpdir), EL_STREAM_POSITION_FILE.format(name_suffix))
+
+    for restore_from, resume_position in [('model_3_42', {'batches': 42}), ('model_3_42.ckpt', {'batches': 42}),
+                                          ('model_3', {'batches': 0}), ('model_best', None), ('', None)]:
+        restore_from = path.join(str(tmpdir), restore_from)
+        main_loop = create_emloop_training(config=config, output_root=tmpdir, restore_from=restore_from).main_loop
+        assert main_loop._resume_position == resume_position
+    assert create_emloop_training(config=config, output_root=tmpdir).main_loop._resume_position is None
@@ -0,0 +1,69 @@
+"""
+Test module for **emloop dataset benchmark** command.
+"""
+import json
+import logging
+import os.path as path
+import time
+
+import numpy as np
+import pytest
+
+import emloop as el
+from emloop.cli import invoke_dataset_method
+from emloop.datasets.stream_profiler import benchmark_stream
+
+
+class BenchmarkDataset(el.BaseDataset):
+    """Dataset with a configurable batch size."""
+
+    def _configure_dataset(self, batch_size: int=2, read_time: float=0., **kwargs):
+        self._batch_size = batch_size
+        self._read_time = read_time
+
+    def train_stream(self):
+        for i in range(10):
+            time.sleep(self._read_time)
+            yield {'images': np.ones((self._batch_size, 4), dtype=np.float32), 'labels': [i] * self._batch_size}
+
+    valid_stream = train_stream
+
+
+def test_benchmark_stream():
+    """Test the benchmark excludes the warm-up batches and checks the stream keeps up with the step."""
+    dataset = BenchmarkDataset('read_time: 0.02')
+    result = benchmark_stream(dataset.train_stream, warmup=2)
+    assert result['batches'] == 8
+    assert result['batches_per_second'] < 50
+    assert result['examples_per_second'] == pytest.approx(2 * result['batches_per_second'])
+    batch_bytes = 2 * 4 * 4 + 2 * np.array([0]).itemsize
+    assert result['megabytes_per_second'] == pytest.approx(batch_bytes * result['batches_per_second'] / 2**20)
+    assert result['keeps_up'] is None
+
+    assert benchmark_stream(dataset.train_stream, warmup=2, max_batches=3)['batches'] == 3
+    assert benchmark_stream(dataset.train_stream, warmup=20)['batches'] == 0
+    assert not benchmark_stream(dataset.train_stream, step_time=0.01)['keeps_up']
+    assert benchmark_stream(dataset.train_stream, buffer_size=4, step_time=0.1, max_batches=4)['keeps_up']
+
+
+def test_benchmark_command(tmpdir, caplog):
+    """Test the benchmark command sweeps the streams, buffers, workers and batch sizes."""
+    caplog.set_level(logging.INFO)
+    config_path = path.join(tmpdir, 'config.yaml')
+    with open(config_path, 'w') as config_file:
+        config_file.write('dataset:\n  class: emloop.tests.cli.benchmark_test.BenchmarkDataset\n'
+                          'main_loop:\n  extra_streams: [valid]\n')
+    report_path = path.join(tmpdir, 'report.json')
+    invoke_dataset_method(config_path, 'benchmark', '', [], ['buffers=[0, 2]', 'workers=[0, 1]',
+                                                             'batch_sizes=[1, 3]', 'warmup=1', 'step_time=0.2',
+                                                             'max_batches=1', 'report_path={}'.format(report_path)])
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+
+    assert len(report) == 2 * 2 * 2 * 2
+    assert {(result['stream'], result['batch_size'], result['buffer'], result['workers']) for result in report} == \
+        {(stream, batch_size, buffer, workers) for stream in ['train', 'valid'] for batch_size in [1, 3]
+         for buffer in [0, 2] for workers in [0, 1]}
+    assert all(result['batches'] == 1 for result in report)
+    assert all(result['keeps_up'] for result in report if result['buffer'] == result['workers'] == 0)
+    assert 'Stream `valid` keeps up with the step time of 0.200s, e.g. with buffer 0 and workers 0' in caplog.text
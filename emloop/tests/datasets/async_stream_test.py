@@ -0,0 +1,109 @@
+"""
+Test module for asynchronous streams (:py:mod:`emloop.datasets.async_stream`).
+"""
+import time
+import asyncio
+import threading
+
+import pytest
+
+from emloop.datasets import AsyncStream, StreamWrapper
+from emloop.datasets.async_stream import iterate_stream
+
+_ITERS = 8
+_FETCH_SLEEP_S = 0.1
+
+
+class AsyncDataset:
+    """Dataset with an asynchronous stream of the delayed batches."""
+
+    def __init__(self, in_order: bool=True):
+        self.running = 0
+        self.max_running = 0
+        self.in_order = in_order
+
+    async def fetch(self, i: int):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        # later batches finish sooner if not in_order
+        await asyncio.sleep(_FETCH_SLEEP_S * (1 if self.in_order else (_ITERS - i) / _ITERS))
+        self.running -= 1
+        return {'x': [i]}
+
+    async def train_stream(self):
+        for i in range(_ITERS):
+            yield self.fetch(i)
+
+    async def valid_stream(self):
+        for i in range(_ITERS):
+            await asyncio.sleep(0)
+            yield {'x': [i]}
+
+    async def failing_stream(self):
+        yield {'x': [0]}
+        raise RuntimeError('This exception is thrown on purpose.')
+
+
+def test_async_stream():
+    """Test the batches are returned in the stream order and the stream ends properly."""
+    dataset = AsyncDataset(in_order=False)
+    stream = AsyncStream(dataset.train_stream(), in_flight=_ITERS)
+    assert list(stream) == [{'x': [i]} for i in range(_ITERS)]
+    with pytest.raises(StopIteration):
+        next(stream)
+
+    assert list(AsyncStream(dataset.valid_stream())) == [{'x': [i]} for i in range(_ITERS)]
+
+
+@pytest.mark.parametrize('in_flight', [1, 3])
+def test_in_flight(in_flight):
+    """Test the number of the concurrently awaited fetches is limited."""
+    dataset = AsyncDataset()
+    start = time.time()
+    assert len(list(AsyncStream(dataset.train_stream(), in_flight=in_flight))) == _ITERS
+    assert dataset.max_running == in_flight
+    if in_flight > 1:
+        assert time.time() - start < _ITERS * _FETCH_SLEEP_S
+
+
+def test_async_exception():
+    """Test the stream exceptions are propagated and the event loop thread is stopped."""
+    threads = threading.active_count()
+    stream = AsyncStream(AsyncDataset().failing_stream())
+    assert next(stream) == {'x': [0]}
+    with pytest.raises(RuntimeError):
+        next(stream)
+    assert threading.active_count() == threads
+
+
+def test_close():
+    """Test the pending fetches are cancelled on close."""
+    threads = threading.active_count()
+    dataset = AsyncDataset()
+    stream = AsyncStream(dataset.train_stream(), in_flight=4)
+    next(stream)
+    stream.close()
+    stream.close()
+    assert threading.active_count() == threads
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+def test_iterate_stream():
+    """Test only the asynchronous streams are wrapped."""
+    stream = iterate_stream(AsyncDataset().valid_stream())
+    assert isinstance(stream, AsyncStream)
+    stream.close()
+    assert list(iterate_stream([1, 2])) == [1, 2]
+
+
+@pytest.mark.parametrize('buffer_size, workers', [(0, 0), (4, 0), (0, 2)])
+def test_stream_wrapper(buffer_size, workers):
+    """Test the asynchronous streams are iterated by the StreamWrapper."""
+    dataset = AsyncDataset()
+    stream = StreamWrapper(dataset.train_stream, buffer_size=buffer_size, workers=workers, async_in_flight=4)
+    for _ in range(2):
+        with stream:
+            batches = list(stream)
+        assert sorted(batch['x'][0] for batch in batches) == list(range(_ITERS))
+    stream.close()
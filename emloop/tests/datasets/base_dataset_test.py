@@ -1,8 +1,11 @@
 from typing import Optional, Tuple
 from collections import OrderedDict
+import json
 import logging
+import os.path as path
 
 import numpy as np
+import pytest
 import tabulate
 
 import emloop.datasets.base_dataset
@@ -97,3 +100,39 @@ def test_check_dataset(caplog):
     caplog.set_level(logging.DEBUG)
     MockDataset(None).stream_info()
     assert caplog.record_tuples == list(complete_logging)
+
+
+class ProfiledDataset(MockDataset):
+    """Dataset with multiple batches in its streams."""
+
+    def ragged_stream(self) -> Stream:
+        yield {'ragged': [[1, 2], [3, 4]]}
+        yield self.ragged
+
+    def regular_stream(self) -> Stream:
+        for i in range(4):
+            yield {'images': np.full((2, 3), i, dtype=np.float32), 'labels': [i, i + 1]}
+        yield {'images': np.zeros((1, 3), dtype=np.float32), 'labels': [-1]}
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_stream_info_full_pass(workers, tmpdir, caplog):
+    """Test the full pass of stream_info reports the sources and the throughput of the streams."""
+    report_path = path.join(tmpdir, 'report.json')
+    caplog.set_level(logging.INFO)
+    ProfiledDataset(None).stream_info(full_pass=True, workers=workers, report_path=report_path)
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+
+    assert set(report.keys()) == {'empty_stream', 'ragged_stream', 'regular_stream'}
+    regular = report['regular_stream']
+    assert regular['batches'] == 5 and regular['examples'] == 9
+    assert regular['time_to_first_batch'] <= regular['seconds']
+    assert regular['bytes_per_batch']['max'] == 2 * 3 * 4 + 2 * np.array([0]).itemsize
+    assert regular['sources']['images'] == {'dtypes': {'float32': 5}, 'shapes': {'(2, 3)': 4, '(1, 3)': 1},
+                                            'ragged_batches': 0, 'min': 0, 'max': 3}
+    assert regular['sources']['labels']['min'] == -1 and regular['sources']['labels']['max'] == 4
+    assert report['ragged_stream']['sources']['ragged']['ragged_batches'] == 1
+    assert report['empty_stream'] == {**report['empty_stream'], 'batches': 1, 'examples': 0, 'sources': {}}
+    assert 'stream source `ragged` appears to be ragged (non-rectangular) in 1 batches' in caplog.text
+    assert 'Exception was raised during profiling stream `undefined_stream`' in caplog.text
@@ -0,0 +1,64 @@
+"""
+Test module for length-bucketed batching (:py:mod:`emloop.datasets.bucketing`).
+"""
+import numpy as np
+import pytest
+
+from emloop.datasets import BucketByLength, StreamWrapper
+
+
+def get_examples(lengths):
+    """Return examples with token sequences of the given lengths."""
+    return [{'tokens': list(range(1, length + 1)), 'labels': i} for i, length in enumerate(lengths)]
+
+
+def test_bucketing():
+    """Test the examples are grouped by their length within the token budget and padded."""
+    lengths = [2, 9, 3, 10, 1, 12, 4, 2]
+    batches = list(BucketByLength(get_examples(lengths), length='tokens', max_tokens=24, bucket_boundaries=[5]))
+
+    for batch in batches:
+        tokens, mask = batch['tokens'], batch['mask']
+        assert tokens.shape == mask.shape
+        assert tokens.size <= 24
+        batch_lengths = mask.sum(axis=1)
+        assert all(length < 5 for length in batch_lengths) or all(length >= 5 for length in batch_lengths)
+        for row, row_mask, length in zip(tokens, mask, batch_lengths):
+            assert list(row[row_mask]) == list(range(1, length + 1))
+            assert np.all(row[~row_mask] == 0)
+
+    labels = sorted(label for batch in batches for label in batch['labels'])
+    assert labels == list(range(len(lengths)))
+    assert [batch['labels'] for batch in batches] == [[1, 3], [0, 2, 4, 6, 7], [5]]
+
+
+def test_bucketing_options():
+    """Test the maximum batch size, the length function, the dropped remainder and no mask."""
+    examples = get_examples([3] * 7)
+    batches = list(BucketByLength(examples, length=lambda example: len(example['tokens']), max_tokens=100,
+                                  max_batch_size=3, pad_sources=[], mask_source=None, drop_remainder=True))
+    assert [batch['labels'] for batch in batches] == [[0, 1, 2], [3, 4, 5]]
+    assert set(batches[0].keys()) == {'tokens', 'labels'}
+
+    long_batches = list(BucketByLength(get_examples([5, 20, 5]), length='tokens', max_tokens=10))
+    assert [batch['labels'] for batch in long_batches] == [[0], [1], [2]]
+
+    with pytest.raises(ValueError):
+        BucketByLength(examples, length='tokens', max_tokens=0)
+    with pytest.raises(ValueError):
+        BucketByLength(examples, length='tokens', max_tokens=10, bucket_boundaries=[10, 5])
+
+
+def test_bucketing_stream_wrapper():
+    """Test the stage works with the buffered and the fixed-size epochs of the StreamWrapper."""
+    examples = get_examples([2, 3] * 10)
+
+    def stream():
+        return BucketByLength(examples, length='tokens', max_tokens=12)
+
+    with StreamWrapper(stream, buffer_size=2) as buffered:
+        assert sum(len(batch['labels']) for batch in buffered) == 20
+
+    fixed = StreamWrapper(stream, epoch_size=3)
+    for _ in range(2):
+        assert len(list(fixed)) == 3
@@ -0,0 +1,67 @@
+"""
+Test module for interleaved streams (:py:mod:`emloop.datasets.interleaved_stream`).
+"""
+import numpy as np
+import pytest
+
+from emloop.datasets import InterleavedStream, StreamWrapper
+
+
+def constant_stream(value: int, count: int):
+    """Return a stream function of the given number of batches with the given value."""
+    def stream():
+        for _ in range(count):
+            yield {'x': [value]}
+    return stream
+
+
+def get_sources(counts, **kwargs):
+    """Return the source streams with the given numbers of batches."""
+    return {str(i): StreamWrapper(constant_stream(i, count), name=str(i), **kwargs) for i, count in enumerate(counts)}
+
+
+def test_interleaving():
+    """Test all the source batches are interleaved within a single epoch."""
+    profile = {}
+    stream = InterleavedStream(get_sources([10, 20], buffer_size=4, profile=profile), name='train', seed=42,
+                               profile=profile)
+    for _ in range(2):
+        with stream:
+            values = [batch['x'][0] for batch in stream]
+            with stream.allow_buffering:
+                pass
+        assert sorted(values) == [0] * 10 + [1] * 20
+        assert values != sorted(values)
+    stream.close()
+
+    assert len(profile['read_batch_0']) == 2 * 10
+    assert len(profile['read_batch_1']) == 2 * 20
+    assert len(profile['read_batch_train']) == 2 * 30
+
+
+def test_weights_and_temperature():
+    """Test the sources are sampled according to the weights and the temperature."""
+    stream = InterleavedStream(get_sources([1000, 1000]), weights={'0': 3, '1': 1}, epoch_size=400, seed=0)
+    values = [batch['x'][0] for batch in stream]
+    assert len(values) == 400
+    assert 0.65 < values.count(0) / len(values) < 0.85
+
+    hot = InterleavedStream(get_sources([10, 10]), weights={'0': 9, '1': 1}, temperature=2)
+    assert np.isclose(hot.probabilities['0'], 0.75)
+
+    with pytest.raises(ValueError):
+        InterleavedStream(get_sources([10, 10]), weights={'0': 1})
+    with pytest.raises(ValueError):
+        InterleavedStream(get_sources([10, 10]), temperature=0)
+    with pytest.raises(ValueError):
+        InterleavedStream({})
+
+
+def test_epoch_end():
+    """Test the epoch ends at the first exhausted source or after the epoch size with restarted sources."""
+    stream = InterleavedStream(get_sources([2, 100]), weights={'0': 100, '1': 1}, stop_on_first=True, seed=0)
+    values = list(batch['x'][0] for batch in stream)
+    assert values.count(0) == 2 and len(values) < 102
+
+    restarted = InterleavedStream(get_sources([2, 0]), weights={'0': 1, '1': 1}, epoch_size=7, seed=0)
+    assert [batch['x'][0] for batch in restarted] == [0] * 7
@@ -0,0 +1,59 @@
+"""
+Test module for the shuffle buffer stage (:py:mod:`emloop.datasets.shuffle_buffer`).
+"""
+import json
+import itertools
+
+import numpy as np
+import pytest
+
+from emloop.datasets import ShuffleBuffer, BucketByLength
+
+
+def get_examples(count=100):
+    """Return examples with the numbers of the given count."""
+    return [{'x': i, 'data': np.zeros(10)} for i in range(count)]
+
+
+def test_shuffling():
+    """Test the examples are shuffled within the buffer window and the shuffling is seeded."""
+    values = [example['x'] for example in ShuffleBuffer(get_examples(), buffer_size=10, seed=1)]
+    assert sorted(values) == list(range(100))
+    assert values != list(range(100))
+    assert all(value < i + 10 for i, value in enumerate(values))  # never ahead of the buffer window
+
+    assert values == [example['x'] for example in ShuffleBuffer(get_examples(), buffer_size=10, seed=1)]
+    assert values != [example['x'] for example in ShuffleBuffer(get_examples(), buffer_size=10, seed=2)]
+
+
+def test_batches_and_bytes():
+    """Test the batching and the limit of the buffered bytes."""
+    batches = list(ShuffleBuffer(get_examples(), buffer_size=1000, buffer_bytes=5 * 80, batch_size=8, seed=0))
+    assert [len(batch['x']) for batch in batches] == [8] * 12 + [4]
+    values = [value for batch in batches for value in batch['x']]
+    assert all(value < i + 5 for i, value in enumerate(values))
+
+    dropped = list(ShuffleBuffer(get_examples(), buffer_size=10, batch_size=8, drop_remainder=True))
+    assert len(dropped) == 12
+
+    bucketed = BucketByLength(ShuffleBuffer([{'x': [1] * (i % 5 + 1)} for i in range(20)], buffer_size=5),
+                              length='x', max_tokens=10)
+    assert sum(len(batch['x']) for batch in bucketed) == 20
+
+    with pytest.raises(ValueError):
+        ShuffleBuffer(get_examples(), buffer_size=0)
+    with pytest.raises(ValueError):
+        ShuffleBuffer(get_examples(), buffer_size=10, batch_size=0)
+
+
+@pytest.mark.parametrize('stop', [0, 1, 17, 95])
+def test_restore(stop):
+    """Test the restored stage continues with the very same items."""
+    expected = [batch['x'] for batch in ShuffleBuffer(get_examples(), buffer_size=10, batch_size=3, seed=7)]
+
+    stage = ShuffleBuffer(get_examples(), buffer_size=10, batch_size=3, seed=7)
+    head = [batch['x'] for batch in itertools.islice(stage, stop)]
+    state = json.loads(json.dumps(stage.state()))
+
+    restored = ShuffleBuffer(get_examples(), buffer_size=10, batch_size=3, seed=0).restore(state)
+    assert head + [batch['x'] for batch in restored] == expected
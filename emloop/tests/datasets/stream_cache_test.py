@@ -0,0 +1,221 @@
+"""
+Test module for stream caches (:py:mod:`emloop.datasets.stream_cache`).
+"""
+import os
+import os.path as path
+
+import numpy as np
+import pytest
+
+from emloop.datasets import DiskCache, MemoryCache, MemoryCachePool, StreamWrapper
+from emloop.types import ColumnarBatch
+
+from .stream_wrapper_test import assert_batches_equal
+from ..main_loop_test import SimpleDataset, _DATASET_ITERS
+
+
+def get_batches():
+    """Return a list of batches with numpy and other sources."""
+    return [{'images': np.full((2, 3, 4), i, dtype=np.uint8), 'labels': np.arange(2) + i,
+             'names': ['a', 'b'], 'empty': np.zeros((0, 3)), 'objects': np.array([None, i], dtype=object)}
+            for i in range(5)]
+
+
+def test_disk_cache(tmpdir):
+    """Test the recorded batches are replayed as memory-mapped views and the cache is reusable."""
+    cache_dir = path.join(tmpdir, 'cache', 'valid')
+    cache = DiskCache(cache_dir, chunk_size=100)
+    assert not cache.complete
+
+    batches = get_batches()
+    for batch in batches:
+        cache.record(batch)
+    assert not cache.complete
+    cache.finish()
+    assert cache.complete
+    assert len([file for file in os.listdir(cache_dir) if file.startswith('chunk_')]) > 1
+
+    for _ in range(2):
+        replayed = list(DiskCache(cache_dir).replay())
+        assert_batches_equal(replayed, batches)
+        assert isinstance(replayed[0]['images'].base, np.memmap)
+        assert replayed[0]['names'] == ['a', 'b']
+
+    replayed[0]['images'][...] = 42  # copy-on-write
+    assert_batches_equal(list(DiskCache(cache_dir).replay()), batches)
+
+
+def test_disk_cache_abort(tmpdir):
+    """Test the aborted recording leaves no cache behind."""
+    cache_dir = path.join(tmpdir, 'valid')
+    cache = DiskCache(cache_dir)
+    cache.record(get_batches()[0])
+    cache.abort()
+
+    assert not cache.complete
+    assert os.listdir(tmpdir) == []
+
+
+def test_disk_cache_empty(tmpdir):
+    """Test recording of an empty epoch."""
+    cache = DiskCache(path.join(tmpdir, 'valid'))
+    cache.finish()
+    assert cache.complete
+    assert list(cache.replay()) == []
+
+
+def test_cached_stream(tmpdir):
+    """Test the cached stream is iterated only in the first epoch."""
+    dataset = SimpleDataset()
+    stream = StreamWrapper(dataset.valid_stream, buffer_size=4, cache=DiskCache(path.join(tmpdir, 'valid')))
+    epochs = []
+    for _ in range(3):
+        with stream:
+            epochs.append(list(stream))
+    stream.close()
+
+    assert len(dataset.batches['valid']) == _DATASET_ITERS
+    for epoch in epochs:
+        assert_batches_equal(epoch, dataset.batches['valid'])
+
+    # the cache is reused by another stream (e.g. in a later run)
+    dataset2 = SimpleDataset()
+    stream2 = StreamWrapper(dataset2.valid_stream, cache=DiskCache(path.join(tmpdir, 'valid')))
+    assert_batches_equal(list(stream2), dataset.batches['valid'])
+    assert dataset2.batches['valid'] == []
+
+
+@pytest.mark.parametrize('kwargs', [{'buffer_size': 2}, {'buffer_size': 2, 'persistent': True}, {'workers': 1}])
+def test_cached_stream_producers(kwargs, tmpdir):
+    """Test the buffered or worker stream replays a complete cache and stops its producers."""
+    cache_dir = path.join(tmpdir, 'valid')
+    recording = StreamWrapper(SimpleDataset().valid_stream, cache=DiskCache(cache_dir), **kwargs)
+    with recording:
+        batches = list(recording)
+    assert len(batches) == _DATASET_ITERS
+    with recording:  # the cache is complete now
+        assert not recording._producing and not recording._worker_processes
+        assert_batches_equal(list(recording), batches)
+    recording.close()
+
+    # the cache is complete from the beginning
+    stream = StreamWrapper(SimpleDataset().valid_stream, cache=DiskCache(cache_dir), **kwargs)
+    for _ in range(2):
+        with stream:
+            assert_batches_equal(list(stream), batches)
+    assert stream._semaphore._value == 0
+    stream.close()
+
+
+def test_cached_stream_close(tmpdir):
+    """Test the incomplete recording is discarded when the stream is closed."""
+    cache = DiskCache(path.join(tmpdir, 'valid'))
+    stream = StreamWrapper(SimpleDataset().valid_stream, cache=cache)
+    next(stream)
+    stream.close()
+    assert not cache.complete
+    assert list(stream)
+    assert cache.complete
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib'])
+def test_memory_cache(compression):
+    """Test the recorded batches are replayed from the memory pool."""
+    cache = MemoryCache(MemoryCachePool(2**20, compression), 'valid')
+    batches = get_batches()
+    for batch in batches:
+        cache.record(batch)
+    assert not cache.complete
+    cache.finish()
+    assert cache.complete
+
+    batches[0]['images'][...] = 42  # the cache keeps its own copy
+    replayed = list(cache.replay())
+    assert_batches_equal(replayed, get_batches())
+    assert replayed[0]['images'].flags['WRITEABLE'] == (compression is not None)
+
+
+def test_memory_cache_compression():
+    """Test the compression reduces the size of the pool and the unsupported compressions are refused."""
+    pools = {compression: MemoryCachePool(2**20, compression) for compression in [None, 'zlib']}
+    for pool in pools.values():
+        cache = MemoryCache(pool, 'valid')
+        for batch in get_batches():
+            cache.record(batch)
+        cache.finish()
+    assert pools['zlib'].nbytes < pools[None].nbytes
+
+    with pytest.raises(ValueError):
+        MemoryCachePool(2**20, 'gzip')
+
+
+def test_memory_cache_eviction():
+    """Test the least recently used streams are evicted from the pool."""
+    epoch_nbytes = sum(value.nbytes for batch in get_batches() for value in batch.values()
+                       if isinstance(value, np.ndarray) and not value.dtype.hasobject)
+    pool = MemoryCachePool(2 * epoch_nbytes)
+    caches = {name: MemoryCache(pool, name) for name in ['valid', 'test', 'predict']}
+
+    def fill(cache):
+        for batch in get_batches():
+            cache.record(batch)
+        cache.finish()
+
+    fill(caches['valid'])
+    fill(caches['test'])
+    list(caches['valid'].replay())  # valid is used more recently than test
+    fill(caches['predict'])
+    assert caches['valid'].complete and caches['predict'].complete
+    assert not caches['test'].complete
+
+    small_pool = MemoryCachePool(epoch_nbytes // 2)  # the epoch does not fit at all
+    fill(MemoryCache(small_pool, 'valid'))
+    assert 'valid' not in small_pool
+
+
+def test_memory_cache_overflow(mocker):
+    """Test the stream overflowing the pool is recorded only until the first overflow."""
+    batches = get_batches()
+    pool = MemoryCachePool(batches[0]['images'].nbytes)
+    cache = MemoryCache(pool, 'valid')
+    compress = mocker.spy(pool, 'compress')
+    for _ in range(2):
+        for batch in batches:
+            cache.record(batch)
+        cache.finish()
+        assert not cache.complete
+    assert compress.call_count == 3  # the numpy sources of the first batch only
+
+
+@pytest.mark.parametrize('cache_type', ['disk', 'memory'])
+def test_cached_columnar_batches(cache_type, tmpdir):
+    """Test the replayed columnar batches are columnar with the recorded schema."""
+    batches = [ColumnarBatch({'images': np.full((2, 3), i, dtype=np.uint8), 'labels': np.arange(2) + i})
+               for i in range(3)]
+    cache = DiskCache(path.join(tmpdir, 'valid')) if cache_type == 'disk' else \
+        MemoryCache(MemoryCachePool(2**20, 'zlib'), 'valid')
+    for batch in batches + [{'images': np.zeros((1, 3), dtype=np.uint8)}]:
+        cache.record(batch)
+    cache.finish()
+
+    replayed = list(cache.replay())
+    assert all(isinstance(batch, ColumnarBatch) for batch in replayed[:-1])
+    assert not isinstance(replayed[-1], ColumnarBatch)
+    assert [(batch.schema, batch.batch_size) for batch in replayed[:-1]] == \
+        [(batch.schema, batch.batch_size) for batch in batches]
+    assert_batches_equal(replayed[:-1], batches)
+
+
+def test_cache_profile():
+    """Test the cache hits, misses and bytes saved are recorded to the profile."""
+    dataset = SimpleDataset()
+    profile = {}
+    stream = StreamWrapper(dataset.valid_stream, name='valid', profile=profile,
+                           cache=MemoryCache(MemoryCachePool(2**20), 'valid'))
+    for _ in range(2):
+        list(stream)
+
+    batch_nbytes = sum(value.nbytes for value in dataset.batches['valid'][0].values())
+    assert profile['cache_hits_valid'] == [0, _DATASET_ITERS]
+    assert profile['cache_misses_valid'] == [_DATASET_ITERS, 0]
+    assert profile['cache_bytes_saved_valid'] == [0, _DATASET_ITERS * batch_nbytes]
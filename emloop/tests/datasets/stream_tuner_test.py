@@ -0,0 +1,73 @@
+"""
+Test module for automatic tuning of the streams (:py:mod:`emloop.datasets.stream_tuner`).
+"""
+import logging
+
+import numpy as np
+
+from emloop.datasets import StreamTuner, StreamWrapper, InterleavedStream
+
+from ..main_loop_test import SimpleDataset
+
+
+def get_profile(read_time, eval_time=1.):
+    """Return an epoch profile of the train stream with the given total read and eval times."""
+    return {'read_batch_train': [read_time / 2] * 2, 'eval_batch_train': [eval_time / 2] * 2}
+
+
+def test_tune_buffer(caplog):
+    """Test the buffer grows while the reading stalls and shrinks back when it is negligible."""
+    caplog.set_level(logging.INFO)
+    stream = StreamWrapper(SimpleDataset().train_stream, name='train')
+    tuner = StreamTuner(tune_buffer=True, tune_workers=False, max_buffer=4, max_workers=0, epochs=7)
+
+    sizes = []
+    for read_time in [0.5, 0.5, 0.5, 0.001, 0.001, 0.5, 0.5, 0.5]:
+        tuner.tune(stream, get_profile(read_time))
+        sizes.append(stream.buffer_size)
+    assert sizes == [1, 2, 4, 3, 3, 4, 4, 4]  # never shrinks to a stalled size, stops tuning after 7 epochs
+    assert 'auto-tuning buffer 0 -> 1' in caplog.text
+    assert 'tuning caps' in caplog.text
+    assert 'finished with buffer 4 and workers 0' in caplog.text
+
+
+def test_tune_workers():
+    """Test the workers are added once the buffer is in place and the CPU cap is respected."""
+    stream = StreamWrapper(SimpleDataset().train_stream, name='train')
+    tuner = StreamTuner(tune_buffer=True, tune_workers=True, max_buffer=8, max_workers=2)
+    for _ in range(3):
+        tuner.tune(stream, get_profile(1.))
+    assert (stream.buffer_size, stream.workers) == (1, 2)
+
+    workers_only = StreamTuner(tune_buffer=False, tune_workers=True, max_buffer=8, max_workers=2)
+    stream = StreamWrapper(SimpleDataset().train_stream, name='train')
+    workers_only.tune(stream, get_profile(1.))
+    assert (stream.buffer_size, stream.workers) == (0, 1)
+    workers_only.tune(stream, {})  # no eval time, no decision
+    assert (stream.buffer_size, stream.workers) == (0, 1)
+
+
+def test_tune_fixed_epoch_size(caplog):
+    """Test the streams with a fixed epoch size are not restarted; only their buffer is tuned."""
+    caplog.set_level(logging.INFO)
+    stream = StreamWrapper(SimpleDataset().train_stream, name='train', epoch_size=5)
+    tuner = StreamTuner(tune_buffer=True, tune_workers=True, max_buffer=2, max_workers=2, epochs=4)
+    with stream:
+        first_batches = [next(stream) for _ in range(2)]
+    for _ in range(4):
+        tuner.tune(stream, get_profile(1.))
+    assert (stream.buffer_size, stream.workers) == (2, 0)
+    assert 'fixed epoch size' in caplog.text
+
+    with stream:  # the stream continues where it stopped
+        assert not np.array_equal(next(stream)['input'], first_batches[0]['input'])
+    stream.close()
+
+
+def test_tune_interleaved():
+    """Test the sources of an interleaved stream are tuned according to their share of the eval time."""
+    sources = {name: StreamWrapper(SimpleDataset().train_stream, name=name) for name in ['slow', 'fast']}
+    stream = InterleavedStream(sources, name='train')
+    tuner = StreamTuner(tune_buffer=True, tune_workers=False, max_buffer=4, max_workers=0)
+    tuner.tune(stream, {'read_batch_slow': [0.5] * 2, 'read_batch_fast': [0.0001] * 6, 'eval_batch_train': [1.] * 8})
+    assert (sources['slow'].buffer_size, sources['fast'].buffer_size) == (1, 0)
@@ -1,10 +1,14 @@
 import time
 import pytest
 
+import numpy as np
+
+from emloop.constants import EL_BUFFER_SLEEP, EL_BUFFER_MAX_BATCHES
+from emloop.datasets import ShuffleBuffer
 from emloop.datasets.stream_wrapper import StreamWrapper
-from emloop.types import Stream
+from emloop.types import Stream, ColumnarBatch
 
-from ..main_loop_test import SimpleDataset, _DATASET_ITERS
+from ..main_loop_test import SimpleDataset, DelayedDataset, _DATASET_ITERS, _READ_DATA_SLEEP_S
 
 
 class FailingDataset(SimpleDataset):
@@ -114,3 +118,347 @@ def test_allow_buffering():
             with buffered_stream.allow_buffering:
                 buffered_epochs += list(buffered_stream)
     assert buffered_epochs == dataset.batches['train']
+
+
+def test_buffer_rate():
+    """Test the rate of the buffered stream is not limited by the buffer sleep."""
+    batches_count = 500
+    stream = StreamWrapper(lambda: ({'input': [i]} for i in range(batches_count)), buffer_size=4)
+    start = time.time()
+    with stream:
+        for _ in range(3):
+            with stream.allow_buffering:
+                assert len(list(stream)) == batches_count
+    assert time.time() - start < 3 * batches_count * EL_BUFFER_SLEEP / 10
+
+
+def test_persistent():
+    """Test persistent buffered stream preserves the stream content and epochs."""
+    dataset = SimpleDataset()
+    stream = StreamWrapper(dataset.train_stream, buffer_size=4, epoch_size=10, persistent=True)
+    epochs = []
+    for _ in range(3):
+        with stream:
+            epochs.append(list(stream))
+    stream.close()
+
+    assert [len(epoch) for epoch in epochs] == [10, 10, 10]
+    assert sum(epochs, []) == dataset.batches['train'][:30]
+    assert not stream._producing
+
+
+def test_persistent_prefetch():
+    """Test persistent buffered stream prepares the next epoch in between the epochs."""
+    buffer_size = 4
+    stream = StreamWrapper(DelayedDataset().train_stream, buffer_size=buffer_size, persistent=True)
+    with stream:
+        list(stream)
+    time.sleep((buffer_size + 1) * _READ_DATA_SLEEP_S)  # e.g. after_epoch hooks
+    with stream:
+        start = time.time()
+        for _ in range(buffer_size):
+            next(stream)
+        assert time.time() - start < _READ_DATA_SLEEP_S
+    stream.close()
+
+class ShardedDataset(SimpleDataset):
+    """SimpleDataset extension with train stream aware of the worker processes."""
+
+    def train_stream(self, worker_index: int=0, num_workers: int=1) -> Stream:
+        for i, batch in enumerate(super().train_stream()):
+            if i % num_workers == worker_index:
+                yield batch
+
+
+def assert_batches_equal(batches, expected_batches):
+    """Assert the given lists of batches are equal."""
+    assert len(batches) == len(expected_batches)
+    for batch, expected_batch in zip(batches, expected_batches):
+        assert batch.keys() == expected_batch.keys()
+        for source in batch:
+            np.testing.assert_array_equal(batch[source], expected_batch[source])
+
+
+@pytest.mark.parametrize('dataset_class', [SimpleDataset, ShardedDataset])
+@pytest.mark.parametrize('workers', [1, 3])
+def test_workers(dataset_class, workers):
+    """Test batches produced by the worker processes preserve the stream content."""
+    expected_dataset = dataset_class()
+    expected_batches = list(expected_dataset.train_stream()) + list(expected_dataset.train_stream())
+    stream = StreamWrapper(dataset_class().train_stream, buffer_size=4, workers=workers)
+    with pytest.raises(ValueError):
+        next(stream)  # used outside with-resource
+
+    with stream:
+        epoch = list(stream)
+    with stream:
+        epoch2 = list(stream)
+    stream.close()
+
+    assert_batches_equal(epoch + epoch2, expected_batches)
+
+
+def test_workers_epoch_size():
+    """Test worker processes with fixed epoch size."""
+    epoch_size = 10
+    expected_dataset = SimpleDataset()
+    expected_batches = list(expected_dataset.train_stream()) + list(expected_dataset.train_stream())
+    stream = StreamWrapper(SimpleDataset().train_stream, epoch_size=epoch_size, workers=2)
+    with stream:
+        epoch = list(stream)
+        epoch2 = list(stream)
+    stream.close()
+
+    assert len(epoch) == len(epoch2) == epoch_size
+    assert_batches_equal(epoch + epoch2, expected_batches[:2*epoch_size])
+
+
+def picklable_stream(worker_index: int=0, num_workers: int=1) -> Stream:
+    """Stream function which may be pickled (unlike the methods of :py:class:`SimpleDataset`)."""
+    for i in range(worker_index, _DATASET_ITERS, num_workers):
+        yield {'input': np.full(3, i)}
+
+
+def shard_aware_stream(shard_index: int=0, num_shards: int=1, worker_index: int=0, num_workers: int=1) -> Stream:
+    """Stream function yielding only the batches of the given shard and worker."""
+    for i in list(range(shard_index, _DATASET_ITERS, num_shards))[worker_index::num_workers]:
+        yield {'input': np.full(3, i)}
+
+
+@pytest.mark.parametrize('stream_fn', [lambda: picklable_stream(), shard_aware_stream])
+@pytest.mark.parametrize('workers', [0, 2])
+def test_shards(stream_fn, workers):
+    """Test the shards of the stream are disjoint and cover the whole stream."""
+    num_shards = 3
+    expected_batches = list(picklable_stream())
+    for shard_index in range(num_shards):
+        stream = StreamWrapper(stream_fn, workers=workers, shard_index=shard_index, num_shards=num_shards)
+        with stream:
+            batches = list(stream)
+        stream.close()
+        assert_batches_equal(batches, expected_batches[shard_index::num_shards])
+
+    with pytest.raises(ValueError):
+        StreamWrapper(stream_fn, shard_index=3, num_shards=3)
+
+
+@pytest.mark.parametrize('start_method', ['spawn', 'forkserver'])
+def test_workers_start_method(start_method):
+    """Test worker processes started with the given start method."""
+    expected_batches = list(picklable_stream())
+    stream = StreamWrapper(picklable_stream, buffer_size=4, workers=2, start_method=start_method)
+    with stream:
+        batches = list(stream)
+    stream.close()
+
+    assert_batches_equal(batches, expected_batches)
+
+
+def test_worker_exception():
+    """Test exception raised in a worker process is propagated."""
+    stream = StreamWrapper(FailingDataset().train_stream, buffer_size=4, workers=2)
+    with stream:
+        with pytest.raises(ChildProcessError):
+            list(stream)
+    stream.close()
+
+
+def test_workers_empty_stream():
+    """Test worker processes with empty stream."""
+    with StreamWrapper(list, workers=2) as stream:
+        assert list(stream) == []
+        assert list(stream) == []
+    stream.close()
+
+
+class MixedDataset(SimpleDataset):
+    """SimpleDataset extension with a non-numpy source."""
+
+    def train_stream(self) -> Stream:
+        for batch in super().train_stream():
+            yield {**batch, 'names': ['batch'] * len(batch['input'])}
+
+
+@pytest.mark.parametrize('dataset_class', [SimpleDataset, MixedDataset])
+@pytest.mark.parametrize('workers', [1, 3])
+def test_shared_memory(dataset_class, workers):
+    """Test batches transported through the shared memory preserve the stream content."""
+    expected_dataset = dataset_class()
+    expected_batches = list(expected_dataset.train_stream()) + list(expected_dataset.train_stream())
+    stream = StreamWrapper(dataset_class().train_stream, buffer_size=2, workers=workers, shared_memory=2**16)
+
+    batches = []
+    with stream:
+        for _ in range(2):
+            for batch in stream:
+                assert isinstance(batch['input'], np.ndarray)
+                assert not batch['input'].flags['OWNDATA']  # a view of the shared memory
+                batches.append({source: np.copy(value) for source, value in batch.items()})
+    stream.close()
+
+    assert_batches_equal(batches, expected_batches)
+
+
+def columnar_stream(worker_index: int=0, num_workers: int=1) -> Stream:
+    """Picklable stream of columnar batches."""
+    for i in range(worker_index, _DATASET_ITERS, num_workers):
+        yield ColumnarBatch({'images': np.full((4, 3), i, dtype=np.float32), 'labels': np.arange(4) + i})
+
+
+def test_shared_memory_columnar():
+    """Test the columnar batches transported through the shared memory stay columnar."""
+    expected_batches = list(columnar_stream())
+    stream = StreamWrapper(columnar_stream, buffer_size=2, workers=2, shared_memory=2**16)
+    with stream:
+        batches = []
+        for batch in stream:
+            assert isinstance(batch, ColumnarBatch)
+            assert not batch['images'].flags['OWNDATA']  # a view of the shared memory
+            assert batch.schema == expected_batches[0].schema and batch.batch_size == 4
+            batches.append({source: np.copy(value) for source, value in batch.items()})
+    stream.close()
+
+    assert_batches_equal(sorted(batches, key=lambda batch: batch['labels'][0]), expected_batches)
+
+
+def test_shared_memory_fallback():
+    """Test batches not fitting in the shared memory slot are transported through the queues."""
+    expected_batches = list(SimpleDataset().train_stream())
+    stream = StreamWrapper(SimpleDataset().train_stream, buffer_size=2, workers=2, shared_memory=16)
+    with stream:
+        batches = list(stream)
+    stream.close()
+
+    assert batches[0]['input'].flags['OWNDATA']
+    assert_batches_equal(batches, expected_batches)
+
+
+def test_shared_memory_release():
+    """Test the shared memory slot is reused once the batch is released."""
+    stream = StreamWrapper(SimpleDataset().train_stream, workers=1, shared_memory=2**16)
+    with stream:
+        first_batch = next(stream)
+        first_input = np.copy(first_batch['input'])
+        stream.release_batch()
+        for _ in range(10):
+            next(stream)
+        assert not np.array_equal(first_batch['input'], first_input)
+    stream.close()
+
+
+def wait_for(condition, timeout=5):
+    """Wait until the given condition holds; return whether it does."""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_buffer_bytes(workers):
+    """Test the buffer is limited by the total size of the buffered batches."""
+    dataset = SimpleDataset()
+    batch_nbytes = 2 * np.zeros(dataset.shape).nbytes
+    expected_batches = list(SimpleDataset().train_stream())
+    profile = {}
+    stream = StreamWrapper(dataset.train_stream, buffer_bytes=int(2.5 * batch_nbytes), workers=workers,
+                           name='train', profile=profile)
+    with stream:
+        with stream.allow_buffering:
+            assert wait_for(lambda: stream.buffered_bytes == 2 * batch_nbytes)
+        batches = list(stream)
+    stream.close()
+
+    assert_batches_equal(batches, expected_batches)
+    assert len(stream.epoch_buffered_bytes) == len(expected_batches)
+    assert max(stream.epoch_buffered_bytes) <= 2 * batch_nbytes
+    assert not any(key.startswith('buffer_bytes') for key in profile)
+
+
+def test_buffer_bytes_workers_deadlock():
+    """Test a worker cannot exhaust the byte budget while the consumer waits for another worker."""
+    dataset = ShardedDataset()
+    batch_nbytes = 2 * np.zeros(dataset.shape).nbytes
+    stream = StreamWrapper(dataset.train_stream, buffer_bytes=3 * batch_nbytes, workers=2)
+    with stream:
+        assert len(list(stream)) == _DATASET_ITERS
+    stream.close()
+
+
+def test_buffer_bytes_count_cap():
+    """Test the buffer of batches without numpy sources is limited by the number of batches."""
+    stream = StreamWrapper(lambda: ({'input': [i]} for i in range(2 * EL_BUFFER_MAX_BATCHES)), buffer_bytes=10)
+    with stream:
+        with stream.allow_buffering:
+            assert wait_for(lambda: len(stream._buffer) == EL_BUFFER_MAX_BATCHES)
+            time.sleep(0.1)
+            assert len(stream._buffer) == EL_BUFFER_MAX_BATCHES
+        assert len(list(stream)) == 2 * EL_BUFFER_MAX_BATCHES
+
+
+def test_resize():
+    """Test the buffer size and the workers may be changed between the epochs."""
+    dataset = SimpleDataset()
+    stream = StreamWrapper(dataset.train_stream, buffer_size=2, persistent=True)
+    with stream:
+        assert len(list(stream)) == _DATASET_ITERS
+    stream.resize(buffer_size=4)
+    assert stream._producing
+    with stream:
+        assert len(list(stream)) == _DATASET_ITERS
+    stream.resize(workers=2)
+    assert not stream._producing
+    with stream:
+        assert len(list(stream)) == _DATASET_ITERS
+    stream.resize(buffer_size=0, workers=0)
+    assert not stream._worker_processes
+    assert len(list(stream)) == _DATASET_ITERS
+    assert (stream.buffer_size, stream.workers) == (0, 0)
+
+
+@pytest.mark.parametrize('buffer_size, workers', [(0, 0), (4, 0), (0, 2)])
+def test_seek(buffer_size, workers):
+    """Test the stream continues from the given position by skipping the consumed batches."""
+    expected_batches = list(picklable_stream())
+    stream = StreamWrapper(picklable_stream, buffer_size=buffer_size, workers=workers)
+    with stream:
+        for _ in range(3):
+            next(stream)
+        position = stream.position
+    stream.close()
+    assert position == {'batches': 3}
+
+    resumed = StreamWrapper(picklable_stream, buffer_size=buffer_size, workers=workers)
+    resumed.seek(position)
+    with resumed:
+        assert_batches_equal([next(resumed)], expected_batches[3:4])
+        assert resumed.position == {'batches': 4}
+        assert_batches_equal(list(resumed), expected_batches[4:])
+        assert resumed.position == {'batches': 0}
+        assert_batches_equal(list(resumed), expected_batches)  # the next epoch starts from the beginning
+    resumed.close()
+
+
+def test_seek_state():
+    """Test the stream providing its state is restored directly."""
+    def stream_fn():
+        return ShuffleBuffer(({'x': [i]} for i in range(_DATASET_ITERS)), buffer_size=5, seed=3)
+
+    expected_batches = list(stream_fn())
+    stream = StreamWrapper(stream_fn)
+    for _ in range(4):
+        next(stream)
+    position = stream.position
+    assert position['batches'] == 4 and 'state' in position
+
+    resumed = StreamWrapper(stream_fn)
+    resumed.seek(position)
+    assert list(resumed) == expected_batches[4:]
+
+    # the buffered stream is iterated by the enqueueing thread only; the consumed batches are skipped
+    buffered = StreamWrapper(stream_fn, buffer_size=4)
+    buffered.seek(position)
+    with buffered:
+        assert list(buffered) == expected_batches[4:]
+    assert buffered._restore_state is None
+    buffered.close()
@@ -1,11 +1,12 @@
 """
 Test module for accumulating hook (emloop.hooks.accumulate_variables_hook).
 """
+from collections import ChainMap
 
 import numpy as np
 import pytest
 
-from emloop.hooks.accumulate_variables import AccumulateVariables
+from emloop.hooks.accumulate_variables import AccumulateVariables, AccumulatorRegistry, VariableBuffer
 
 
 _ITERS = 9
@@ -54,6 +55,14 @@ def test_raise_exception(vars, error):
         accum_hook.after_batch(stream_name, batch)
 
 
+def test_missing_variable_message():
+    """Test the error message lists the names of the batch variables rather than their values."""
+    batch = ChainMap({}, {'cost': np.full(_EXAMPLES, 42.)})
+    with pytest.raises(KeyError) as error:
+        AccumulateVariables(variables=['accuracy']).after_batch('train', batch)
+    assert "['cost']" in str(error.value) and '42' not in str(error.value)
+
+
 def test_init_accumulator():
     """Test reseting accumulator after epoch."""
 
@@ -67,3 +76,139 @@ def test_init_accumulator():
 
     accum_hook.after_epoch()
     assert not accum_hook._accumulator
+
+
+def test_reused_buffer():
+    """Test the accumulated values are not affected by a reuse of the batch buffer."""
+    buffer = np.arange(12).reshape(2, 3, 2)
+    hook = AccumulateVariables(variables=['matrix', 'vector'])
+    hook.after_batch('train', {'matrix': buffer[0], 'vector': buffer[1, :, 0]})
+    buffer[...] = -1
+    hook.after_batch('train', {'matrix': buffer[0], 'vector': buffer[1, :, 0]})
+
+    assert np.array_equal(hook._accumulator['train']['matrix'][:3], [[0, 1], [2, 3], [4, 5]])
+    assert np.array_equal(hook._accumulator['train']['vector'][:3], [6, 8, 10])
+    assert np.array_equal(hook._accumulator['train']['matrix'][3:], -np.ones((3, 2)))
+
+
+def test_typed_buffer():
+    """Test the values are accumulated in a typed array which is grown and promoted when needed."""
+    buffer = VariableBuffer()
+    for _ in range(_ITERS):
+        buffer.extend(np.ones((_EXAMPLES, _FEATURES), dtype=np.int32))
+    assert len(buffer) == _EXAMPLES * _ITERS
+    assert np.asarray(buffer).dtype == np.int32
+    assert np.asarray(buffer).shape == (_EXAMPLES * _ITERS, _FEATURES)
+
+    buffer.extend([[0.5] * _FEATURES])
+    assert np.asarray(buffer).dtype == np.float64
+    assert np.mean(buffer) == pytest.approx((_EXAMPLES * _ITERS + 0.5) / (_EXAMPLES * _ITERS + 1))
+    assert np.array_equal(buffer[-1], [0.5] * _FEATURES)
+    assert len(list(buffer)) == _EXAMPLES * _ITERS + 1
+
+
+def test_ragged_buffer():
+    """Test the ragged values are kept as chunks and exposed as an object array."""
+    buffer = VariableBuffer()
+    buffer.extend(np.zeros((2, 3)))
+    buffer.extend(np.ones((1, 4)))
+    buffer.extend([[1, 2], [3]])
+    assert len(buffer) == 5
+    assert [len(example) for example in buffer] == [3, 3, 4, 2, 1]
+    assert np.asarray(buffer).dtype == object
+    assert buffer[3] == [1, 2]
+
+
+def test_ragged_buffer_values_cached():
+    """Test the object array of the ragged values is built once until the buffer is extended."""
+    buffer = VariableBuffer()
+    buffer.extend([[1, 2], [3]])
+    assert buffer.values is buffer.values
+    values = buffer.values
+    buffer.extend([[4]])
+    assert buffer.values is not values
+    assert [buffer[index] for index in range(len(buffer))] == [[1, 2], [3], [4]]
+
+
+def test_buffer_dtypes():
+    """Test the mixed types are kept as objects and the dtype is chosen by the first non-empty batch."""
+    buffer = VariableBuffer()
+    buffer.extend([1, 'a'])
+    assert np.asarray(buffer).dtype == object
+    assert list(buffer) == [1, 'a']
+
+    buffer = VariableBuffer()
+    buffer.extend(np.arange(2))
+    buffer.extend(['a', 'b'])
+    assert list(buffer) == [0, 1, 'a', 'b']
+
+    buffer = VariableBuffer()
+    buffer.extend(['a'])
+    buffer.extend(['bcd'])
+    assert np.asarray(buffer).dtype.kind == 'U'
+
+    for batch, dtype in [([1, 2], np.int64), (np.ones((2, 3), dtype=np.int8), np.int8), (['a', 'b'], np.dtype('<U1'))]:
+        buffer = VariableBuffer()
+        buffer.extend([])
+        buffer.extend(np.zeros((0, 4)))
+        buffer.extend(batch)
+        assert np.asarray(buffer).dtype == dtype
+        assert len(buffer) == 2
+    assert len(VariableBuffer().values) == 0
+
+
+class DummyMainLoop:
+    def __init__(self):
+        self.accumulators = AccumulatorRegistry()
+
+
+def test_shared_accumulator():
+    """Test the subscribed hooks accumulate each variable once and the accumulator is reset by the registry."""
+    main_loop = DummyMainLoop()
+    hooks = [AccumulateVariables(variables=['accuracy', 'cost']), AccumulateVariables(variables=['cost', 'target']),
+             AccumulateVariables(variables=['cost'], shared_accumulator=False)]
+    for hook in hooks:
+        hook.register_mainloop(main_loop)
+    assert main_loop.accumulators.variables == {'accuracy', 'cost', 'target'}
+
+    for batch_index in range(_ITERS):
+        main_loop.accumulators.begin_batch((1, 'train', batch_index))
+        for hook in hooks:
+            hook.after_batch('train', get_batch())
+    assert hooks[0]._accumulator is hooks[1]._accumulator is not hooks[2]._accumulator
+    for variable in ['accuracy', 'cost', 'target']:
+        assert len(hooks[0]._accumulator['train'][variable]) == _EXAMPLES * _ITERS
+    assert len(hooks[2]._accumulator['train']['cost']) == _EXAMPLES * _ITERS
+
+    with pytest.raises(KeyError):
+        main_loop.accumulators.begin_batch((1, 'train', _ITERS))
+        hooks[0].after_batch('train', {'accuracy': np.ones(2)})
+
+    for hook in hooks:
+        hook.after_epoch()
+    assert len(hooks[1]._accumulator['train']['cost']) == _EXAMPLES * _ITERS
+    main_loop.accumulators.reset()
+    assert not hooks[0]._accumulator and not hooks[1]._accumulator
+
+
+def test_shared_accumulator_subsets():
+    """Test each batch is accumulated once even if the subscribed hooks receive different subsets of the batches."""
+    main_loop = DummyMainLoop()
+    hooks = [AccumulateVariables(variables=['cost']), AccumulateVariables(variables=['cost', 'accuracy'])]
+    for hook in hooks:
+        hook.register_mainloop(main_loop)
+
+    for batch_index in range(_ITERS):
+        main_loop.accumulators.begin_batch((1, 'train', batch_index))
+        batch = get_batch()
+        if batch_index % 3 == 0:  # e.g. the batches with some of the declared variables only
+            hooks[1].after_batch('train', batch)
+        hooks[0].after_batch('train', batch)
+        if batch_index == _ITERS // 2:  # e.g. a hook subscribed later
+            hooks.append(AccumulateVariables(variables=['cost']))
+            hooks[-1].register_mainloop(main_loop)
+        if len(hooks) > 2:
+            hooks[2].after_batch('train', batch)
+
+    assert len(main_loop.accumulators._accumulator['train']['cost']) == _EXAMPLES * _ITERS
+    assert len(main_loop.accumulators._accumulator['train']['accuracy']) == _EXAMPLES * len(range(0, _ITERS, 3))
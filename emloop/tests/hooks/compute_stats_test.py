@@ -6,6 +6,7 @@ import numpy as np
 import pytest
 
 from emloop.hooks.compute_stats import ComputeStats
+from emloop.utils.running_stats import RunningStats
 
 
 def get_batch(batch_id):
@@ -65,3 +66,39 @@ def test_compute_save_stats():
                 # to compare NaN values, NumPy assert is required
                 np.testing.assert_equal(epoch_data[stream][variable][aggr],
                                         valid_aggrs[stream][variable][aggr])
+
+
+def test_streaming_stats():
+    """Tests the streaming aggregations match the exact ones."""
+    variables = [{'accuracy': ['mean', 'std', 'var', 'min', 'max', 'sum', 'nanfraction', 'nancount']},
+                 {'nan_accuracy': ['mean', 'nanmean', 'nanstd', 'nanmax', 'nanfraction', 'nancount',
+                                   'nanmedian', 'nanpercentile_90']},
+                 {'loss': ['median', 'percentile_25']}]
+    exact, streaming = ComputeStats(variables=variables), ComputeStats(variables=variables, mode='streaming')
+    for batch_id in range(1, 10):
+        for hook in (exact, streaming):
+            hook.after_batch('train', get_batch(batch_id))
+    assert isinstance(streaming._accumulator['train']['loss'], RunningStats)
+
+    exact_data, streaming_data = {'train': {}}, {'train': {}}
+    exact.after_epoch(exact_data)
+    streaming.after_epoch(streaming_data)
+    for variable, aggregations in exact_data['train'].items():
+        values = np.sort([value for batch_id in range(1, 10) for value in get_batch(batch_id)[variable]])
+        values = values[~np.isnan(values)]
+        for aggregation, value in aggregations.items():
+            if 'median' in aggregation or 'percentile' in aggregation:
+                # the sketch estimates the lower quantile within the relative accuracy
+                quantile = 0.5 if 'median' in aggregation else float(aggregation.split('_')[1]) / 100
+                value = values[int(quantile * (len(values) - 1))]
+                assert streaming_data['train'][variable][aggregation] == pytest.approx(value, rel=0.01)
+            else:
+                np.testing.assert_allclose(streaming_data['train'][variable][aggregation], value)
+
+
+def test_streaming_unsupported():
+    """Tests raising error if the aggregation is not supported in the streaming mode."""
+    with pytest.raises(ValueError):
+        ComputeStats(variables=[{'loss': ['argmax']}], mode='streaming')
+    with pytest.raises(ValueError):
+        ComputeStats(variables=['loss'], mode='approximate')
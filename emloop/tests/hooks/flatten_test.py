@@ -49,6 +49,7 @@ def test_flattening_variables_stream_not_in_specified():
 
     for var_flat in selected_vars.values():
         assert var_flat not in batch
+    assert flatten_vars.batch_streams == ['test']
 
 
 def test_flattening_variables_raises_key_error():
@@ -0,0 +1,134 @@
+"""
+Test module for the background and concurrent execution of the hook events (emloop.hooks.hook_runner).
+"""
+import threading
+import time
+
+import pytest
+
+from emloop.hooks import AbstractHook
+from emloop.hooks.hook_runner import AsyncHookRunner, EpochHookRunner
+from emloop.types import TrainingTerminated
+
+
+class SlowHook(AbstractHook):
+    """Hook recording the after_batch events slowly; raises on the ``fail`` batch."""
+
+    def __init__(self, delay: float=0., **kwargs):
+        super().__init__(async_after_batch=True, **kwargs)
+        self.delay = delay
+        self.batches = []
+        self.threads = set()
+
+    def after_batch(self, stream_name, batch_data):
+        time.sleep(self.delay)
+        self.threads.add(threading.get_ident())
+        if batch_data['index'] == 'fail':
+            raise ValueError('failure')
+        self.batches.append((stream_name, batch_data['index']))
+
+
+def test_order():
+    """Test the events of each hook are processed in order in a background thread."""
+    hooks = [SlowHook(delay=0.01), SlowHook()]
+    runner = AsyncHookRunner(hooks, queue_size=2)
+    for index in range(10):
+        for hook in hooks:
+            runner.after_batch(hook, 'train', {'index': index})
+    runner.wait()
+    for hook in hooks:
+        assert hook.batches == [('train', index) for index in range(10)]
+        assert hook.threads.isdisjoint({threading.get_ident()}) and len(hook.threads) == 1
+    assert hooks[0].threads != hooks[1].threads
+    runner.close()
+
+
+def test_exceptions():
+    """Test the first exception is re-raised at the next safe point and the following events are discarded."""
+    hook = SlowHook()
+    runner = AsyncHookRunner([hook])
+    runner.after_batch(hook, 'train', {'index': 'fail'})
+    with pytest.raises(ValueError):
+        runner.wait()
+    runner.after_batch(hook, 'train', {'index': 2})
+    runner.wait()
+    assert hook.batches == []
+    runner.close()
+
+
+def test_close():
+    """Test the pending events are processed on close and the runner may be used again."""
+    hook = SlowHook(delay=0.01)
+    runner = AsyncHookRunner([hook])
+    for index in range(5):
+        runner.after_batch(hook, 'valid', {'index': index})
+    runner.close()
+    assert len(hook.batches) == 5
+    runner.after_batch(hook, 'valid', {'index': 5})
+    runner.close()
+    assert len(hook.batches) == 6
+
+
+class EpochHook(AbstractHook):
+    """Hook recording the interval of its after_epoch event; writes or reads the ``value`` epoch data variable."""
+
+    def __init__(self, access: str, delay: float=0.05, exception=None, **kwargs):
+        super().__init__(**kwargs)
+        self.epoch_data_access = access
+        self.delay = delay
+        self.exception = exception
+        self.interval = self.value = None
+
+    def after_epoch(self, epoch_id, epoch_data):
+        start = time.perf_counter()
+        time.sleep(self.delay)
+        if self.epoch_data_access == 'write':
+            epoch_data['value'] = epoch_id
+        elif self.epoch_data_access == 'read':
+            self.value = epoch_data.get('value')
+        self.interval = (start, time.perf_counter())
+        if self.exception is not None:
+            raise self.exception
+
+
+def _overlap(first: EpochHook, second: EpochHook) -> bool:
+    return first.interval[0] < second.interval[1] and second.interval[0] < first.interval[1]
+
+
+def test_dependencies():
+    """Test the readers depend on the preceding writers and the writers on all the preceding accessing hooks."""
+    none, writer, reader, reader2, writer2, default = hooks = [EpochHook('none'), EpochHook('write'), EpochHook('read'),
+                                                               EpochHook('read'), EpochHook('write'), AbstractHook()]
+    dependencies = EpochHookRunner.dependencies(hooks)
+    assert dependencies[none] == dependencies[writer] == set()
+    assert dependencies[reader] == dependencies[reader2] == {writer}
+    assert dependencies[writer2] == {writer, reader, reader2}
+    assert dependencies[default] == set()  # not overriding after_epoch
+
+
+def test_concurrent_after_epoch():
+    """Test the independent hooks run concurrently while the dependent hooks wait."""
+    none, writer, reader, reader2, none2 = hooks = \
+        [EpochHook('none'), EpochHook('write'), EpochHook('read'), EpochHook('read'), EpochHook('none')]
+    profile = {}
+    names = {hook: str(i) for i, hook in enumerate(hooks)}
+    EpochHookRunner(hooks, threads=4, names=names, profile=profile).after_epoch(epoch_id=3, epoch_data={})
+    assert _overlap(none, writer) and _overlap(none, none2) and _overlap(reader, reader2)
+    assert not _overlap(writer, reader) and not _overlap(writer, reader2)
+    assert reader.value == reader2.value == 3
+    assert all(len(profile['after_epoch_hook_{}'.format(i)]) == 1 for i in range(5))
+
+
+@pytest.mark.parametrize('threads', (0, 2))
+def test_after_epoch_exceptions(threads):
+    """Test TrainingTerminated is raised after all the hooks while the other exceptions stop starting new hooks."""
+    hooks = [EpochHook('none', exception=TrainingTerminated()), EpochHook('write'), EpochHook('read')]
+    with pytest.raises(TrainingTerminated):
+        EpochHookRunner(hooks, threads=threads).after_epoch(epoch_id=1, epoch_data={})
+    assert all(hook.interval is not None for hook in hooks)
+
+    hooks = [EpochHook('write', exception=ValueError()), EpochHook('read'),
+             EpochHook('none', exception=TrainingTerminated())]
+    with pytest.raises(ValueError):
+        EpochHookRunner(hooks, threads=threads).after_epoch(epoch_id=1, epoch_data={})
+    assert hooks[1].interval is None
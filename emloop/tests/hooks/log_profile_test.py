@@ -108,3 +108,21 @@ def test_extra_streams(caplog):
         ('root', logging.INFO, '\tT hooks:\t19.052000'),
     ]
 
+
+
+def test_top_hooks(caplog):
+    """Test the slowest hooks are logged with their share of the step time."""
+    caplog.set_level(logging.INFO)
+    profile = {**_TRAIN_AND_VALID_PROFILE,
+               'after_batch_hook_SaveMasks_train': [2, 0, 0],
+               'after_batch_hook_SaveMasks_valid': [0.5, 0.5, 0],
+               'after_batch_hook_Save_Best_2_train': [1, 0, 0],
+               'after_epoch_hook_Save_Best_2': [3],
+               'after_epoch_hook_LogVariables': [0.5],
+               'after_epoch_profile_hook_LogVariables': [0.2]}
+
+    LogProfile(top_hooks=2).after_epoch_profile(1, profile, [EL_DEFAULT_TRAIN_STREAM])
+    assert caplog.record_tuples[3:] == [
+        ('root', logging.INFO, '\tT hook Save_Best_2:\t4.000000\t(3.2% of the step time)'),
+        ('root', logging.INFO, '\tT hook SaveMasks:\t2.000000\t(6.3% of the step time)'),
+    ]
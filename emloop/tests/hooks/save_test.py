@@ -3,12 +3,15 @@ Test module for saver hooks (:py:mod:`emloop.hooks.save`).
 """
 
 from typing import Mapping, List
+import os.path as path
 import collections
 import pytest
 
 from emloop.hooks.save import SaveEvery, SaveBest, SaveLatest
 from emloop.models.abstract_model import AbstractModel
 from emloop.types import EpochData
+from emloop.utils.yaml import load_yaml
+from emloop.constants import EL_STREAM_POSITION_FILE
 
 
 def _get_epoch_data(valid_loss_mean_val: float=3) -> EpochData:
@@ -96,6 +99,49 @@ def test_no_raise():
               on_failure='ignore').after_epoch(epoch_id=30)
 
 
+class DummyMainLoop:
+    """Main loop stub providing the training stream position."""
+    train_stream_name = 'train'
+    training_epochs_done = 2
+    training = True
+
+    @property
+    def stream_position(self):
+        return {'stream': 'train', 'position': {'batches': 7}}
+
+
+def test_every_n_batches(tmpdir):
+    """Test saving the model and the stream position every n training batches."""
+    saved = []
+
+    class RecordingModel(EmptyModel):
+        def save(self, name_suffix: str) -> str:
+            saved.append(name_suffix)
+            return name_suffix
+
+    hook = SaveEvery(model=RecordingModel(), n_batches=3, output_dir=str(tmpdir))
+    hook.register_mainloop(DummyMainLoop())
+    for _ in range(7):
+        hook.after_batch(stream_name='train', batch_data={})
+        hook.after_batch(stream_name='valid', batch_data={})
+    assert saved == ['3_3', '3_6']
+    for name_suffix in saved:
+        assert load_yaml(path.join(str(tmpdir), EL_STREAM_POSITION_FILE.format(name_suffix))) == \
+            {'stream': 'train', 'position': {'batches': 7}, 'checkpoint': name_suffix}
+
+    hook.after_epoch(epoch_id=3, epoch_data={})
+    hook.after_batch(stream_name='train', batch_data={})
+    assert saved == ['3_3', '3_6', '3']
+
+    # the training stream is only evaluated, e.g. in the zeroth epoch
+    main_loop = DummyMainLoop()
+    main_loop.training = False
+    hook = SaveEvery(model=RecordingModel(), n_batches=1, n_epochs=10, output_dir=str(tmpdir))
+    hook.register_mainloop(main_loop)
+    hook.after_batch(stream_name='train', batch_data={})
+    assert saved == ['3_3', '3_6', '3']
+
+
 #############
 # Save Best #
 #############
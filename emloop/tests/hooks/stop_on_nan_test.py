@@ -60,3 +60,5 @@ def test_periodicity():
     with pytest.raises(TrainingTerminated):
         StopOnNaN().after_epoch(epoch_data=_get_data(np.nan))
     StopOnNaN().after_batch(stream_name='train', batch_data=_get_data(np.nan)['train'])
+    assert StopOnNaN().batch_streams == ()
+    assert StopOnNaN(after_batch=True).batch_streams is None
@@ -6,14 +6,16 @@ import time
 from collections import defaultdict
 from typing import Mapping, List, Iterable
 import logging
+import os.path as path
 
 import numpy as np
 
 import emloop as el
-from emloop.constants import EL_BUFFER_SLEEP, EL_PREDICT_STREAM, EL_DEFAULT_TRAIN_STREAM
+from emloop.constants import EL_PREDICT_STREAM, EL_DEFAULT_TRAIN_STREAM
 from emloop.datasets import StreamWrapper
-from emloop.hooks import StopAfter, TrainingTrace
-from emloop.types import EpochData, Batch, Stream, TimeProfile
+from emloop.hooks import StopAfter, TrainingTrace, AccumulateVariables, StopOnNaN
+from emloop.hooks.save_masks import SaveMasks
+from emloop.types import EpochData, Batch, Stream, TimeProfile, TrainingTerminated
 
 
 _READ_DATA_SLEEP_S = 0.1
@@ -135,6 +137,14 @@ class GeneratedStreamDataset(SimpleDataset):
         assert False
 
 
+class ColumnarDataset(SimpleDataset):
+    """SimpleDataset yielding columnar batches."""
+
+    def train_stream(self) -> Stream:
+        for batch in super().train_stream():
+            yield el.ColumnarBatch(batch)
+
+
 class EventRecordingHook(el.AbstractHook):
     """EventRecordingHook records all the events and store their count and order."""
 
@@ -319,10 +329,11 @@ def create_main_loop(tmpdir):
     return _create_main_loop
 
 
-def test_events(create_main_loop):
+@pytest.mark.parametrize('async_after_batch, after_epoch_threads', [(False, 0), (True, 0), (False, 2)])
+def test_events(async_after_batch, after_epoch_threads, create_main_loop):
     """Test event counts and order."""
-    recording_hook = EventRecordingHook()
-    _, _, mainloop = create_main_loop(epochs=3, extra_hooks=[recording_hook])
+    recording_hook = EventRecordingHook(async_after_batch=async_after_batch)
+    _, _, mainloop = create_main_loop(epochs=3, extra_hooks=[recording_hook], after_epoch_threads=after_epoch_threads)
     mainloop.run_training()
 
     before_training = [1]
@@ -344,6 +355,142 @@ def test_events(create_main_loop):
     assert recording_hook.after_training_events == after_training
 
 
+class FailingHook(el.AbstractHook):
+    """Hook raising the given exception in the given batch."""
+
+    def __init__(self, exception: Exception, batch_index: int, **kwargs):
+        super().__init__(**kwargs)
+        self._exception = exception
+        self._batch_index = batch_index
+        self.batch_count = 0
+
+    def after_batch(self, stream_name: str, batch_data: Batch) -> None:
+        self.batch_count += 1
+        if self.batch_count == self._batch_index:
+            raise self._exception
+
+
+def test_async_after_batch_exceptions(create_main_loop):
+    """Test the exceptions raised by the hooks running after_batch in the background are propagated."""
+    recording_hook = EventRecordingHook()
+    failing_hook = FailingHook(TrainingTerminated('stop'), 5, async_after_batch=True)
+    _, _, mainloop = create_main_loop(epochs=3, extra_hooks=[recording_hook, failing_hook])
+    mainloop.run_training()
+    assert failing_hook.batch_count == 5
+    assert 5 <= len(recording_hook.after_batch_events) <= _DATASET_ITERS
+    assert recording_hook.after_epoch_events == []
+    assert recording_hook.after_training_events != []
+
+    failing_hook = FailingHook(ValueError('failure'), _DATASET_ITERS, async_after_batch=True)
+    _, _, mainloop = create_main_loop(epochs=3, extra_hooks=[failing_hook])
+    with pytest.raises(ValueError):
+        mainloop.run_training()
+    assert failing_hook.batch_count == _DATASET_ITERS
+
+
+class InterestedHook(DataRecordingHook):
+    """DataRecordingHook interested only in the given streams and variables; assigns the given variable."""
+
+    def __init__(self, streams=None, variables=None, assigned=None, **kwargs):
+        super().__init__(**kwargs)
+        self._streams = streams
+        self._variables = variables
+        self._assigned = assigned
+
+    @property
+    def batch_streams(self):
+        return self._streams
+
+    @property
+    def batch_variables(self):
+        return self._variables
+
+    def after_batch(self, stream_name: str, batch_data: Batch) -> None:
+        super().after_batch(stream_name, dict(batch_data))
+        if self._assigned is not None:
+            batch_data[self._assigned] = 'assigned'
+
+
+def test_batch_interests(create_main_loop):
+    """Test the after_batch events are dispatched only to the interested hooks with a view of the batch."""
+    assigning_hook = InterestedHook(assigned='extra')
+    all_hook = InterestedHook()
+    valid_hook = InterestedHook(streams=['valid'])
+    output_hook = InterestedHook(variables=['output', 'missing'])
+    missing_hook = InterestedHook(variables=['missing'])
+    no_batch_hook = EpochDataProducer()
+    hooks = [assigning_hook, all_hook, valid_hook, output_hook, missing_hook, no_batch_hook]
+    _, _, mainloop = create_main_loop(epochs=1, extra_hooks=hooks, extra_streams=['valid'])
+    train_hooks = mainloop._batch_hooks('train')
+    assert [hook for hook in train_hooks if hook in hooks] == [assigning_hook, all_hook, output_hook, missing_hook]
+    assert valid_hook in mainloop._batch_hooks('valid') and no_batch_hook not in mainloop._batch_hooks('valid')
+    mainloop.run_training()
+
+    assert len(all_hook.batch_data['train']) == len(all_hook.batch_data['valid']) == _DATASET_ITERS
+    assert set(all_hook.batch_data['train'][0].keys()) == {'input', 'target', 'output', 'extra'}
+    assert 'extra' not in assigning_hook.batch_data['train'][0]
+    assert list(valid_hook.batch_data.keys()) == ['valid']
+    assert len(output_hook.batch_data['train']) == _DATASET_ITERS
+    assert set(output_hook.batch_data['train'][0].keys()) == {'output'}
+    assert missing_hook.batch_data == {}
+
+
+def recording_batch_variables(hook_class):
+    """Create a subclass of the given hook class recording the variables passed to its ``after_batch``."""
+    class RecordingHook(hook_class):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.passed_variables = set()
+
+        def after_batch(self, stream_name: str, batch_data: Batch) -> None:
+            self.passed_variables.update(batch_data.keys())
+
+    return RecordingHook
+
+
+def test_declared_batch_variables(create_main_loop):
+    """Test the built-in hooks reading only some of the batch variables receive only them."""
+    accumulating = recording_batch_variables(AccumulateVariables)(variables=['input'])
+    stopping = recording_batch_variables(StopOnNaN)(variables=['output'], after_batch=True, after_epoch=False)
+    all_stopping = recording_batch_variables(StopOnNaN)(after_batch=True, after_epoch=False)
+    masks = recording_batch_variables(SaveMasks)(mask_variable='output', path_variable='target')
+    _, _, mainloop = create_main_loop(epochs=1, extra_hooks=[accumulating, stopping, all_stopping, masks])
+    mainloop.run_training()
+
+    assert accumulating.passed_variables == {'input'}
+    assert stopping.passed_variables == {'output'}
+    assert all_stopping.passed_variables == {'input', 'target', 'output'}
+    assert masks.passed_variables == {'output', 'target'}
+
+
+class AccumulatedInputHook(AccumulateVariables):
+    """Hook recording the accumulated ``input`` buffers of the train stream after each epoch."""
+
+    def __init__(self, **kwargs):
+        super().__init__(variables=['input'], **kwargs)
+        self.buffers = []
+
+    def after_epoch(self, **kwargs) -> None:
+        self.buffers.append(self._accumulator['train']['input'])
+        super().after_epoch(**kwargs)
+
+
+def test_shared_accumulator(create_main_loop):
+    """Test the accumulating hooks share the accumulated variables which are reset after each epoch."""
+    shared = [AccumulatedInputHook(), AccumulatedInputHook()]
+    private = AccumulatedInputHook(shared_accumulator=False)
+    _, _, mainloop = create_main_loop(epochs=2, extra_hooks=shared + [private])
+    mainloop.run_training()
+
+    for hook in shared + [private]:
+        assert [len(buffer) for buffer in hook.buffers] == [_DATASET_ITERS * _DATASET_SHAPE[0]] * 2
+    assert all(first is second for first, second in zip(*[hook.buffers for hook in shared]))
+    assert not any(first is second for first, second in zip(shared[0].buffers, private.buffers))
+    for first, second in zip(shared[0].buffers, private.buffers):
+        assert np.array_equal(first, second)
+    assert len(mainloop.accumulators._accumulator) == 0
+
+
 def test_event_data(create_main_loop):
     """Test after_epoch and after_batch event args match the expectation."""
     recording_hook = DataRecordingHook()
@@ -465,6 +612,21 @@ def test_profiling(create_main_loop):
             assert prefix+stream_name in profile4
 
 
+def test_hook_profile(create_main_loop):
+    """Test the per-hook timings are recorded under stable keys."""
+    hooks = [SaveProfileHook(), EventRecordingHook(), EventRecordingHook(async_after_batch=True)]
+    _, _, mainloop = create_main_loop(epochs=1, extra_hooks=hooks)
+    mainloop.run_training()
+    profile = hooks[0].profile
+
+    assert len(profile['after_batch_hook_EventRecordingHook_train']) == _DATASET_ITERS
+    assert len(profile['after_batch_hook_EventRecordingHook_2_train']) == _DATASET_ITERS
+    assert 'after_batch_hook_SaveProfileHook_train' not in profile
+    assert len(profile['after_epoch_hook_EventRecordingHook_2']) == 1
+    assert len(profile['after_epoch_hook_SaveProfileHook']) == 1
+    assert len(profile['after_epoch_profile_hook_SaveProfileHook']) == 1
+
+
 def test_zeroth_epoch(create_main_loop):
     """Test the model is not trained in the zeroth epoch."""
     data_recording_hook = DataRecordingHook()
@@ -529,11 +691,147 @@ def test_buffer(create_main_loop):
                                            dataset=DelayedDataset(), buffer=4)
     mainloop.run_training()
     profile = profile_hook.profile['read_batch_train']
-    expected_profile = [_READ_DATA_SLEEP_S + EL_BUFFER_SLEEP] + [0] * (_DATASET_ITERS - 1)
+    expected_profile = [_READ_DATA_SLEEP_S] + [0] * (_DATASET_ITERS - 1)
 
     assert np.allclose(profile, expected_profile, atol=0.01)
 
 
+@pytest.mark.parametrize('shared_memory', [0, 2**16])
+def test_workers(create_main_loop, shared_memory):
+    """Test training with batches produced by worker processes."""
+    recording_hook = EventRecordingHook()
+    _, _, mainloop = create_main_loop(epochs=2, extra_hooks=[recording_hook], extra_streams=['valid'], workers=2,
+                                      buffer=4, shared_memory=shared_memory)
+    mainloop.run_training()
+
+    assert len(recording_hook.after_batch_events) == 2 * 2 * _DATASET_ITERS
+    assert all(not stream._worker_processes and stream._ring is None for stream in mainloop._streams.values())
+
+
+def test_auto_buffer(create_main_loop, caplog):
+    """Test the auto buffer is tuned according to the epoch profile."""
+    caplog.set_level(logging.INFO)
+    _, _, mainloop = create_main_loop(epochs=2, model_class=DelayedModel, dataset=DelayedDataset(), buffer='auto',
+                                      auto_tune_epochs=1)
+    mainloop.run_training()
+
+    assert mainloop._streams['train'].buffer_size == 1
+    assert 'auto-tuning buffer 0 -> 1' in caplog.text
+
+    with pytest.raises(AssertionError):
+        create_main_loop(workers='many')
+
+
+def test_persistent_buffer(create_main_loop):
+    """Test training with buffers persisting across the epochs."""
+    recording_hook = EventRecordingHook()
+    _, _, mainloop = create_main_loop(epochs=3, extra_hooks=[recording_hook], extra_streams=['valid'], buffer=4,
+                                      persistent_buffer=True)
+    mainloop.run_training()
+
+    assert len(recording_hook.after_batch_events) == 3 * 2 * _DATASET_ITERS
+    assert all(not stream._producing for stream in mainloop._streams.values())
+
+
+def test_cache_streams(create_main_loop, tmpdir):
+    """Test the cached streams are iterated only in the first epoch."""
+    with pytest.raises(ValueError):
+        create_main_loop(cache_streams=['valid'])
+
+    _, dataset, mainloop = create_main_loop(epochs=3, extra_streams=['valid'], cache_streams=['valid'],
+                                            cache_dir=path.join(tmpdir, 'cache'))
+    mainloop.run_training()
+
+    assert len(dataset.batches['valid']) == _DATASET_ITERS
+    assert len(dataset.batches['train']) == 3 * _DATASET_ITERS
+    assert path.exists(path.join(tmpdir, 'cache', 'valid'))
+
+
+def test_shards(create_main_loop, tmpdir):
+    """Test each shard of the streams is evaluated and cached separately."""
+    _, dataset, mainloop = create_main_loop(epochs=2, extra_streams=['valid'], shard_index=1, num_shards=2,
+                                            cache_streams=['valid'], cache_dir=path.join(tmpdir, 'cache'))
+    mainloop.run_training()
+
+    assert len(dataset.batches['train']) == 2 * _DATASET_ITERS  # the whole stream is iterated
+    assert len(dataset.batches['valid']) == _DATASET_ITERS
+    assert path.exists(path.join(tmpdir, 'cache', 'valid_shard_1_of_2'))
+
+
+def test_interleave_streams(create_main_loop):
+    """Test the training stream interleaving the batches of multiple streams."""
+    recording_hook = EventRecordingHook()
+    _, dataset, mainloop = create_main_loop(epochs=2, extra_hooks=[recording_hook], buffer=2,
+                                            interleave_streams={'train': 1, 'test': 2}, interleave_seed=0)
+    mainloop.run_training()
+
+    assert len(dataset.batches['train']) == len(dataset.batches['test']) == 2 * _DATASET_ITERS
+    assert len(recording_hook.after_batch_events) == 2 * 2 * _DATASET_ITERS
+    assert isinstance(mainloop._streams['train'], el.datasets.InterleavedStream)
+
+
+def test_resume_stream_position(create_main_loop):
+    """Test the first training epoch continues from the resumed stream position."""
+    recording_hook = EventRecordingHook()
+    _, dataset, mainloop = create_main_loop(epochs=2, extra_hooks=[recording_hook])
+    mainloop.resume_stream_position({'stream': 'train', 'position': {'batches': 5}})
+    mainloop.run_training()
+
+    assert len(recording_hook.after_batch_events) == 2 * _DATASET_ITERS - 5
+    assert mainloop.stream_position == {'stream': 'train', 'position': {'batches': 0}}
+
+    _, _, mainloop = create_main_loop(epochs=1)
+    assert mainloop.stream_position is None  # the training stream is not open
+    assert mainloop._streams == {}
+    mainloop.resume_stream_position({'stream': 'valid', 'position': {'batches': 5}})
+    assert mainloop._resume_position is None
+
+
+class TrainingRecordingHook(el.AbstractHook):
+    """TrainingRecordingHook records whether the model is trained during the ``after_batch`` events."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.training = []
+
+    def after_batch(self, stream_name: str, batch_data: Batch) -> None:
+        self.training.append((stream_name, self._main_loop.training))
+
+
+def test_training(create_main_loop):
+    """Test the main loop is training only while a training stream of a training epoch is iterated."""
+    recording_hook = TrainingRecordingHook()
+    _, _, mainloop = create_main_loop(extra_hooks=[recording_hook], skip_zeroth_epoch=False, extra_streams=['valid'])
+    mainloop.run_training()
+
+    assert recording_hook.training == [('train', False)] * _DATASET_ITERS + [('valid', False)] * _DATASET_ITERS + \
+        [('train', True)] * _DATASET_ITERS + [('valid', False)] * _DATASET_ITERS
+    assert not mainloop.training
+
+
+def test_columnar_batches(create_main_loop, mocker):
+    """Test the sources of the columnar batches are checked only once per stream."""
+    recording_hook = DataRecordingHook()
+    _, _, mainloop = create_main_loop(epochs=2, extra_hooks=[recording_hook], dataset=ColumnarDataset(),
+                                      extra_streams=['valid'], fixed_batch_size=_DATASET_SHAPE[0])
+    check_sources = mocker.spy(mainloop, '_check_sources')
+    mainloop.run_training()
+
+    assert check_sources.call_count == 1 + 2 * _DATASET_ITERS
+    assert len(recording_hook.batch_data['train']) == 2 * _DATASET_ITERS
+    assert set(recording_hook.batch_data['train'][0].keys()) == {'input', 'target', 'output'}
+
+
+def test_memory_cache_streams(create_main_loop):
+    """Test the streams cached in the memory are iterated only in the first epoch."""
+    _, dataset, mainloop = create_main_loop(epochs=3, extra_streams=['valid'], cache_streams=['valid'],
+                                            cache='memory', cache_compression='zlib')
+    mainloop.run_training()
+
+    assert len(dataset.batches['valid']) == _DATASET_ITERS
+    assert len(dataset.batches['train']) == 3 * _DATASET_ITERS
+
+
 def test_stream_check(create_main_loop, caplog):
     """Test handling of empty batches, streams and checking batch variable lengths."""
 
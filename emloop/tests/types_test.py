@@ -0,0 +1,42 @@
+"""
+Test module for the emloop types (emloop.types).
+"""
+import pickle
+
+import numpy as np
+import pytest
+
+from emloop.types import ColumnarBatch, BatchSchema
+
+
+def test_columnar_batch():
+    """Test the columns, schema and batch size of ColumnarBatch."""
+    batch = ColumnarBatch({'images': np.ones((4, 3, 2))[:, :, 0], 'labels': [1, 2, 3, 4]})
+
+    assert batch.batch_size == 4
+    assert batch.schema == BatchSchema(('images', 'labels'), (np.dtype(np.float64), np.array([1]).dtype))
+    assert list(batch.keys()) == ['images', 'labels'] and len(batch) == 2
+    assert batch['images'].flags['C_CONTIGUOUS']
+    assert isinstance(batch['labels'], np.ndarray)
+    assert ColumnarBatch({}).batch_size == 0
+
+    restored = pickle.loads(pickle.dumps(batch))
+    assert restored.schema == batch.schema
+    np.testing.assert_array_equal(restored['labels'], batch['labels'])
+
+
+def test_columnar_batch_lengths():
+    """Test ColumnarBatch raises on the columns of different lengths or scalar columns."""
+    with pytest.raises(ValueError):
+        ColumnarBatch({'images': np.ones((4, 3)), 'labels': [1, 2, 3]})
+    with pytest.raises(ValueError):
+        ColumnarBatch({'labels': 1})
+
+
+def test_columnar_batch_from_schema():
+    """Test ColumnarBatch is restored with the given schema without copying the columns."""
+    batch = ColumnarBatch({'images': np.ones((4, 3)), 'labels': [1, 2, 3, 4]})
+    restored = ColumnarBatch.from_schema(dict(batch.columns), batch.schema, batch.batch_size)
+
+    assert restored.schema == batch.schema and restored.batch_size == 4
+    assert all(restored[name] is batch[name] for name in batch)
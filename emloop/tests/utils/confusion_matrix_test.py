@@ -4,7 +4,7 @@ Test module for confusion_matrix utils (emloop.utils.confusion_matrix).
 import numpy as np
 import pytest
 
-from emloop.utils.confusion_matrix import confusion_matrix
+from emloop.utils.confusion_matrix import confusion_matrix, ConfusionMatrix, most_confused, to_dense
 
 
 _INVALID_INPUTS = [(np.array([0]), np.array([0]), 'a', TypeError),
@@ -44,3 +44,45 @@ def test_confusion_matrix(exp, pred, num, output):
     calculated_cm = confusion_matrix(expected=exp, predicted=pred, num_classes=num)
     groundtruth_cm = output
     np.testing.assert_equal(calculated_cm, groundtruth_cm)
+
+
+@pytest.mark.parametrize('exp, pred, num, output', _VALID_INPUTS)
+def test_sparse_confusion_matrix(exp, pred, num, output):
+    sparse_cm = confusion_matrix(expected=exp, predicted=pred, num_classes=num, sparse=True)
+    assert np.all(sparse_cm.counts > 0)
+    np.testing.assert_equal(to_dense(sparse_cm), output)
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_incremental_confusion_matrix(sparse):
+    """Test the confusion matrix updated by batches equals the one computed at once."""
+    random = np.random.RandomState(0)
+    expected, predicted = random.randint(0, 50, size=1000), random.randint(0, 50, size=1000)
+    cm = ConfusionMatrix(num_classes=50, sparse=sparse)
+    for batch_expected, batch_predicted in zip(np.array_split(expected, 7), np.array_split(predicted, 7)):
+        cm.update(expected=batch_expected, predicted=batch_predicted)
+    matrix = to_dense(cm.matrix) if sparse else cm.matrix
+    np.testing.assert_equal(matrix, confusion_matrix(expected=expected, predicted=predicted, num_classes=50))
+    assert cm.most_confused(k=7) == most_confused(matrix, k=7)
+
+    with pytest.raises(AssertionError):
+        cm.update(expected=np.array([50]), predicted=np.array([0]))
+
+
+def test_large_sparse_confusion_matrix():
+    """Test the sparse confusion matrix keeps only the present pairs of a large label space."""
+    cm = ConfusionMatrix(num_classes=100000, sparse=True)
+    cm.update(expected=np.array([99999, 5, 5, 7]), predicted=np.array([0, 5, 6, 6]))
+    cm.update(expected=np.array([5]), predicted=np.array([6]))
+    assert len(cm.matrix.counts) == 4
+    assert cm.most_confused(k=2) == [(5, 6, 2), (7, 6, 1)]
+
+
+def test_most_confused():
+    """Test the most confused pairs are the largest off-diagonal entries in the decreasing order."""
+    cm = np.array([[9, 1, 4],
+                   [0, 8, 2],
+                   [4, 3, 7]])
+    assert most_confused(cm, k=3) == [(0, 2, 4), (2, 0, 4), (2, 1, 3)]
+    assert most_confused(cm, k=10) == [(0, 2, 4), (2, 0, 4), (2, 1, 3), (1, 2, 2), (0, 1, 1)]
+    assert most_confused(cm, k=0) == []
@@ -0,0 +1,72 @@
+"""
+Test module for the streaming statistics (emloop.utils.running_stats).
+"""
+import numpy as np
+import pytest
+
+from emloop.utils.running_stats import QuantileSketch, RunningStats, parse_percentile
+
+
+def test_parse_percentile():
+    """Test parsing the percentile aggregations."""
+    assert parse_percentile('percentile_95') == (False, 95.)
+    assert parse_percentile('nanpercentile_99.9') == (True, 99.9)
+    assert parse_percentile('percentile') is None
+    assert parse_percentile('percentile_101') is None
+    assert parse_percentile('mean') is None
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_sketch_accuracy(relative_accuracy):
+    """Test the estimated quantiles are within the relative accuracy and the sketches are mergeable."""
+    values = np.random.RandomState(0).lognormal(sigma=3, size=10000) * np.repeat([-1, 0, 1], [2000, 1000, 7000])
+    sketch, other = QuantileSketch(relative_accuracy), QuantileSketch(relative_accuracy)
+    sketch.update(values[:5000])
+    other.update(values[5000:])
+    sketch.merge(other)
+
+    assert sketch.count == len(values)
+    ordered = np.sort(values)
+    for quantile in [0., 0.01, 0.15, 0.25, 0.5, 0.9, 0.999, 1.]:
+        exact = ordered[int(quantile * (len(values) - 1))]
+        assert abs(sketch.quantile(quantile) - exact) <= relative_accuracy * abs(exact)
+
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(relative_accuracy / 2))
+
+
+def test_sketch_max_buckets():
+    """Test the number of the buckets is limited while the large values stay accurate."""
+    sketch = QuantileSketch(0.01, max_buckets=100)
+    values = np.logspace(-10, 10, 10000)
+    sketch.update(values)
+    assert len(sketch._positive) == 100
+    assert sketch.quantile(1.) == pytest.approx(values[-1], rel=0.01)
+
+
+def test_running_stats():
+    """Test the running statistics match NumPy, including NaNs, infinities and empty statistics."""
+    values = np.random.RandomState(1).normal(3, 2, size=(1000, 3))
+    values[10, 1] = np.nan
+    stats = RunningStats()
+    for batch in np.array_split(values, 7):
+        stats.extend(batch)
+
+    for aggregation in ['mean', 'std', 'var', 'min', 'max', 'sum', 'nanmean', 'nanstd', 'nanvar', 'nanmin', 'nanmax',
+                        'nansum']:
+        assert stats.aggregate(aggregation) == pytest.approx(getattr(np, aggregation)(values), nan_ok=True)
+    assert stats.aggregate('nancount') == 1
+    assert stats.aggregate('nanfraction') == pytest.approx(1 / values.size)
+    assert np.isnan(stats.aggregate('median'))
+    assert stats.aggregate('nanmedian') == pytest.approx(np.nanmedian(values), rel=0.02)
+    assert len(stats) == values.size
+
+    stats.extend([np.inf])
+    assert stats.aggregate('nanmax') == np.inf
+    assert stats.aggregate('nanpercentile_100') == np.inf
+
+    empty = RunningStats()
+    assert np.isnan(empty.aggregate('mean')) and np.isnan(empty.aggregate('percentile_5'))
+    assert empty.aggregate('sum') == 0 and empty.aggregate('nancount') == 0
+    with pytest.raises(ValueError):
+        empty.aggregate('argmax')
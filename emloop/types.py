@@ -1,4 +1,7 @@
-from typing import Iterable, Any, Mapping, List, Sequence
+from collections import namedtuple
+from typing import Iterable, Any, Mapping, List, Sequence, Iterator, Tuple, Dict
+
+import numpy as np
 
 
 Batch = Mapping[str, Sequence[Any]]
@@ -13,6 +16,89 @@ EpochData = Mapping[str, object]
 TimeProfile = Mapping[str, List[float]]
 """Time profile type."""
 
+BatchSchema = namedtuple('BatchSchema', 'names dtypes')
+"""Schema of a :py:class:`ColumnarBatch`: tuples of the source names and their dtypes."""
+
+
+class ColumnarBatch(Mapping[str, np.ndarray]):
+    """
+    :py:attr:`Batch` of contiguous numpy columns with a cached schema and batch size.
+
+    The columns are validated once when the batch is created so that :py:class:`emloop.MainLoop` may check
+    the sources only once per stream and schema and skip the per-batch checks of the plain batches.
+
+    .. code-block:: python
+        :caption: stream of columnar batches
+
+        def train_stream(self):
+            for images, labels in self._load_batches():
+                yield ColumnarBatch({'images': images, 'labels': labels})
+    """
+
+    __slots__ = ('_columns', '_schema', '_batch_size')
+
+    def __init__(self, columns: Mapping[str, Any]):
+        """
+        Create new ColumnarBatch.
+
+        :param columns: sources of the batch; converted to contiguous numpy arrays
+        :raise ValueError: if the columns have different lengths or some of them is a scalar
+        """
+        self._columns = {name: np.asarray(column) for name, column in columns.items()}
+        batch_sizes = {len(column) if column.ndim > 0 else None for column in self._columns.values()}
+        if None in batch_sizes or len(batch_sizes) > 1:
+            raise ValueError('Columns of a batch must have the same length, got {}.'
+                             .format({name: column.shape for name, column in self._columns.items()}))
+        self._batch_size = batch_sizes.pop() if batch_sizes else 0
+        self._columns = {name: np.ascontiguousarray(column) for name, column in self._columns.items()}
+        self._schema = BatchSchema(tuple(self._columns.keys()),
+                                   tuple(column.dtype for column in self._columns.values()))
+
+    @classmethod
+    def from_schema(cls, columns: Dict[str, np.ndarray], schema: BatchSchema, batch_size: int) -> 'ColumnarBatch':
+        """
+        Create the batch of the contiguous numpy columns known to match the given schema (e.g. those of a restored
+        batch) without validating them.
+
+        :param columns: contiguous numpy columns of the batch in the order of the schema
+        :param schema: schema of the columns
+        :param batch_size: number of the examples in the batch
+        :return: the batch
+        """
+        batch = cls.__new__(cls)
+        batch._columns = columns
+        batch._schema = schema
+        batch._batch_size = batch_size
+        return batch
+
+    @property
+    def schema(self) -> BatchSchema:
+        """Names and dtypes of the columns."""
+        return self._schema
+
+    @property
+    def batch_size(self) -> int:
+        """Number of the examples in the batch."""
+        return self._batch_size
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The columns by their names."""
+        return self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __reduce__(self) -> Tuple:
+        return ColumnarBatch, (self._columns,)
+
+
 class TrainingTerminated(Exception):
     """Exception that is raised when a hook terminates the training."""
     pass
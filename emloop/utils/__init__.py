@@ -6,6 +6,7 @@ from .profile import Timer
 from .reflection import _EMPTY_DICT, parse_fully_qualified_name, create_object, list_submodules, find_class_module,\
                         get_class_module, get_attribute
 from .names import get_random_name
-from .confusion_matrix import confusion_matrix
+from .confusion_matrix import confusion_matrix, ConfusionMatrix, SparseConfusionMatrix, most_confused, to_dense
+from .running_stats import RunningStats, QuantileSketch
 
 __all__ = []
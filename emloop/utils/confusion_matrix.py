@@ -1,22 +1,144 @@
+from collections import Counter, namedtuple
+from typing import List, Tuple, Union
+
 import numpy as np
 
 
-def confusion_matrix(expected: np.ndarray, predicted: np.ndarray, num_classes: int) -> np.ndarray:
+SparseConfusionMatrix = namedtuple('SparseConfusionMatrix', 'expected predicted counts num_classes')
+"""Confusion matrix in the coordinate (COO) form listing the counts of the (expected, predicted) pairs present."""
+
+
+def _check_labels(expected: np.ndarray, predicted: np.ndarray, num_classes: int) -> None:
+    """Check the given labels are integers in [0, ``num_classes``) and of the same shape."""
+    assert np.issubclass_(expected.dtype.type, np.integer), " Classes' indices must be integers"
+    assert np.issubclass_(predicted.dtype.type, np.integer), " Classes' indices must be integers"
+    assert expected.shape == predicted.shape, "Predicted and expected data must be the same length"
+    if expected.size > 0:
+        assert num_classes > max(expected.max(), predicted.max()), \
+            "Number of classes must be at least the number of indices in predicted/expected data"
+        assert min(expected.min(), predicted.min()) >= 0, " Classes' indices must be positive integers"
+    else:
+        assert num_classes > 0, "Number of classes must be positive"
+
+
+def _pair_codes(expected: np.ndarray, predicted: np.ndarray, num_classes: int) -> np.ndarray:
+    """Encode the (expected, predicted) pairs as the indices to the flattened confusion matrix."""
+    return expected.ravel().astype(np.int64) * num_classes + predicted.ravel()
+
+
+def _sparse(codes: np.ndarray, counts: np.ndarray, num_classes: int) -> SparseConfusionMatrix:
+    """Create the sparse confusion matrix from the given pair codes and their counts."""
+    return SparseConfusionMatrix(expected=codes // num_classes, predicted=codes % num_classes,
+                                 counts=counts, num_classes=num_classes)
+
+
+def confusion_matrix(expected: np.ndarray, predicted: np.ndarray, num_classes: int,
+                     sparse: bool=False) -> Union[np.ndarray, SparseConfusionMatrix]:
     """
     Calculate and return confusion matrix for the predicted and expected labels
 
     :param expected: array of expected classes (integers) with shape `[num_of_data]`
     :param predicted: array of predicted classes (integers) with shape `[num_of_data]`
     :param num_classes: number of classification classes
-    :return: confusion matrix (cm) with absolute values
+    :param sparse: if ``True``, return the confusion matrix in the sparse form suitable for large numbers of classes
+    :return: confusion matrix (cm) with absolute values; rows correspond to the expected classes
     """
-    assert np.issubclass_(expected.dtype.type, np.integer), " Classes' indices must be integers"
-    assert np.issubclass_(predicted.dtype.type, np.integer), " Classes' indices must be integers"
-    assert expected.shape == predicted.shape, "Predicted and expected data must be the same length"
-    assert num_classes > np.max([predicted, expected]), \
-        "Number of classes must be at least the number of indices in predicted/expected data"
-    assert np.min([predicted, expected]) >= 0, " Classes' indices must be positive integers"
-    cm_abs = np.zeros((num_classes, num_classes), dtype=np.int32)
-    for pred, exp in zip(predicted, expected):
-        cm_abs[exp, pred] += 1
-    return cm_abs
+    _check_labels(expected, predicted, num_classes)
+    codes = _pair_codes(expected, predicted, num_classes)
+    if sparse:
+        return _sparse(*np.unique(codes, return_counts=True), num_classes=num_classes)
+    return np.bincount(codes, minlength=num_classes ** 2).reshape(num_classes, num_classes)
+
+
+def to_dense(cm: SparseConfusionMatrix) -> np.ndarray:
+    """
+    Convert the given sparse confusion matrix to the dense one.
+
+    :param cm: sparse confusion matrix
+    :return: dense confusion matrix
+    """
+    dense = np.zeros((cm.num_classes, cm.num_classes), dtype=np.int64)
+    dense[cm.expected, cm.predicted] = cm.counts
+    return dense
+
+
+def most_confused(cm: Union[np.ndarray, SparseConfusionMatrix], k: int=10) -> List[Tuple[int, int, int]]:
+    """
+    Find the ``k`` most frequent confusions, i.e., the off-diagonal entries of the confusion matrix.
+
+    :param cm: dense or sparse confusion matrix
+    :param k: number of the confusions
+    :return: list of at most ``k`` (expected class, predicted class, count) triplets ordered by decreasing counts
+    """
+    if isinstance(cm, SparseConfusionMatrix):
+        off_diagonal = (cm.expected != cm.predicted) & (cm.counts > 0)
+        expected, predicted, counts = cm.expected[off_diagonal], cm.predicted[off_diagonal], cm.counts[off_diagonal]
+    else:
+        cm = np.asarray(cm)
+        expected, predicted = np.nonzero(cm)
+        off_diagonal = expected != predicted
+        expected, predicted = expected[off_diagonal], predicted[off_diagonal]
+        counts = cm[expected, predicted]
+    if len(counts) > k:
+        top = np.argpartition(-counts, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.int64)
+        expected, predicted, counts = expected[top], predicted[top], counts[top]
+    order = np.lexsort((predicted, expected, -counts))
+    return [(int(expected[i]), int(predicted[i]), int(counts[i])) for i in order]
+
+
+class ConfusionMatrix:
+    """
+    Confusion matrix updated incrementally with the batches of the predicted and expected labels.
+
+    .. code-block:: python
+        :caption: Usage
+
+        cm = ConfusionMatrix(num_classes=10)
+        for batch in stream:
+            cm.update(expected=batch['labels'], predicted=batch['predictions'])
+        print(cm.matrix, cm.most_confused(k=5))
+
+    With ``sparse``, only the counts of the pairs present are kept, so that the memory does not grow with the square
+    of the number of classes.
+    """
+
+    def __init__(self, num_classes: int, sparse: bool=False):
+        """
+        Create new empty ConfusionMatrix.
+
+        :param num_classes: number of classification classes
+        :param sparse: whether to keep the matrix in the sparse form
+        """
+        self._num_classes = num_classes
+        self._sparse = sparse
+        self._dense = None if sparse else np.zeros((num_classes, num_classes), dtype=np.int64)
+        self._counts = Counter()
+
+    def update(self, expected: np.ndarray, predicted: np.ndarray) -> None:
+        """
+        Count the given batch of the expected and predicted labels.
+
+        :param expected: array of expected classes (integers)
+        :param predicted: array of predicted classes (integers)
+        """
+        _check_labels(expected, predicted, self._num_classes)
+        codes = _pair_codes(expected, predicted, self._num_classes)
+        if self._sparse:
+            codes, counts = np.unique(codes, return_counts=True)
+            self._counts.update(dict(zip(codes.tolist(), counts.tolist())))
+        else:
+            self._dense += np.bincount(codes, minlength=self._num_classes ** 2).reshape(self._dense.shape)
+
+    @property
+    def matrix(self) -> Union[np.ndarray, SparseConfusionMatrix]:
+        """The confusion matrix counted so far; in the sparse form if the matrix is sparse."""
+        if not self._sparse:
+            return self._dense
+        codes = np.fromiter(self._counts.keys(), dtype=np.int64, count=len(self._counts))
+        counts = np.fromiter(self._counts.values(), dtype=np.int64, count=len(self._counts))
+        order = np.argsort(codes)
+        return _sparse(codes[order], counts[order], self._num_classes)
+
+    def most_confused(self, k: int=10) -> List[Tuple[int, int, int]]:
+        """Find the ``k`` most frequent confusions (see :py:func:`most_confused`)."""
+        return most_confused(self.matrix, k)
@@ -0,0 +1,257 @@
+"""
+Module with constant-memory statistics of the values streamed in batches.
+"""
+import re
+import math
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+_PERCENTILE = re.compile(r'^(nan)?percentile_(\d+(?:\.\d+)?)$')
+
+
+def parse_percentile(aggregation: str) -> Optional[Tuple[bool, float]]:
+    """
+    Parse the percentile aggregation name such as ``percentile_95`` or ``nanpercentile_99.9``.
+
+    :param aggregation: aggregation name
+    :return: whether the NaNs are ignored and the percentile in [0, 100] or ``None`` if it is not a percentile
+    """
+    match = _PERCENTILE.match(aggregation)
+    if match is None or float(match.group(2)) > 100:
+        return None
+    return match.group(1) is not None, float(match.group(2))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative error guarantee (DDSketch).
+
+    The values are counted in logarithmically sized buckets, so that each estimated quantile is within
+    the ``relative_accuracy`` of the exact value. The number of the buckets is logarithmic in the range of the values
+    and limited by ``max_buckets``; when exceeded, the buckets of the values closest to zero are collapsed,
+    trading their accuracy for the accuracy of the larger values.
+    """
+
+    def __init__(self, relative_accuracy: float=0.01, max_buckets: int=2048):
+        """
+        Create new QuantileSketch.
+
+        :param relative_accuracy: maximum relative error of the estimated quantiles, in (0, 1)
+        :param max_buckets: maximum number of the buckets of the positive and of the negative values
+        :raise ValueError: if the relative accuracy is not in (0, 1)
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('Relative accuracy has to be in (0, 1), `{}` given.'.format(relative_accuracy))
+        self._relative_accuracy = relative_accuracy
+        self._max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive = Counter()
+        self._negative = Counter()
+        self._zeros = self._negative_infs = self._positive_infs = 0
+
+    @property
+    def count(self) -> int:
+        """Number of the sketched values."""
+        return sum(self._positive.values()) + sum(self._negative.values()) + self._zeros + \
+            self._negative_infs + self._positive_infs
+
+    def _add(self, store: Counter, magnitudes: np.ndarray) -> None:
+        """Count the given positive magnitudes in the given store of buckets."""
+        buckets, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                    return_counts=True)
+        store.update(dict(zip(buckets.tolist(), counts.tolist())))
+        self._collapse(store)
+
+    def _collapse(self, store: Counter) -> None:
+        """Merge the lowest buckets of the given store so that it has at most ``max_buckets`` buckets."""
+        if len(store) > self._max_buckets:
+            buckets = sorted(store)
+            lowest = buckets[-self._max_buckets]
+            store[lowest] += sum(store.pop(bucket) for bucket in buckets[:-self._max_buckets])
+
+    def update(self, values: Iterable[float]) -> None:
+        """
+        Add the given values to the sketch; the NaNs are ignored.
+
+        :param values: values to be added
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        finite = np.isfinite(values)
+        self._negative_infs += int(np.sum(values == -np.inf))
+        self._positive_infs += int(np.sum(values == np.inf))
+        values = values[finite]
+        tiny = np.finfo(np.float64).tiny
+        self._zeros += int(np.sum(np.abs(values) < tiny))
+        if np.any(values >= tiny):
+            self._add(self._positive, values[values >= tiny])
+        if np.any(values <= -tiny):
+            self._add(self._negative, -values[values <= -tiny])
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Add the values of the other sketch with the same relative accuracy to this one.
+
+        :param other: sketch to be merged
+        :raise ValueError: if the sketches differ in their relative accuracy
+        """
+        if other._relative_accuracy != self._relative_accuracy:
+            raise ValueError('Only the sketches with the same relative accuracy can be merged.')
+        self._positive.update(other._positive)
+        self._negative.update(other._negative)
+        self._collapse(self._positive)
+        self._collapse(self._negative)
+        self._zeros += other._zeros
+        self._negative_infs += other._negative_infs
+        self._positive_infs += other._positive_infs
+
+    def _value(self, bucket: int) -> float:
+        """Return the estimate of the magnitudes in the given bucket."""
+        return 2 * self._gamma ** bucket / (self._gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the given quantile of the sketched values (as :py:func:`numpy.quantile` with
+        the ``lower`` interpolation).
+
+        :param q: quantile in [0, 1]
+        :return: the estimated quantile or NaN if there are no values
+        """
+        count = self.count
+        if count == 0:
+            return np.nan
+        rank = int(q * (count - 1))
+        ordered = [(-np.inf, self._negative_infs)] + \
+            [(-self._value(bucket), self._negative[bucket]) for bucket in sorted(self._negative, reverse=True)] + \
+            [(0., self._zeros)] + \
+            [(self._value(bucket), self._positive[bucket]) for bucket in sorted(self._positive)] + \
+            [(np.inf, self._positive_infs)]
+        seen = 0
+        for value, bucket_count in ordered:
+            seen += bucket_count
+            if seen > rank:
+                return value
+        return np.inf
+
+
+class RunningStats:
+    """
+    Constant-memory statistics of the values streamed in batches.
+
+    The mean, variance and standard deviation are computed exactly with the (parallel) Welford algorithm, as well as
+    the minimum, maximum, sum and the NaN count and fraction. The median and the percentiles are estimated by
+    a :py:class:`QuantileSketch`. The NaNs propagate to the aggregations as in NumPy, unless they are prefixed with
+    ``nan``, e.g. ``nanmean``. The multidimensional values are flattened.
+    """
+
+    AGGREGATIONS = {'mean', 'std', 'var', 'min', 'max', 'sum', 'median'}
+    """Supported aggregations; additionally, their ``nan`` variants, ``nancount``, ``nanfraction`` and
+    the percentiles such as ``percentile_95`` or ``nanpercentile_99.9`` are supported."""
+
+    def __init__(self, relative_accuracy: float=0.01):
+        """
+        Create new RunningStats.
+
+        :param relative_accuracy: relative accuracy of the estimated median and percentiles
+        """
+        self._count = self._nancount = 0
+        self._mean = self._m2 = self._sum = 0.
+        self._min = self._max = np.nan
+        self._sketch = QuantileSketch(relative_accuracy)
+
+    @staticmethod
+    def supports(aggregation: str) -> bool:
+        """Return whether the given aggregation is supported."""
+        if aggregation in {'nancount', 'nanfraction'} or parse_percentile(aggregation) is not None:
+            return True
+        return (aggregation[3:] if aggregation.startswith('nan') else aggregation) in RunningStats.AGGREGATIONS
+
+    def extend(self, values: Iterable[float]) -> None:
+        """
+        Update the statistics with the given values.
+
+        :param values: batch of values
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nans = np.isnan(values)
+        valid = values[~nans]
+        if len(valid) > 0:
+            mean = np.mean(valid)
+            self._merge_moments(len(valid), float(mean), float(np.sum((valid - mean) ** 2)))
+            self._sum += float(np.sum(valid))
+            self._min = float(np.fmin(self._min, np.min(valid)))
+            self._max = float(np.fmax(self._max, np.max(valid)))
+            self._sketch.update(valid)
+        self._count += len(values)
+        self._nancount += int(np.sum(nans))
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        """Merge the given count, mean and sum of the squared deviations of the other values."""
+        total = self._valid + count
+        delta = mean - self._mean
+        self._m2 += m2 + delta ** 2 * self._valid * count / total
+        self._mean += delta * count / total
+
+    @property
+    def _valid(self) -> int:
+        """Number of the non-NaN values."""
+        return self._count - self._nancount
+
+    def merge(self, other: 'RunningStats') -> None:
+        """
+        Add the values of the other statistics to these ones.
+
+        :param other: statistics to be merged
+        """
+        if other._valid > 0:
+            self._merge_moments(other._valid, other._mean, other._m2)
+        self._count += other._count
+        self._nancount += other._nancount
+        self._sum += other._sum
+        self._min = float(np.fmin(self._min, other._min))
+        self._max = float(np.fmax(self._max, other._max))
+        self._sketch.merge(other._sketch)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def aggregate(self, aggregation: str) -> float:
+        """
+        Compute the given aggregation of the values.
+
+        :param aggregation: one of the supported aggregations (see :py:attr:`AGGREGATIONS`)
+        :return: the aggregated value; NaN for the aggregations (other than sums and counts) of no values
+        :raise ValueError: if the aggregation is not supported
+        """
+        if not RunningStats.supports(aggregation):
+            raise ValueError('Aggregation `{}` is not supported by the streaming statistics.'.format(aggregation))
+        if aggregation == 'nancount':
+            return self._nancount
+        if aggregation == 'nanfraction':
+            return self._nancount / self._count if self._count > 0 else np.nan
+
+        percentile = parse_percentile(aggregation)
+        ignore_nans = aggregation.startswith('nan')
+        base = 'percentile' if percentile is not None else aggregation[3:] if ignore_nans else aggregation
+        if self._nancount > 0 and not ignore_nans:
+            return np.nan
+        if base == 'sum':
+            return self._sum
+        if self._valid == 0:
+            return np.nan
+        if base == 'mean':
+            return self._mean
+        if base in {'var', 'std'}:
+            variance = self._m2 / self._valid
+            return variance if base == 'var' else math.sqrt(variance)
+        if base in {'min', 'max'}:
+            return self._min if base == 'min' else self._max
+        quantile = 0.5 if base == 'median' else percentile[1] / 100
+        return float(np.clip(self._sketch.quantile(quantile), self._min, self._max))
+
+
+__all__ = []